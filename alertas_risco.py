@@ -0,0 +1,276 @@
+# Arquivo: alertas_risco.py
+"""
+Alertas de risco avaliados a cada coleta (atualizar_dados.py), sem esperar o CLI diário.
+
+Para cada estação com leituras novas, o avaliador junta as leituras à cauda
+das últimas 2 h guardada no estado, calcula o VP em cada leitura nova
+(janelas (t - 10 min, t] e (t - 2 h, t], como no motor_vp), o AM daquele
+instante e o nível de risco VP x AM com as mesmas faixas do CLI. Nada do dia
+é recalculado: o custo de uma coleta é proporcional às leituras novas.
+
+Um alerta é emitido quando a estação muda de classe e a classe de origem ou
+de destino é 'Moderado Alto' ou 'Alto'. A subida é imediata; a descida só
+acontece quando o risco fica HISTERESE abaixo do limite inferior da classe
+atual, para que um valor oscilando na fronteira não gere uma sequência de
+alertas. O estado (classe atual, última leitura avaliada e cauda) fica em
+estado_alertas.json, então leituras já avaliadas, que a API devolve de novo
+na coleta seguinte, não geram alertas repetidos. Cada alerta tem um id
+(estação, datahora, classe) para deduplicação no destino.
+
+As saídas são configuradas pela variável RISCO_ALERTAS, com destinos
+separados por vírgula:
+
+    RISCO_ALERTAS=- python atualizar_dados.py                        # stdout
+    RISCO_ALERTAS=alertas.jsonl,https://exemplo/webhook python atualizar_dados.py
+
+Reprodução de CSVs diários em lotes de 5 min, para testar as faixas:
+    python alertas_risco.py reproduzir chuva_recife_2026-01-2*.csv
+"""
+import os
+import sys
+import json
+import argparse
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import requests
+
+from esquema import CLASSES_RISCO, LIMITES_RISCO
+from instrumentacao import etapa
+
+CAMINHO_ESTADO = 'estado_alertas.json'
+NIVEL_ALERTA = CLASSES_RISCO.index('Moderado Alto')
+HISTERESE = 0.10  # fração do limite inferior da classe atual
+JANELA_10MIN = np.timedelta64(10, 'm')
+JANELA_2H = np.timedelta64(2, 'h')
+LIMITES = LIMITES_RISCO
+TIMEOUT_WEBHOOK = 5
+
+
+# --- Saídas ---
+
+class SaidaConsole:
+    """ Uma linha JSON por alerta no stdout (log do job). """
+
+    def enviar(self, evento):
+        print(f"🚨 {json.dumps(evento, ensure_ascii=False)}", flush=True)
+
+
+class SaidaArquivo:
+    """ Acrescenta cada alerta como uma linha JSON ao arquivo. """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+
+    def enviar(self, evento):
+        with open(self.caminho, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(evento, ensure_ascii=False) + '\n')
+
+
+class SaidaWebhook:
+    """ POST do alerta em JSON. Falhas são registradas e não interrompem a coleta. """
+
+    def __init__(self, url, sessao=None):
+        self.url = url
+        self.sessao = sessao or requests.Session()
+
+    def enviar(self, evento):
+        try:
+            self.sessao.post(self.url, json=evento, timeout=TIMEOUT_WEBHOOK).raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Falha ao enviar alerta para o webhook: {e}", file=sys.stderr)
+
+
+class SaidaMemoria:
+    """ Guarda os alertas numa lista (testes e reprodução local). """
+
+    def __init__(self):
+        self.eventos = []
+
+    def enviar(self, evento):
+        self.eventos.append(evento)
+
+
+def saidas_configuradas(especificacao=None):
+    """ Saídas a partir de RISCO_ALERTAS ('-', caminho de arquivo ou URL, separados por vírgula). """
+    if especificacao is None:
+        especificacao = os.getenv('RISCO_ALERTAS', '-')
+    saidas = []
+    for destino in filter(None, (d.strip() for d in especificacao.split(','))):
+        if destino == '-':
+            saidas.append(SaidaConsole())
+        elif destino.startswith(('http://', 'https://')):
+            saidas.append(SaidaWebhook(destino))
+        else:
+            saidas.append(SaidaArquivo(destino))
+    return saidas
+
+
+# --- Avaliação ---
+
+def nivel_de_risco(risco):
+    """ Índice da classe em CLASSES_RISCO (faixas fechadas à direita, como no pd.cut do CLI). """
+    return int(np.searchsorted(LIMITES, risco, side='left'))
+
+
+def proximo_nivel(nivel_atual, risco):
+    """ Classe após a leitura: sobe direto, desce só abaixo do limite da classe atual menos a histerese. """
+    nivel = nivel_de_risco(risco)
+    if nivel >= nivel_atual:
+        return nivel
+    limite_atual = LIMITES[nivel_atual - 1]
+    return nivel if risco <= limite_atual * (1 - HISTERESE) else nivel_atual
+
+
+def vp_nas_leituras(tempos, valores, posicoes):
+    """ VP em cada posição de leituras ordenadas de uma estação, por somas acumuladas. """
+    acumulado = np.r_[0.0, np.cumsum(np.nan_to_num(valores))]
+    fim = posicoes + 1
+    inicio_10min = np.searchsorted(tempos, tempos[posicoes] - JANELA_10MIN, side='right')
+    inicio_2h = np.searchsorted(tempos, tempos[posicoes] - JANELA_2H, side='right')
+    chuva_10min = acumulado[fim] - acumulado[inicio_10min]
+    chuva_2h = acumulado[fim] - acumulado[inicio_2h]
+    return chuva_10min * 6 + chuva_2h
+
+
+class AvaliadorAlertas:
+    """ Estado por estação (classe, última leitura avaliada, cauda de 2 h) e avaliação das leituras novas. """
+
+    def __init__(self, tabua_mare=None, saidas=None, caminho_estado=CAMINHO_ESTADO):
+        self.caminho_estado = caminho_estado
+        self.saidas = saidas_configuradas() if saidas is None else saidas
+        self._tabua_mare = tabua_mare
+        self.estacoes = self._carregar_estado()
+
+    @property
+    def tabua_mare(self):
+        # Carregada só na primeira avaliação: uma coleta sem leituras novas não lê a maré
+        if self._tabua_mare is None:
+            from mare import carregar_fonte_am
+            self._tabua_mare = carregar_fonte_am()
+        return self._tabua_mare
+
+    def _carregar_estado(self):
+        if not self.caminho_estado or not os.path.exists(self.caminho_estado):
+            return {}
+        try:
+            with open(self.caminho_estado, 'r', encoding='utf-8') as f:
+                return json.load(f).get('estacoes', {})
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"⚠️ Estado de alertas '{self.caminho_estado}' ilegível ({e}). Recomeçando sem estado.", file=sys.stderr)
+            return {}
+
+    def salvar_estado(self):
+        """ Grava o estado de forma atômica (arquivo temporário + rename). """
+        if not self.caminho_estado:
+            return
+        temporario = f"{self.caminho_estado}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump({'estacoes': self.estacoes}, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(temporario, self.caminho_estado)
+
+    def _leituras_da_estacao(self, codigo, lote):
+        """ Cauda + lote da estação, sem repetir datahora (a leitura mais recente prevalece). """
+        cauda = self.estacoes.get(codigo, {}).get('cauda', [])
+        datahoras = [d for d, _ in cauda] + lote['datahora'].tolist()
+        valores = [v for _, v in cauda] + lote['valor'].tolist()
+        df = pd.DataFrame({'datahora': datahoras, 'valor': pd.to_numeric(valores, errors='coerce')})
+        df = df.drop_duplicates('datahora', keep='last').sort_values('datahora')
+        return df['datahora'].to_numpy(dtype=str), df['valor'].to_numpy(dtype=float)
+
+    def processar(self, df_leituras):
+        """
+        Avalia as leituras de uma coleta (colunas codestacao, nome, datahora no horário
+        de Recife e valor), envia os alertas e grava o estado. Devolve a lista de alertas.
+        """
+        if df_leituras is None or df_leituras.empty:
+            return []
+        with etapa('avaliar_alertas', linhas_entrada=len(df_leituras)) as m:
+            df = df_leituras.assign(codestacao=df_leituras['codestacao'].astype(str),
+                                    datahora=df_leituras['datahora'].astype(str).str.slice(0, 19))
+
+            # VP de cada leitura nova, estação por estação; o AM é buscado de uma vez no fim
+            avaliacoes = []
+            for codigo, lote in df.groupby('codestacao', sort=True):
+                estado = self.estacoes.setdefault(codigo, {'nivel': 0, 'ultima': '', 'cauda': []})
+                estado['nome'] = str(lote['nome'].iloc[-1]) if 'nome' in lote else estado.get('nome', codigo)
+                textos, valores = self._leituras_da_estacao(codigo, lote)
+                tempos = textos.astype('datetime64[s]')
+                posicoes = np.flatnonzero(textos > estado['ultima'])
+                if len(posicoes):
+                    avaliacoes.append((codigo, textos[posicoes], tempos[posicoes], vp_nas_leituras(tempos, valores, posicoes)))
+                # A cauda guarda só as 2 h anteriores à leitura mais recente
+                manter = tempos > tempos[-1] - JANELA_2H
+                estado['cauda'] = [[d, None if np.isnan(v) else float(v)] for d, v in zip(textos[manter], valores[manter])]
+
+            eventos = []
+            if avaliacoes:
+                am = self.tabua_mare.am(np.concatenate([a[2] for a in avaliacoes]))
+                inicio = 0
+                for codigo, textos, _, vps in avaliacoes:
+                    ams = am[inicio:inicio + len(vps)]
+                    inicio += len(vps)
+                    eventos += self._transicoes(codigo, textos, vps, ams)
+            for evento in eventos:
+                for saida in self.saidas:
+                    saida.enviar(evento)
+            m.registrar(estacoes=len(avaliacoes), leituras_avaliadas=sum(len(a[1]) for a in avaliacoes), alertas=len(eventos))
+        self.salvar_estado()
+        return eventos
+
+    def _transicoes(self, codigo, textos, vps, ams):
+        """ Percorre as leituras novas de uma estação em ordem, aplicando a histerese. """
+        estado = self.estacoes[codigo]
+        eventos = []
+        for datahora, vp, am in zip(textos, vps, ams):
+            estado['ultima'] = str(datahora)
+            risco = round(float(vp * am), 2)
+            if np.isnan(risco):
+                continue
+            anterior = estado['nivel']
+            estado['nivel'] = proximo_nivel(anterior, risco)
+            if estado['nivel'] != anterior and max(anterior, estado['nivel']) >= NIVEL_ALERTA:
+                classe = CLASSES_RISCO[estado['nivel']]
+                eventos.append({
+                    'id': f"{codigo}|{datahora}|{classe}",
+                    'codestacao': codigo,
+                    'nomeEstacao': estado['nome'],
+                    'datahora': str(datahora),
+                    'tipo': 'subida' if estado['nivel'] > anterior else 'descida',
+                    'classe_anterior': CLASSES_RISCO[anterior],
+                    'classe': classe,
+                    'VP': round(float(vp), 2),
+                    'AM': round(float(am), 2),
+                    'Nivel_Risco_Valor': risco,
+                    'detectado_em': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                })
+        return eventos
+
+
+def reproduzir(arquivos, saidas, passo='5min'):
+    """ Passa as leituras dos CSVs pelo avaliador em lotes de `passo`, como coletas sucessivas. """
+    df = pd.concat([pd.read_csv(a) for a in arquivos], ignore_index=True).sort_values('datahora')
+    avaliador = AvaliadorAlertas(saidas=saidas, caminho_estado=None)
+    lotes = pd.to_datetime(df['datahora']).dt.floor(passo)
+    eventos = []
+    for _, lote in df.groupby(lotes, sort=True):
+        eventos += avaliador.processar(lote)
+    return eventos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Alertas de risco a cada coleta.")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_reproduzir = sub.add_parser('reproduzir', help="Reproduz CSVs diários em lotes, sem gravar estado.")
+    p_reproduzir.add_argument('arquivos', nargs='+')
+    p_reproduzir.add_argument('--passo', default='5min')
+    p_reproduzir.add_argument('--saida', default='-', help="Destinos, como em RISCO_ALERTAS (padrão: stdout).")
+    args = parser.parse_args(argv)
+
+    eventos = reproduzir(args.arquivos, saidas_configuradas(args.saida), args.passo)
+    print(f"✅ {len(eventos)} alerta(s) em {len(args.arquivos)} arquivo(s).")
+
+
+if __name__ == "__main__":
+    main()
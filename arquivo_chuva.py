@@ -0,0 +1,163 @@
+# Arquivo: arquivo_chuva.py
+"""
+Arquivo de leituras de chuva em partições diárias, somente com acréscimo (append-only).
+
+Cada partição (um arquivo .bin por dia da leitura) guarda registros binários de
+tamanho fixo: datahora (int64, segundos), estação (int32, código categórico),
+valor (float64) e qualificação (int8). Os campos constantes de cada estação
+(código, nome, cidade, UF, latitude, longitude, sensor) ficam uma única vez em
+estacoes.json.
+
+Um índice de deduplicação por (estação, datahora) decide o que é novo: leituras
+já conhecidas são ignoradas, leituras corrigidas são acrescentadas e prevalecem
+sobre as anteriores (como o drop_duplicates(keep='last') do CSV). A compactação
+reescreve uma partição sem as versões superadas.
+
+A gravação é toda de ingestao_leve.ArquivoChuvaLeve (o mesmo código usado pela
+coleta sem pandas); este módulo só converte a entrada em DataFrame para um
+LoteLeituras e lê as partições com NumPy para consultas.
+
+Uso em linha de comando:
+    python arquivo_chuva.py importar chuva_recife_*.csv
+    python arquivo_chuva.py compactar [--dia AAAA-MM-DD]
+"""
+import os
+import argparse
+import struct
+
+import numpy as np
+import pandas as pd
+
+from ingestao_leve import ArquivoChuvaLeve, LoteLeituras, FORMATO_REGISTRO, DIRETORIO_ARQUIVO, SEGUNDOS_DIA
+
+REGISTRO = np.dtype([
+    ('datahora', '<i8'),
+    ('estacao', '<i4'),
+    ('valor', '<f8'),
+    ('qualificacao', '<i1'),
+])
+# Leitura com NumPy das partições gravadas com struct por ingestao_leve.py
+assert REGISTRO.itemsize == struct.calcsize(FORMATO_REGISTRO)
+
+
+def _str_para_dia(dia_str):
+    return int(np.datetime64(pd.Timestamp(dia_str).date(), 'D').astype(np.int64))
+
+
+def lote_de_dataframe(df):
+    """ LoteLeituras das linhas de df (colunas do CEMADEN, datahora já no horário de Recife). """
+    lote = LoteLeituras.de_linhas(df.to_dict('records'))
+    if lote is None:
+        raise ValueError("Leituras sem codestacao ou com datahora ilegível.")
+    return lote
+
+
+class ArquivoChuva(ArquivoChuvaLeve):
+    """ Arquivo de chuva com entrada e consultas em DataFrame, sobre ArquivoChuvaLeve. """
+
+    def anexar(self, leituras):
+        """
+        Acrescenta as leituras (DataFrame com as colunas do CEMADEN: codestacao, datahora,
+        valor, ..., ou um LoteLeituras).
+
+        Retorna (novas, alteradas): máscaras booleanas alinhadas com as leituras. Leituras
+        repetidas com o mesmo valor não são gravadas de novo.
+        """
+        if isinstance(leituras, LoteLeituras):
+            novas, alteradas = super().anexar(leituras)
+            return np.array(novas, dtype=bool), np.array(alteradas, dtype=bool)
+        df = leituras
+        if df.empty:
+            return np.zeros(0, dtype=bool), np.zeros(0, dtype=bool)
+
+        # Conversão vetorizada para os registros da partição; a gravação é a de ArquivoChuvaLeve
+        codigos = df['codestacao'].astype(str)
+        primeiras = {}
+
+        def metadados(i):
+            # Primeira linha de cada estação, convertida uma vez só para o lote inteiro
+            if not primeiras:
+                linhas = df[~codigos.duplicated()].to_dict('records')
+                lote = LoteLeituras(linhas, list(df.columns), [None] * len(linhas))
+                primeiras.update((str(r['codestacao']), lote.metadados_estacao(r)) for r in linhas)
+            return primeiras[codigos.iat[i]]
+        ids = self.ids_estacoes(codigos.tolist(), metadados)
+        datahora = pd.to_datetime(df['datahora']).to_numpy(dtype='datetime64[s]').view(np.int64)
+        valor = pd.to_numeric(df['valor'], errors='coerce').to_numpy(dtype=np.float64)
+        if 'qualificacao' in df.columns:
+            qualificacao = pd.to_numeric(df['qualificacao'], errors='coerce').fillna(-1).to_numpy(dtype=np.int8)
+        else:
+            qualificacao = np.full(len(df), -1, dtype=np.int8)
+        novas, alteradas = self.anexar_registros(list(zip(datahora.tolist(), ids, valor.tolist(), qualificacao.tolist())))
+        return np.array(novas, dtype=bool), np.array(alteradas, dtype=bool)
+
+    def _registros_do_dia(self, dia):
+        caminho = self.caminho_particao(dia)
+        if not os.path.exists(caminho):
+            return np.empty(0, dtype=REGISTRO)
+        registros = np.fromfile(caminho, dtype=np.uint8)
+        # Um acréscimo interrompido pode deixar um registro incompleto no fim
+        completos = len(registros) - (len(registros) % REGISTRO.itemsize)
+        return registros[:completos].view(REGISTRO)
+
+    def ler_intervalo(self, data_inicial, data_final, estacoes=None):
+        """
+        Leituras de data_inicial a data_final (datas inclusivas), já deduplicadas.
+        Colunas: datahora, codestacao, nomeEstacao (categóricas), valorMedida, qualificacao.
+        estacoes pode filtrar por nome ou código da estação.
+        """
+        inicio, fim = _str_para_dia(data_inicial), _str_para_dia(data_final)
+        partes = []
+        for dia in range(inicio, fim + 1):
+            registros = self._registros_do_dia(dia)
+            if len(registros) == 0:
+                continue
+            chaves = registros['estacao'].astype(np.int64) * SEGUNDOS_DIA + (registros['datahora'] - dia * SEGUNDOS_DIA)
+            ordem = np.lexsort((np.arange(len(chaves)), chaves))
+            ultima = np.r_[chaves[ordem][1:] != chaves[ordem][:-1], True]
+            partes.append(registros[np.sort(ordem[ultima])])
+
+        registros = np.concatenate(partes) if partes else np.empty(0, dtype=REGISTRO)
+        if estacoes is not None:
+            procuradas = set(estacoes)
+            ids = [i for i, e in enumerate(self.estacoes) if e['codestacao'] in procuradas or e['nome'] in procuradas]
+            registros = registros[np.isin(registros['estacao'], ids)]
+
+        codigos = pd.Index([e['codestacao'] for e in self.estacoes], dtype=object)
+        id_nome, nomes = pd.factorize(pd.Index([e['nome'] for e in self.estacoes], dtype=object))
+        return pd.DataFrame({
+            'datahora': registros['datahora'].astype('datetime64[s]'),
+            'codestacao': pd.Categorical.from_codes(registros['estacao'], categories=codigos),
+            'nomeEstacao': pd.Categorical.from_codes(id_nome[registros['estacao']], categories=nomes),
+            'valorMedida': registros['valor'],
+            'qualificacao': registros['qualificacao'],
+        })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manutenção do arquivo de chuva em partições diárias.")
+    parser.add_argument('--diretorio', default=DIRETORIO_ARQUIVO)
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_importar = sub.add_parser('importar', help="Importa CSVs diários (chuva_recife_*.csv) para o arquivo.")
+    p_importar.add_argument('arquivos', nargs='+')
+    p_compactar = sub.add_parser('compactar', help="Remove versões superadas das partições.")
+    p_compactar.add_argument('--dia', help="Compacta só este dia (AAAA-MM-DD). Padrão: todas as partições.")
+    args = parser.parse_args(argv)
+
+    arquivo = ArquivoChuva(args.diretorio)
+    if args.comando == 'importar':
+        for caminho in sorted(args.arquivos):
+            df = pd.read_csv(caminho)
+            novas, alteradas = arquivo.anexar(df)
+            print(f"-> {caminho}: {novas.sum()} nova(s), {alteradas.sum()} corrigida(s).")
+    else:
+        dias = [args.dia] if args.dia else arquivo.particoes()
+        for dia in dias:
+            removidas = arquivo.compactar(dia)
+            if removidas:
+                print(f"-> {dia}: {removidas} registro(s) superado(s) removido(s).")
+    print("✅ Concluído.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,30 @@
-"""# Arquivo: atualizar_dados.py
+# Arquivo: atualizar_dados.py
 import os
 import sys
-import pandas as pd
+import glob
+import time
+import signal
+import argparse
+import threading
 import requests
-from datetime import datetime
-from pytz import timezone
+from datetime import datetime, timedelta
+from coleta_cemaden import criar_sessao, solicitar_token, buscar_estacoes, GerenciadorToken
+from instrumentacao import etapa
+from ingestao_leve import (LoteLeituras, ArquivoChuvaLeve, escrever_csv_diario, codigos_monitorados,
+                           ler_cabecalho_artefato, artefato_vencido, FUSO_RECIFE, NOME_ARTEFATO, IDADE_REPUBLICAR)
 
-# --- A função obter_token e atualizar_csv_diario continuam as mesmas ---
+# pandas e os módulos de análise (arquivo_chuva, alertas_risco, esquema, risco_painel) são
+# importados dentro das funções que os usam: a coleta comum só precisa de ingestao_leve.py
 
-def obter_token(email, senha):
+def obter_token(email, senha, sessao=None):
     """Obtém o token de autenticação da API do CEMADEN."""
     if not email or not senha:
         print("ERRO: Credenciais do Cemaden (email/senha) não encontradas nos segredos.", file=sys.stderr)
         sys.exit(1)
     try:
-        token_url = 'https://sgaa.cemaden.gov.br/SGAA/rest/controle-token/tokens'
-        login = {'email': email, 'password': senha}
         print("Tentando obter o token de acesso...")
-        response = requests.post(token_url, json=login)
-        response.raise_for_status()
-        content = response.json()
-        token = content.get('token')
+        with etapa('obter_token'):
+            token = solicitar_token(email, senha, sessao)
         if token:
             print("✅ Token obtido com sucesso!")
             return token
@@ -31,66 +35,59 @@ def obter_token(email, senha):
         print(f"❌ Erro ao obter token: {e}", file=sys.stderr)
         return None
 
-def buscar_dados_cemaden(token, lista_estacoes, uf='PE', rede='11', sensor='10'):
-    """
-    Busca os dados e JÁ CONVERTE os horários para o fuso local de Recife.
-    """
+def buscar_registros_cemaden(token, lista_estacoes, uf='PE', rede='11', sensor='10', sessao=None):
+    """Busca os dados de todas as estações em paralelo; devolve os registros da API (horários em UTC)."""
     if not token:
         print("❌ Token de acesso não fornecido.", file=sys.stderr)
-        return pd.DataFrame()
-    
-    url_base = 'https://sws.cemaden.gov.br/PED/rest/pcds/pcds-dados-recentes'
-    headers = {'token': token}
-    lista_dfs = []
+        return []
+
     print(f"\nBuscando dados para {len(lista_estacoes)} estações...")
-    
-    for codestacao in lista_estacoes:
-        params = {'codestacao': codestacao, 'uf': uf, 'rede': rede, 'sensor': sensor, 'formato': 'JSON'}
-        try:
-            response = requests.get(url_base, headers=headers, params=params)
-            response.raise_for_status()
-            dados = response.json()
-            if isinstance(dados, dict) and 'Nenhum resultado foi encontrado' in dados.get('Info', ''):
-                print(f"⚠️ Estação {codestacao} retornou uma mensagem de 'não encontrado'. Ignorando.")
-                continue
-            if dados:
-                if isinstance(dados, dict):
-                    dados_para_df = [dados]
-                else:
-                    dados_para_df = dados
-                lista_dfs.append(pd.DataFrame(dados_para_df))
-            else:
-                print(f"⚠️ Nenhum dado encontrado para a estação {codestacao}.")
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Erro ao buscar dados para a estação {codestacao}: {e}", file=sys.stderr)
-            
-    if not lista_dfs:
+    with etapa('buscar_estacoes', estacoes=len(lista_estacoes)) as m:
+        registros = buscar_estacoes(token, lista_estacoes, uf, rede, sensor, sessao=sessao)
+        m.registrar(linhas_saida=len(registros))
+
+    if not registros:
         print("Nenhum dado foi retornado pela API.")
-        return pd.DataFrame()
-        
+        return []
     print("✅ Dados obtidos com sucesso!")
-    df_final = pd.concat(lista_dfs, ignore_index=True)
+    return registros
+
 
-  
-    if not df_final.empty and 'datahora' in df_final.columns:
+def buscar_dados_cemaden(token, lista_estacoes, uf='PE', rede='11', sensor='10', sessao=None):
+    """
+    Busca os dados de todas as estações em paralelo e JÁ CONVERTE os horários para o fuso local de Recife.
+    """
+    import pandas as pd
+    registros = buscar_registros_cemaden(token, lista_estacoes, uf, rede, sensor, sessao)
+    return converter_para_fuso_recife(pd.DataFrame(registros))
+
+
+def converter_para_fuso_recife(df_final):
+    """Converte a coluna datahora (UTC, como vem da API) para texto no fuso de Recife."""
+    import pandas as pd
+    if df_final.empty or 'datahora' not in df_final.columns:
+        return df_final
+    with etapa('converter_fuso', linhas_entrada=len(df_final)):
         print("Convertendo novos dados para o fuso horário de Recife (UTC-3)...")
-        # 1. Converte a coluna para o tipo datetime
-        df_final['datahora'] = pd.to_datetime(df_final['datahora'])
+        # 1. Converte a coluna para o tipo datetime (datahoras ilegíveis viram NaT)
+        df_final['datahora'] = pd.to_datetime(df_final['datahora'], errors='coerce')
         # 2. Informa que o fuso original é UTC e converte para o fuso de Recife
         df_final['datahora'] = df_final['datahora'].dt.tz_localize('UTC').dt.tz_convert('America/Recife')
         # 3. Formata de volta para texto, para salvar um CSV limpo
         df_final['datahora'] = df_final['datahora'].dt.strftime('%Y-%m-%d %H:%M:%S')
-    
-    
     return df_final
 
 
-def atualizar_csv_diario(df_novos_dados, nome_arquivo):
+def reescrever_csv_diario(df_novos_dados, nome_arquivo):
+    """Reescreve o CSV diário inteiro com deduplicação (usado quando uma leitura já gravada foi corrigida)."""
+    import pandas as pd
+    from esquema import ler_leituras_csv, tipar_leituras
     if os.path.exists(nome_arquivo):
         print(f"Arquivo '{nome_arquivo}' encontrado. Carregando dados existentes...")
         try:
-            df_existente = pd.read_csv(nome_arquivo)
-            df_combinado = pd.concat([df_existente, df_novos_dados], ignore_index=True)
+            # Os dois lados com os tipos de esquema.py, para a deduplicação comparar datahora com datahora
+            df_existente = ler_leituras_csv(nome_arquivo)
+            df_combinado = pd.concat([df_existente, tipar_leituras(df_novos_dados)], ignore_index=True)
             print("Dados novos e antigos combinados.")
         except pd.errors.EmptyDataError:
             df_combinado = df_novos_dados
@@ -110,30 +107,287 @@ def atualizar_csv_diario(df_novos_dados, nome_arquivo):
     print(f"✅ Arquivo '{nome_arquivo}' salvo com sucesso! Total de {num_linhas_depois} registros.")
 
 
-def main():
+def atualizar_csv_diario(df_novos_dados, nome_arquivo):
+    """
+    Acrescenta ao CSV diário apenas as linhas novas, sem reler nem reescrever o arquivo.
+    A deduplicação já foi feita pelo índice do arquivo de chuva (ArquivoChuva.anexar).
+    """
+    if df_novos_dados.empty:
+        print(f"Nenhuma leitura nova para '{nome_arquivo}'.")
+        return
+
+    if not os.path.exists(nome_arquivo) or os.path.getsize(nome_arquivo) == 0:
+        print(f"Arquivo '{nome_arquivo}' não encontrado. Será criado um novo.")
+        df_novos_dados.to_csv(nome_arquivo, index=False)
+        print(f"✅ Arquivo '{nome_arquivo}' criado com {len(df_novos_dados)} registros.")
+        return
+
+    with open(nome_arquivo, 'rb') as f:
+        cabecalho = f.readline().decode('utf-8').strip().split(',')
+        f.seek(-1, os.SEEK_END)
+        termina_com_quebra = f.read(1) == b'\n'
+
+    if set(df_novos_dados.columns) - set(cabecalho):
+        # A API passou a devolver colunas novas: o arquivo precisa de um cabeçalho novo
+        reescrever_csv_diario(df_novos_dados, nome_arquivo)
+        return
+
+    with open(nome_arquivo, 'a', encoding='utf-8', newline='') as f:
+        if not termina_com_quebra:
+            f.write('\n')
+        df_novos_dados.reindex(columns=cabecalho).to_csv(f, header=False, index=False, lineterminator='\n')
+    print(f"✅ {len(df_novos_dados)} registro(s) novo(s) acrescentado(s) a '{nome_arquivo}'.")
+
+
+def abrir_arquivo_chuva():
+    """Abre o arquivo de chuva; na primeira vez importa os CSVs diários já existentes."""
+    import pandas as pd
+    from arquivo_chuva import ArquivoChuva
+    arquivo = ArquivoChuva()
+    if not arquivo.particoes():
+        existentes = sorted(glob.glob("chuva_recife_*.csv"))
+        if existentes:
+            print(f"Arquivo de chuva vazio: importando {len(existentes)} CSV(s) diário(s) existentes...")
+            for caminho in existentes:
+                arquivo.anexar(pd.read_csv(caminho))
+    return arquivo
+
+
+def compactar_dia_anterior(arquivo, agora_em_recife):
+    """Compactação periódica: na primeira coleta do dia, a partição de ontem é fechada."""
+    ontem = (agora_em_recife - timedelta(days=1)).strftime('%Y-%m-%d')
+    with etapa('compactar_particao', dia=ontem):
+        removidas = arquivo.compactar(ontem)
+    print(f"Partição {ontem} compactada ({removidas} versão(ões) superada(s) removida(s)).")
+
+
+def _lote_com_pandas(registros):
+    """Registros fora do formato esperado: conversão com pandas, descartando os sem codestacao ou datahora legível."""
+    import pandas as pd
+    from arquivo_chuva import lote_de_dataframe
+    df = pd.DataFrame(registros)
+    if 'datahora' not in df.columns or 'codestacao' not in df.columns:
+        print("⚠️ Registros sem as colunas codestacao/datahora foram descartados.", file=sys.stderr)
+        return LoteLeituras([], [], [])
+    df = converter_para_fuso_recife(df)
+    validos = df['datahora'].notna() & df['codestacao'].notna()
+    if not validos.all():
+        print(f"⚠️ {(~validos).sum()} registro(s) sem codestacao ou datahora legível descartado(s).", file=sys.stderr)
+    return lote_de_dataframe(df[validos].assign(codestacao=df.loc[validos, 'codestacao'].astype(str)))
+
+
+def registrar_registros(registros, agora_em_recife, arquivo=None):
+    """
+    Grava as leituras no arquivo de chuva e acrescenta as novas ao CSV do dia, só com a biblioteca
+    padrão (ingestao_leve.py). registros são os dicionários da API (UTC) ou um LoteLeituras já no
+    horário de Recife. Registros fora do formato, correções e colunas novas da API passam pelo
+    pandas. Devolve os registros (horário de Recife) das leituras novas e corrigidas.
+    """
+    lote = registros if isinstance(registros, LoteLeituras) else LoteLeituras.de_registros(registros)
+    if lote is None:
+        lote = _lote_com_pandas(registros)
+    if arquivo is None:
+        arquivo = ArquivoChuvaLeve()
+        if not arquivo.particoes() and glob.glob("chuva_recife_*.csv"):
+            arquivo = abrir_arquivo_chuva()
+
+    data_hoje = agora_em_recife.strftime('%Y-%m-%d')
+    nome_arquivo_diario = f"chuva_recife_{data_hoje}.csv"
+    primeira_coleta_do_dia = not os.path.exists(nome_arquivo_diario)
+
+    with etapa('arquivo_chuva_anexar', linhas_entrada=len(lote)) as m:
+        novas, alteradas = arquivo.anexar(lote)
+        m.registrar(novas=sum(novas), alteradas=sum(alteradas))
+    print(f"Arquivo de chuva: {sum(novas)} leitura(s) nova(s), {sum(alteradas)} corrigida(s).")
+    registradas = [i for i in range(len(lote)) if novas[i] or alteradas[i]]
+
+    tamanho_antes = os.path.getsize(nome_arquivo_diario) if not primeira_coleta_do_dia else 0
+    with etapa('csv_diario', arquivo=nome_arquivo_diario, reescrita=any(alteradas)) as m:
+        if any(alteradas) or not escrever_csv_diario(lote, [i for i in registradas if novas[i]], nome_arquivo_diario):
+            import pandas as pd
+            reescrever_csv_diario(pd.DataFrame(lote.registros).iloc[registradas], nome_arquivo_diario)
+        if os.path.exists(nome_arquivo_diario):
+            m.registrar(bytes_gravados=os.path.getsize(nome_arquivo_diario) - tamanho_antes)
+
+    if primeira_coleta_do_dia:
+        compactar_dia_anterior(arquivo, agora_em_recife)
+    return [lote.registros[i] for i in registradas]
+
+
+def registrar_leituras(df_chuva_recente, arquivo, agora_em_recife):
+    """Como registrar_registros, para um DataFrame já no horário de Recife. Devolve as novas e corrigidas."""
+    import pandas as pd
+    from arquivo_chuva import lote_de_dataframe
+    registradas = registrar_registros(lote_de_dataframe(df_chuva_recente), agora_em_recife, arquivo)
+    return pd.DataFrame(registradas, columns=df_chuva_recente.columns)
+
+
+def avaliar_alertas(avaliador, df_leituras):
+    """Avalia os alertas das leituras novas; uma falha aqui não perde a coleta já gravada."""
+    try:
+        avaliador.processar(df_leituras)
+    except Exception as e:
+        print(f"❌ Erro ao avaliar alertas: {e}", file=sys.stderr)
+
+
+def publicar_risco_hoje(agora_em_recife, avaliador=None, houve_leituras_novas=True, caminho=NOME_ARTEFATO):
+    """
+    Grava o risco do dia, como o painel calcula, em risco_hoje.json (risco_painel.py).
+    Sem leituras novas, só regrava se o artefato for de outro dia ou estiver perto de vencer
+    (verificado sem pandas). A maré é a do avaliador de alertas, carregada uma única vez;
+    sem avaliador, um é criado só se for preciso publicar. Se a publicação falhar,
+    o artefato antigo é apagado e o painel volta a calcular o risco sozinho.
+    """
+    data_hoje = agora_em_recife.strftime('%Y-%m-%d')
+    nome_arquivo_diario = f"chuva_recife_{data_hoje}.csv"
+    try:
+        if not houve_leituras_novas:
+            if not artefato_vencido(ler_cabecalho_artefato(caminho), data_hoje, idade_maxima=IDADE_REPUBLICAR):
+                return
+        if not os.path.exists(nome_arquivo_diario):
+            return
+        from esquema import ler_leituras_csv
+        from estacoes import nomes_monitorados
+        from risco_painel import gerar_artefato, salvar_artefato
+        if avaliador is None:
+            from alertas_risco import AvaliadorAlertas
+            avaliador = AvaliadorAlertas()
+        with etapa('artefato_hoje', arquivo=nome_arquivo_diario) as m:
+            df_leituras = ler_leituras_csv(nome_arquivo_diario, renomear=True)
+            artefato = gerar_artefato(df_leituras, data_hoje, nomes_monitorados(), avaliador.tabua_mare,
+                                      arquivo=nome_arquivo_diario)
+            salvar_artefato(artefato, caminho)
+            m.registrar(linhas_entrada=len(df_leituras), linhas_saida=len(artefato['linhas']))
+        print(f"✅ '{caminho}' publicado com {len(artefato['linhas'])} hora(s) de risco.")
+    except Exception as e:
+        print(f"❌ Erro ao publicar '{caminho}': {e}", file=sys.stderr)
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+
+def processar_coleta(registros, agora_em_recife):
+    """
+    Uma execução da coleta depois da busca: grava os registros, avalia os alertas e publica
+    o artefato do dia. Só a análise das leituras novas (alertas e artefato) importa o pandas;
+    sem leituras novas a execução fica na biblioteca padrão.
+    """
+    registradas = registrar_registros(registros, agora_em_recife) if registros else []
+    if not registradas:
+        publicar_risco_hoje(agora_em_recife, houve_leituras_novas=False)
+        return
+    import pandas as pd
+    from alertas_risco import AvaliadorAlertas
+    avaliador = AvaliadorAlertas()
+    avaliar_alertas(avaliador, pd.DataFrame(registradas))
+    publicar_risco_hoje(agora_em_recife, avaliador)
+
+
+# --- Modo daemon ---
+
+def ultimas_leituras(arquivo, agora_em_recife):
+    """Última datahora (UTC, 'AAAA-MM-DD HH:MM:SS') de cada estação já gravada nos últimos dois dias."""
+    ontem = (agora_em_recife - timedelta(days=1)).strftime('%Y-%m-%d')
+    df = arquivo.ler_intervalo(ontem, agora_em_recife.strftime('%Y-%m-%d'))
+    if df.empty:
+        return {}
+    maximos = df.groupby('codestacao', observed=True)['datahora'].max()
+    em_utc = maximos.dt.tz_localize('America/Recife').dt.tz_convert('UTC').dt.strftime('%Y-%m-%d %H:%M:%S')
+    return {str(codigo): marca for codigo, marca in em_utc.items()}
+
+
+def _datahora_api(registro):
+    # Formato da API: 'AAAA-MM-DD HH:MM:SS[.f]'; os 19 primeiros caracteres comparam como texto
+    return str(registro.get('datahora', ''))[:19].replace('T', ' ')
+
+
+def ciclo_daemon(gerenciador, sessao, estacoes, arquivo, marcas, avaliador):
+    """Uma coleta: busca, descarta o que já foi visto, grava o resto e avança as marcas por estação."""
+    with etapa('buscar_estacoes', estacoes=len(estacoes)) as m:
+        registros = buscar_estacoes(gerenciador, estacoes, sessao=sessao)
+        m.registrar(linhas_saida=len(registros))
+    novos = [r for r in registros if _datahora_api(r) > marcas.get(str(r.get('codestacao')), '')]
+    print(f"{len(registros)} registro(s) recebidos, {len(novos)} posterior(es) à última leitura conhecida.")
+    agora_em_recife = datetime.now(FUSO_RECIFE)
+    if not novos:
+        publicar_risco_hoje(agora_em_recife, avaliador, houve_leituras_novas=False)
+        return
+
+    import pandas as pd
+    registradas = registrar_registros(novos, agora_em_recife, arquivo)
+    if registradas:
+        avaliar_alertas(avaliador, pd.DataFrame(registradas))
+    publicar_risco_hoje(agora_em_recife, avaliador, houve_leituras_novas=bool(registradas))
+    for r in novos:
+        codigo = str(r.get('codestacao'))
+        marcas[codigo] = max(marcas.get(codigo, ''), _datahora_api(r))
+
+
+def executar_daemon(estacoes, intervalo, validade_token):
+    """Processo de longa duração: token e estado em memória, coleta a cada `intervalo` segundos."""
+    from alertas_risco import AvaliadorAlertas
+    cemaden_email = os.getenv("CEMADEN_EMAIL")
+    cemaden_senha = os.getenv("CEMADEN_SENHA")
+    if not cemaden_email or not cemaden_senha:
+        print("ERRO: Credenciais do Cemaden (email/senha) não encontradas nos segredos.", file=sys.stderr)
+        sys.exit(1)
+
+    sessao = criar_sessao()
+    gerenciador = GerenciadorToken(lambda: obter_token(cemaden_email, cemaden_senha, sessao), validade_token)
+    arquivo = abrir_arquivo_chuva()
+    marcas = ultimas_leituras(arquivo, datetime.now(FUSO_RECIFE))
+    # Estado dos alertas e maré ficam em memória entre as coletas
+    avaliador = AvaliadorAlertas()
+
+    parar = threading.Event()
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sinal, lambda *_: parar.set())
+
+    print(f"Daemon iniciado: {len(estacoes)} estações a cada {intervalo}s.")
+    proxima = time.monotonic()
+    while not parar.is_set():
+        inicio = time.monotonic()
+        try:
+            with etapa('ciclo_daemon'):
+                ciclo_daemon(gerenciador, sessao, estacoes, arquivo, marcas, avaliador)
+        except Exception as e:
+            print(f"❌ Erro na coleta: {e}", file=sys.stderr)
+        print(f"Coleta concluída em {time.monotonic() - inicio:.2f}s.")
+        # Agenda pelo relógio monotônico; coletas atrasadas não se acumulam
+        proxima = max(proxima + intervalo, time.monotonic())
+        parar.wait(proxima - time.monotonic())
+    print("Daemon finalizado.")
+
+
+def main(argv=None):
     """Função principal que orquestra todo o processo."""
+    parser = argparse.ArgumentParser(description="Coleta os dados de chuva do CEMADEN.")
+    parser.add_argument('--daemon', action='store_true',
+                        help="Fica em execução e coleta periodicamente, mantendo token e estado em memória.")
+    parser.add_argument('--intervalo', type=float, default=60,
+                        help="Intervalo entre coletas no modo daemon, em segundos (padrão: 60).")
+    parser.add_argument('--validade-token', type=float, default=3600,
+                        help="Tempo em segundos até renovar o token no modo daemon (padrão: 3600).")
+    args = parser.parse_args(argv)
+
+    # Estações marcadas como monitoradas em registro_estacoes.json
+    estacoes_de_recife = codigos_monitorados()
+
+    if args.daemon:
+        executar_daemon(estacoes_de_recife, args.intervalo, args.validade_token)
+        return
     
     cemaden_email = os.getenv("CEMADEN_EMAIL")
     cemaden_senha = os.getenv("CEMADEN_SENHA")
     
-    token_acesso = obter_token(cemaden_email, cemaden_senha)
+    sessao = criar_sessao()
+    token_acesso = obter_token(cemaden_email, cemaden_senha, sessao)
     
     if token_acesso:
-        estacoes_de_recife = [
-            '261160614A', '261160609A', '261160623A', '261160618A', '261160603A'
-        ]
-        
-        df_chuva_recente = buscar_dados_cemaden(token_acesso, estacoes_de_recife)
-
-        if not df_chuva_recente.empty:
-            tz_recife = timezone('America/Recife')
-            agora_em_recife = datetime.now(tz_recife)
-            data_hoje = agora_em_recife.strftime('%Y-%m-%d')
-            
-            nome_arquivo_diario = f"chuva_recife_{data_hoje}.csv"
-            atualizar_csv_diario(df_chuva_recente, nome_arquivo_diario)
-        else:
+        registros = buscar_registros_cemaden(token_acesso, estacoes_de_recife, sessao=sessao)
+
+        if not registros:
             print("Nenhum dado novo foi retornado pela API.")
+        processar_coleta(registros, datetime.now(FUSO_RECIFE))
     else:
         print("Falha ao obter token do Cemaden, finalizando a execução.")
 
@@ -0,0 +1,175 @@
+# Arquivo: backfill_risco.py
+"""
+Reprocessamento (backfill) do risco para um intervalo de datas, em vários processos.
+
+O intervalo é dividido em blocos de um dia ou de uma semana. Cada bloco é
+calculado num processo do pool: o operador de VP é preparado com o dia
+anterior ao bloco (para as janelas da madrugada) e os dias são consumidos em
+ordem, como no CLI diário. O processo principal grava cada bloco concluído no
+histórico particionado (resultados_risco) e registra o bloco no checkpoint;
+só os blocos em andamento ficam em memória. Interrompido, o comando retoma do
+checkpoint se for chamado com os mesmos parâmetros.
+
+As leituras vêm do arquivo de chuva (dados_chuva) quando ele existe, ou dos
+CSVs diários chuva_recife_*.csv.
+
+Uso:
+    python backfill_risco.py 2025-10-01 2026-01-31 --processos 4
+    python backfill_risco.py 2025-10-01 2025-10-31 --bloco dia --estacoes "Torreão" "Imbiribeira"
+"""
+import os
+import sys
+import json
+import argparse
+from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import pandas as pd
+
+from arquivo_chuva import ArquivoChuva, DIRETORIO_ARQUIVO
+from calcular_risco_cli import calcular_risco_dia
+from mare import carregar_fonte_am
+from estacoes import nomes_monitorados
+from motor_vp import OperadorVPStreaming
+from resultados_risco import ArmazemRisco, DIRETORIO_RESULTADOS
+from esquema import concatenar_risco, ler_leituras_csv
+
+NOME_CHECKPOINT = 'backfill_checkpoint.json'
+DIAS_POR_BLOCO = {'dia': 1, 'semana': 7}
+
+
+def dividir_em_blocos(data_inicial, data_final, bloco='semana'):
+    """ Lista de (primeiro dia, último dia) cobrindo o intervalo, em blocos de 1 ou 7 dias. """
+    dias = pd.date_range(data_inicial, data_final, freq='D')
+    passo = DIAS_POR_BLOCO[bloco]
+    return [(dias[i].strftime('%Y-%m-%d'), dias[min(i + passo, len(dias)) - 1].strftime('%Y-%m-%d'))
+            for i in range(0, len(dias), passo)]
+
+
+def ler_leituras_dia(dia, fonte, diretorio):
+    """ Leituras de chuva do dia (colunas datahora, nomeEstacao, valorMedida) ou um DataFrame vazio. """
+    if fonte == 'arquivo':
+        df = ArquivoChuva(diretorio).ler_intervalo(dia, dia)
+        df['nomeEstacao'] = df['nomeEstacao'].astype(object)
+        return df
+    caminho = os.path.join(diretorio, f"chuva_recife_{dia}.csv")
+    if not os.path.exists(caminho):
+        return pd.DataFrame()
+    return ler_leituras_csv(caminho, renomear=True)
+
+
+def processar_bloco(tarefa):
+    """ Executado no pool: calcula o risco dos dias do bloco e devolve (bloco, resultado, dias sem dados). """
+    primeiro, ultimo = tarefa['bloco']
+    estacoes = tarefa['estacoes']
+    tabua_mare = carregar_fonte_am()
+    operador = OperadorVPStreaming()
+
+    # O dia anterior só prepara a cauda do operador; as linhas dele não entram no resultado
+    anterior = (pd.Timestamp(primeiro) - timedelta(days=1)).strftime('%Y-%m-%d')
+    df_anterior = ler_leituras_dia(anterior, tarefa['fonte'], tarefa['diretorio'])
+    if not df_anterior.empty:
+        calcular_risco_dia(df_anterior, anterior, tabua_mare, operador, estacoes)
+
+    partes, sem_dados = [], []
+    for dia in pd.date_range(primeiro, ultimo, freq='D').strftime('%Y-%m-%d'):
+        df_dia = ler_leituras_dia(dia, tarefa['fonte'], tarefa['diretorio'])
+        df_risco = calcular_risco_dia(df_dia, dia, tabua_mare, operador, estacoes) if not df_dia.empty else pd.DataFrame()
+        if df_risco.empty:
+            sem_dados.append(dia)
+        else:
+            partes.append(df_risco)
+    resultado = concatenar_risco(partes)
+    return tarefa['bloco'], resultado, sem_dados
+
+
+# --- Checkpoint ---
+
+def carregar_checkpoint(caminho, parametros):
+    """ Blocos já concluídos por uma execução anterior com os mesmos parâmetros. """
+    if not os.path.exists(caminho):
+        return set()
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        print(f"⚠️ Checkpoint '{caminho}' ilegível ({e}). O backfill começa do início.", file=sys.stderr)
+        return set()
+    if checkpoint.get('parametros') != parametros:
+        print("⚠️ Checkpoint de outra execução (parâmetros diferentes). O backfill começa do início.", file=sys.stderr)
+        return set()
+    return {tuple(b) for b in checkpoint.get('concluidos', [])}
+
+
+def salvar_checkpoint(caminho, parametros, concluidos):
+    """ Grava o checkpoint de forma atômica (arquivo temporário + rename). """
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump({'parametros': parametros, 'concluidos': sorted(concluidos)}, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recalcula o risco de um intervalo de datas em paralelo.")
+    parser.add_argument('data_inicial', help="Primeiro dia (AAAA-MM-DD).")
+    parser.add_argument('data_final', help="Último dia (AAAA-MM-DD), inclusive.")
+    parser.add_argument('--estacoes', nargs='+', default=nomes_monitorados(),
+                        help="Estações a recalcular (padrão: as monitoradas em registro_estacoes.json).")
+    parser.add_argument('--bloco', choices=sorted(DIAS_POR_BLOCO), default='semana',
+                        help="Tamanho de cada unidade de trabalho (padrão: semana).")
+    parser.add_argument('--processos', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--fonte', choices=['auto', 'arquivo', 'csv'], default='auto',
+                        help="De onde ler as leituras (padrão: arquivo de chuva se existir, senão CSVs).")
+    parser.add_argument('--diretorio', help="Diretório da fonte (padrão: dados_chuva ou o diretório atual).")
+    parser.add_argument('--resultados', default=DIRETORIO_RESULTADOS)
+    parser.add_argument('--checkpoint', default=NOME_CHECKPOINT)
+    parser.add_argument('--recomecar', action='store_true', help="Ignora o checkpoint existente.")
+    args = parser.parse_args(argv)
+
+    fonte = args.fonte
+    if fonte == 'auto':
+        fonte = 'arquivo' if ArquivoChuva(args.diretorio or DIRETORIO_ARQUIVO).particoes() else 'csv'
+    diretorio = args.diretorio or (DIRETORIO_ARQUIVO if fonte == 'arquivo' else '.')
+
+    # Sem constantes harmônicas, a tábua do CSV é compilada uma vez aqui e os
+    # processos só abrem o .npy em memória mapeada
+    if carregar_fonte_am() is None:
+        print("Erro: Maré vazia")
+        sys.exit(1)
+
+    parametros = {'data_inicial': args.data_inicial, 'data_final': args.data_final, 'estacoes': sorted(args.estacoes),
+                  'bloco': args.bloco, 'fonte': fonte, 'diretorio': os.path.abspath(diretorio)}
+    concluidos = set() if args.recomecar else carregar_checkpoint(args.checkpoint, parametros)
+    blocos = [b for b in dividir_em_blocos(args.data_inicial, args.data_final, args.bloco) if b not in concluidos]
+    print(f"Backfill {args.data_inicial} a {args.data_final} ({fonte}: {diretorio}): "
+          f"{len(blocos)} bloco(s) a processar, {len(concluidos)} já concluído(s), {args.processos} processo(s).")
+
+    armazem = ArmazemRisco(args.resultados)
+    tarefas = iter({'bloco': b, 'estacoes': args.estacoes, 'fonte': fonte, 'diretorio': diretorio} for b in blocos)
+    total_linhas = 0
+    with ProcessPoolExecutor(max_workers=args.processos) as executor:
+        # No máximo dois blocos por processo em andamento: a memória não cresce com o intervalo
+        pendentes = set()
+        while True:
+            while len(pendentes) < 2 * args.processos:
+                tarefa = next(tarefas, None)
+                if tarefa is None:
+                    break
+                pendentes.add(executor.submit(processar_bloco, tarefa))
+            if not pendentes:
+                break
+            prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                bloco, resultado, sem_dados = futuro.result()
+                meses = armazem.upsert(resultado)
+                total_linhas += len(resultado)
+                concluidos.add(bloco)
+                salvar_checkpoint(args.checkpoint, parametros, concluidos)
+                aviso = f" ({len(sem_dados)} dia(s) sem dados)" if sem_dados else ""
+                print(f"-> Bloco {bloco[0]} a {bloco[1]}: {len(resultado)} linha(s) em {meses}{aviso}")
+
+    print(f"✅ Backfill concluído: {total_linhas} linha(s) gravada(s) em '{args.resultados}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# Arquivo: benchmarks/executar_benchmarks.py
+"""
+Benchmarks das etapas críticas do pipeline de risco sobre dados sintéticos.
+
+Para cada cenário (estações x dias) mede o tempo (melhor de N repetições),
+a vazão em linhas por segundo e o pico de memória (tracemalloc) de:
+VP diário em fluxo (processar_chuva_arquivo), VP x AM + calcular_risco,
+acréscimo ao CSV diário (atualizar_csv_diario), arquivo de chuva
+(ArquivoChuva.anexar), leitura e consulta da tábua de maré e montagem das
+figuras do painel (criar_figura_risco).
+
+Os resultados são comparados com benchmarks/baseline.json: uma etapa regride
+quando a vazão cai ou o pico de memória sobe além da tolerância.
+
+Uso:
+    python benchmarks/executar_benchmarks.py                 # compara com a baseline
+    python benchmarks/executar_benchmarks.py --salvar        # grava a baseline
+    python benchmarks/executar_benchmarks.py --cenario estadual
+"""
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import calcular_risco_cli
+from motor_vp import OperadorVPStreaming
+from mare import interpretar_csv_mare, compilar_tabua, carregar_tabua_mare
+from mare_harmonica import PrevisorMare, ajustar_constantes
+from arquivo_chuva import ArquivoChuva
+from atualizar_dados import atualizar_csv_diario
+from risco_hoje import executar_analise_risco_completa, criar_figura_risco
+from gerador_sintetico import gerar_leituras, gerar_mare, mare_para_csv, nomes_estacoes
+
+CAMINHO_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+CENARIOS = {
+    'pequeno': (5, 2),
+    'medio': (50, 7),
+    'estadual': (300, 7),
+}
+TOLERANCIA = 0.30
+
+
+def medir(funcao, linhas, repeticoes):
+    """ Melhor tempo de repeticoes execuções, vazão e pico de memória (numa execução extra, com tracemalloc). """
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            funcao()
+        tempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    melhor = min(tempos)
+    return {'linhas': linhas, 'segundos': round(melhor, 4),
+            'linhas_por_s': round(linhas / melhor, 1), 'pico_mb': round(pico / 2**20, 2)}
+
+
+def etapas(n_estacoes, n_dias, diretorio):
+    """ Monta os dados do cenário e devolve {nome da etapa: (função, linhas processadas)}. """
+    df_feed = gerar_leituras(n_estacoes, n_dias)
+    df_chuva = df_feed.rename(columns={'nome': 'nomeEstacao', 'valor': 'valorMedida'})
+    dias = sorted(df_chuva['datahora'].str.slice(0, 10).unique())
+    texto_mare = mare_para_csv(gerar_mare(n_dias + 1))
+    caminho_mare = os.path.join(diretorio, 'mare.csv')
+    with open(caminho_mare, 'w', encoding='utf-8') as f:
+        f.write(texto_mare)
+    tabua = carregar_tabua_mare(caminho_mare, os.path.join(diretorio, 'mare.npy'), os.path.join(diretorio, 'mare.json'))
+
+    # O CLI só calcula as estações configuradas; no benchmark são todas as sintéticas
+    calcular_risco_cli.ESTACOES_DESEJADAS = nomes_estacoes(n_estacoes)
+
+    def vp_em_fluxo():
+        operador = OperadorVPStreaming()
+        return pd.concat([calcular_risco_cli.processar_chuva_arquivo(df_chuva, dia, operador) for dia in dias],
+                         ignore_index=True)
+
+    df_vp = vp_em_fluxo()
+    df_risco = executar_analise_risco_completa(df_vp, tabua)
+    grupos = [grupo for _, grupo in df_risco.groupby([df_risco['datahora'].dt.normalize(), 'nomeEstacao'], observed=True)]
+
+    def csv_diario():
+        caminho = os.path.join(diretorio, 'chuva_recife_bench.csv')
+        if os.path.exists(caminho):
+            os.remove(caminho)
+        # Um lote por hora, como a coleta acumulando o dia
+        for _, lote in df_feed.groupby(df_feed['datahora'].str.slice(0, 13), sort=False):
+            atualizar_csv_diario(lote, caminho)
+
+    def arquivo_chuva():
+        destino = tempfile.mkdtemp(dir=diretorio)
+        ArquivoChuva(destino).anexar(df_feed)
+
+    def tabua_fria():
+        compilar_tabua(*interpretar_csv_mare(texto_mare))
+
+    serie = gerar_mare(n_dias + 1)
+    constantes = ajustar_constantes(serie['datahora'].to_numpy(), serie['AM'].to_numpy())
+
+    def previsao_harmonica():
+        # Previsor novo a cada execução: mede o cálculo dos meses, não o cache
+        PrevisorMare(constantes).am(df_vp['datahora'])
+
+    def tabua_compilada():
+        carregar_tabua_mare(caminho_mare, os.path.join(diretorio, 'mare.npy'), os.path.join(diretorio, 'mare.json'))
+
+    return {
+        'processar_chuva_arquivo': (vp_em_fluxo, len(df_chuva)),
+        'vp_x_am_calcular_risco': (lambda: executar_analise_risco_completa(df_vp, tabua), len(df_vp)),
+        'atualizar_csv_diario': (csv_diario, len(df_feed)),
+        'arquivo_chuva_anexar': (arquivo_chuva, len(df_feed)),
+        'mare_interpretar_csv': (tabua_fria, texto_mare.count('\n')),
+        'mare_carregar_compilada': (tabua_compilada, len(tabua)),
+        'mare_consulta_am': (lambda: tabua.am(df_vp['datahora']), len(df_vp)),
+        'mare_harmonica_am': (previsao_harmonica, len(df_vp)),
+        'criar_figuras': (lambda: [criar_figura_risco(g, g['nomeEstacao'].iloc[0]) for g in grupos], len(df_risco)),
+    }
+
+
+def comparar(resultados, baseline, tolerancia):
+    """ Lista de regressões (cenário, etapa, descrição) em relação à baseline. """
+    regressoes = []
+    for cenario, medidas in resultados.items():
+        for etapa, atual in medidas.items():
+            referencia = baseline.get(cenario, {}).get(etapa)
+            if not referencia:
+                continue
+            if atual['linhas_por_s'] < referencia['linhas_por_s'] * (1 - tolerancia):
+                regressoes.append((cenario, etapa, f"vazão {atual['linhas_por_s']:.0f} < {referencia['linhas_por_s']:.0f} linhas/s"))
+            if atual['pico_mb'] > referencia['pico_mb'] * (1 + tolerancia) + 1:
+                regressoes.append((cenario, etapa, f"pico {atual['pico_mb']:.1f} > {referencia['pico_mb']:.1f} MB"))
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline de risco com dados sintéticos.")
+    parser.add_argument('--cenario', action='append', choices=sorted(CENARIOS),
+                        help="Cenário a executar (pode repetir). Padrão: pequeno e medio.")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--salvar', action='store_true', help="Grava os resultados como nova baseline.")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA)
+    parser.add_argument('--baseline', default=CAMINHO_BASELINE)
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    for cenario in args.cenario or ['pequeno', 'medio']:
+        n_estacoes, n_dias = CENARIOS[cenario]
+        print(f"-> Cenário '{cenario}': {n_estacoes} estações x {n_dias} dias")
+        resultados[cenario] = {}
+        with tempfile.TemporaryDirectory() as diretorio:
+            for etapa, (funcao, linhas) in etapas(n_estacoes, n_dias, diretorio).items():
+                medida = medir(funcao, linhas, args.repeticoes)
+                resultados[cenario][etapa] = medida
+                print(f"   {etapa:<26} {medida['segundos']:>9.4f} s {medida['linhas_por_s']:>13,.0f} linhas/s {medida['pico_mb']:>9.2f} MB")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    if args.salvar:
+        baseline.update(resultados)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"✅ Baseline gravada em '{args.baseline}'.")
+        return
+
+    regressoes = comparar(resultados, baseline, args.tolerancia)
+    for cenario, etapa, descricao in regressoes:
+        print(f"❌ Regressão em {cenario}/{etapa}: {descricao}", file=sys.stderr)
+    if regressoes:
+        sys.exit(1)
+    print("✅ Nenhuma regressão em relação à baseline." if baseline else "Sem baseline para comparar (use --salvar).")
+
+
+if __name__ == "__main__":
+    main()
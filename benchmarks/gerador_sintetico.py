@@ -0,0 +1,123 @@
+# Arquivo: benchmarks/gerador_sintetico.py
+"""
+Gerador de dados sintéticos no formato do CEMADEN e da tábua de maré.
+
+As leituras imitam o feed real: uma linha por estação a cada 10 minutos, com
+as mesmas colunas dos arquivos chuva_recife_*.csv, chuvas em eventos com
+correlação regional, e os defeitos que o feed costuma ter (leituras
+faltando, linhas repetidas e linhas fora de ordem). A maré é uma soma de
+componentes semidiurnas e diurnas, no formato do CSV horário (';' e vírgula
+decimal).
+
+Uso em linha de comando:
+    python benchmarks/gerador_sintetico.py --estacoes 50 --dias 7 --saida /tmp/sintetico
+"""
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+COLUNAS_CEMADEN = ['cidade', 'codestacao', 'datahora', 'id_sensor', 'latitude', 'longitude',
+                   'nome', 'offset', 'qualificacao', 'uf', 'valor']
+PASSOS_POR_DIA = 144  # leituras de 10 em 10 minutos
+
+
+def nomes_estacoes(n_estacoes):
+    return [f"Estação Sintética {i:04d}" for i in range(n_estacoes)]
+
+
+def gerar_leituras(n_estacoes, n_dias, inicio='2026-01-01', semente=0,
+                   fracao_falhas=0.02, fracao_repetidas=0.01, fracao_fora_de_ordem=0.01):
+    """ DataFrame de leituras de chuva (colunas do CEMADEN) para n_estacoes ao longo de n_dias. """
+    rng = np.random.default_rng(semente)
+    n_passos = n_dias * PASSOS_POR_DIA
+    tempos = pd.Timestamp(inicio) + pd.to_timedelta(np.arange(n_passos) * 10, unit='min')
+
+    # Eventos de chuva regionais (início aleatório, ~2 h de duração) modulados por estação
+    inicios_evento = (rng.random(n_passos) < 0.01).astype(float)
+    regional = np.convolve(inicios_evento, np.ones(12), mode='full')[:n_passos] > 0
+    fator_estacao = rng.uniform(0.3, 1.5, n_estacoes)
+    intensidade = rng.gamma(0.6, 1.5, (n_estacoes, n_passos)) * fator_estacao[:, None]
+    local = rng.random((n_estacoes, n_passos)) < 0.02
+    valores = np.where(regional[None, :] | local, intensidade, 0.0).round(10)
+
+    estacao = np.repeat(np.arange(n_estacoes), n_passos)
+    passo = np.tile(np.arange(n_passos), n_estacoes)
+    mantidas = rng.random(len(estacao)) >= fracao_falhas
+    estacao, passo = estacao[mantidas], passo[mantidas]
+
+    # Ordem do feed: por instante, estações misturadas; depois repetições e trocas locais
+    ordem = np.lexsort((rng.random(len(passo)), passo))
+    estacao, passo = estacao[ordem], passo[ordem]
+    repetidas = np.flatnonzero(rng.random(len(estacao)) < fracao_repetidas)
+    estacao = np.insert(estacao, repetidas, estacao[repetidas])
+    passo = np.insert(passo, repetidas, passo[repetidas])
+    trocas = np.flatnonzero(rng.random(len(estacao) - 1) < fracao_fora_de_ordem)
+    estacao[trocas], estacao[trocas + 1] = estacao[trocas + 1], estacao[trocas].copy()
+    passo[trocas], passo[trocas + 1] = passo[trocas + 1], passo[trocas].copy()
+
+    nomes = np.array(nomes_estacoes(n_estacoes), dtype=object)
+    codigos = np.array([f"26116{i:05d}A" for i in range(n_estacoes)], dtype=object)
+    latitudes = rng.uniform(-9.4, -7.3, n_estacoes).round(6)
+    longitudes = rng.uniform(-41.0, -34.8, n_estacoes).round(6)
+    return pd.DataFrame({
+        'cidade': 'RECIFE',
+        'codestacao': codigos[estacao],
+        'datahora': tempos[passo].strftime('%Y-%m-%d %H:%M:%S'),
+        'id_sensor': 10,
+        'latitude': latitudes[estacao],
+        'longitude': longitudes[estacao],
+        'nome': nomes[estacao],
+        'offset': np.nan,
+        'qualificacao': rng.choice([0, 4], len(estacao), p=[0.9, 0.1]),
+        'uf': 'PE',
+        'valor': valores[estacao, passo],
+    }, columns=COLUNAS_CEMADEN)
+
+
+def gerar_mare(n_dias, inicio='2026-01-01', semente=0):
+    """ Série horária de altura de maré (m): colunas datahora e AM. """
+    rng = np.random.default_rng(semente)
+    horas = np.arange(n_dias * 24)
+    altura = (1.3 + 0.9 * np.cos(2 * np.pi * horas / 12.42) + 0.25 * np.cos(2 * np.pi * horas / 12.0 + 1.0)
+              + 0.1 * np.cos(2 * np.pi * horas / 23.93 + 0.5) + rng.normal(0, 0.02, len(horas)))
+    return pd.DataFrame({'datahora': pd.Timestamp(inicio) + pd.to_timedelta(horas, unit='h'), 'AM': altura.round(2)})
+
+
+def mare_para_csv(df_mare):
+    """ Texto no formato de tide/mare_calculada_hora_em_hora_ano-completo.csv. """
+    linhas = ["Hora_Exata;Altura_m"]
+    linhas += [f"{d:%Y-%m-%d %H:%M:%S};{str(a).replace('.', ',')}" for d, a in zip(df_mare['datahora'], df_mare['AM'])]
+    return "\n".join(linhas) + "\n"
+
+
+def salvar_dias(df_leituras, diretorio):
+    """ Grava um chuva_recife_AAAA-MM-DD.csv por dia, como a coleta faz. Devolve os caminhos. """
+    os.makedirs(diretorio, exist_ok=True)
+    caminhos = []
+    for dia, df_dia in df_leituras.groupby(df_leituras['datahora'].str.slice(0, 10), sort=True):
+        caminho = os.path.join(diretorio, f"chuva_recife_{dia}.csv")
+        df_dia.to_csv(caminho, index=False)
+        caminhos.append(caminho)
+    return caminhos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera leituras de chuva e maré sintéticas.")
+    parser.add_argument('--estacoes', type=int, default=50)
+    parser.add_argument('--dias', type=int, default=7)
+    parser.add_argument('--inicio', default='2026-01-01')
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--saida', required=True, help="Diretório onde gravar os CSVs.")
+    args = parser.parse_args(argv)
+
+    df = gerar_leituras(args.estacoes, args.dias, args.inicio, args.semente)
+    caminhos = salvar_dias(df, args.saida)
+    with open(os.path.join(args.saida, 'mare_sintetica.csv'), 'w', encoding='utf-8') as f:
+        f.write(mare_para_csv(gerar_mare(args.dias + 1, args.inicio, args.semente)))
+    print(f"✅ {len(df)} leituras em {len(caminhos)} arquivo(s) e maré sintética em '{args.saida}'.")
+
+
+if __name__ == "__main__":
+    main()
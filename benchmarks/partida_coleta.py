@@ -0,0 +1,174 @@
+# Arquivo: benchmarks/partida_coleta.py
+"""
+Tempo de partida da coleta (atualizar_dados.py), medido em processos novos.
+
+Compara o núcleo só com a biblioteca padrão (ingestao_leve.py, usado por
+registrar_registros) com o caminho com pandas (converter_para_fuso_recife +
+registrar_leituras), ambos a partir dos mesmos registros da API sobre um
+arquivo de chuva já existente:
+
+    importacao   só os imports que cada caminho precisa
+    coleta       imports + gravação de uma coleta (arquivo de chuva e CSV do dia)
+    execucao     a execução inteira depois da busca (processar_coleta): gravação,
+                 alertas e publicação de risco_hoje.json
+    sem_novas    a mesma execução repetida, quando a API só devolve leituras já gravadas
+
+Com leituras novas, alertas e artefato importam o pandas nos dois caminhos, então
+o ganho da execução inteira é bem menor que o da gravação; sem leituras novas o
+caminho leve fica só na biblioteca padrão.
+
+Cada repetição roda num diretório copiado do mesmo estado inicial; os arquivos
+gravados pelos dois caminhos são comparados byte a byte (do artefato, só as linhas,
+já que o cabeçalho traz o horário de geração).
+
+Uso:
+    python benchmarks/partida_coleta.py
+    python benchmarks/partida_coleta.py --estacoes 300 --repeticoes 10
+"""
+import os
+import io
+import sys
+import json
+import glob
+import shutil
+import argparse
+import tempfile
+import subprocess
+import time
+import contextlib
+
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from gerador_sintetico import gerar_leituras, salvar_dias, nomes_estacoes
+
+# Imports que atualizar_dados.py fazia no topo antes do núcleo leve
+IMPORTACAO = {
+    'pandas': "import atualizar_dados, pandas, pytz, arquivo_chuva, alertas_risco, esquema, risco_painel",
+    'leve': "import atualizar_dados",
+}
+COLETA = """
+import sys, json
+from datetime import datetime
+raiz, modo, agora, execucao = sys.argv[1:]
+sys.path.insert(0, raiz)
+import atualizar_dados
+from ingestao_leve import FUSO_RECIFE
+with open('registros.json', 'r', encoding='utf-8') as f:
+    registros = json.load(f)
+agora = datetime.strptime(agora, '%Y-%m-%d %H:%M').replace(tzinfo=FUSO_RECIFE)
+if modo == 'leve':
+    if execucao == '1':
+        atualizar_dados.processar_coleta(registros, agora)
+    else:
+        atualizar_dados.registrar_registros(registros, agora)
+else:
+    import pandas as pd
+    df = atualizar_dados.converter_para_fuso_recife(pd.DataFrame(registros))
+    df = atualizar_dados.registrar_leituras(df, atualizar_dados.abrir_arquivo_chuva(), agora)
+    if execucao == '1':
+        from alertas_risco import AvaliadorAlertas
+        avaliador = AvaliadorAlertas()
+        atualizar_dados.avaliar_alertas(avaliador, df)
+        atualizar_dados.publicar_risco_hoje(agora, avaliador, houve_leituras_novas=not df.empty)
+"""
+
+
+def preparar(diretorio, n_estacoes):
+    """
+    Estado inicial: dois dias de leituras no arquivo de chuva e nos CSVs diários e, em
+    registros.json, a resposta da API da próxima coleta (as últimas 24 h, já gravadas,
+    mais um passo de 10 min novo). Devolve o horário da coleta e o número de registros.
+    """
+    df = gerar_leituras(n_estacoes, 2, inicio='2026-01-27')
+    # As primeiras estações recebem os nomes monitorados, para o artefato ter o que calcular
+    from estacoes import nomes_monitorados
+    nomes = dict(zip(nomes_estacoes(n_estacoes), nomes_monitorados()))
+    df['nome'] = df['nome'].map(lambda nome: nomes.get(nome, nome))
+    ultimo = df['datahora'].max()
+    gravadas = df[df['datahora'] < ultimo]
+    salvar_dias(gravadas, diretorio)
+
+    anterior = os.getcwd()
+    os.chdir(diretorio)
+    try:
+        from atualizar_dados import abrir_arquivo_chuva
+        with contextlib.redirect_stdout(io.StringIO()):
+            abrir_arquivo_chuva()
+    finally:
+        os.chdir(anterior)
+
+    recentes = df[pd.to_datetime(df['datahora']) > pd.Timestamp(ultimo) - pd.Timedelta('24h')]
+    em_utc = pd.to_datetime(recentes['datahora']).dt.tz_localize('America/Recife').dt.tz_convert('UTC')
+    recentes = recentes.assign(datahora=em_utc.dt.strftime('%Y-%m-%d %H:%M:%S.0'))
+    registros = recentes.astype(object).where(recentes.notna(), None).to_dict('records')
+    with open(os.path.join(diretorio, 'registros.json'), 'w', encoding='utf-8') as f:
+        json.dump(registros, f)
+    return (pd.Timestamp(ultimo) + pd.Timedelta('5min')).strftime('%Y-%m-%d %H:%M'), len(registros)
+
+
+def executar(argumentos, diretorio):
+    inicio = time.perf_counter()
+    subprocess.run([sys.executable, *argumentos], cwd=diretorio, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - inicio
+
+
+def conteudo(diretorio):
+    """ Bytes de cada arquivo gravado pela coleta; do artefato, só as linhas. """
+    caminhos = (glob.glob(os.path.join(diretorio, '*.csv')) + glob.glob(os.path.join(diretorio, 'dados_chuva', '*'))
+                + glob.glob(os.path.join(diretorio, 'estado_alertas.json')))
+    resultado = {}
+    for caminho in sorted(caminhos):
+        with open(caminho, 'rb') as f:
+            resultado[os.path.relpath(caminho, diretorio)] = f.read()
+    artefato = os.path.join(diretorio, 'risco_hoje.json')
+    if os.path.exists(artefato):
+        with open(artefato, 'r', encoding='utf-8') as f:
+            resultado['risco_hoje.json'] = json.dumps(json.load(f)['linhas']).encode('utf-8')
+    return resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tempo de partida da coleta, com e sem pandas.")
+    parser.add_argument('--estacoes', type=int, default=30)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as base:
+        estado = os.path.join(base, 'estado')
+        os.makedirs(estado)
+        agora, n_registros = preparar(estado, args.estacoes)
+        print(f"-> {args.estacoes} estações, {n_registros} registros na coleta, melhor de {args.repeticoes}")
+
+        medidas, arquivos = {}, {}
+        for modo in ('pandas', 'leve'):
+            importacao, coleta, execucao, sem_novas = [], [], [], []
+            for i in range(args.repeticoes):
+                diretorio = os.path.join(base, f"{modo}_{i}")
+                shutil.copytree(estado, diretorio)
+                importacao.append(executar(['-c', f"import sys; sys.path.insert(0, {RAIZ!r}); {IMPORTACAO[modo]}"], diretorio))
+                coleta.append(executar(['-c', COLETA, RAIZ, modo, agora, '0'], diretorio))
+                diretorio = os.path.join(base, f"{modo}_execucao_{i}")
+                shutil.copytree(estado, diretorio)
+                execucao.append(executar(['-c', COLETA, RAIZ, modo, agora, '1'], diretorio))
+                sem_novas.append(executar(['-c', COLETA, RAIZ, modo, agora, '1'], diretorio))
+            medidas[modo] = (min(importacao), min(coleta), min(execucao), min(sem_novas))
+            arquivos[modo] = conteudo(diretorio)
+            print(f"   {modo:<8} importação {medidas[modo][0]:>7.3f} s   coleta {medidas[modo][1]:>7.3f} s"
+                  f"   execução {medidas[modo][2]:>7.3f} s   sem novas {medidas[modo][3]:>7.3f} s")
+
+    ganho = [medidas['pandas'][i] / medidas['leve'][i] for i in (1, 2, 3)]
+    print(f"   sem pandas: coleta {ganho[0]:.1f}x mais rápida; execução inteira {ganho[1]:.2f}x "
+          f"com leituras novas e {ganho[2]:.1f}x sem leituras novas")
+    if arquivos['pandas'] != arquivos['leve']:
+        diferentes = sorted(k for k in arquivos['pandas'].keys() | arquivos['leve'].keys()
+                            if arquivos['pandas'].get(k) != arquivos['leve'].get(k))
+        print(f"❌ Arquivos diferentes entre os caminhos: {', '.join(diferentes)}", file=sys.stderr)
+        sys.exit(1)
+    print(f"✅ Arquivos idênticos nos dois caminhos ({len(arquivos['leve'])} arquivo(s)).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,104 +1,300 @@
-"""import os
+import os
 import sys
 import requests
 import pandas as pd
-import numpy as np
 import glob
 import re
-from datetime import datetime
+import json
+import hashlib
+import shutil
+import argparse
+from datetime import datetime, timedelta
 from pytz import timezone
 from io import StringIO
+from motor_vp import OperadorVPStreaming
+from mare import carregar_fonte_am, URL_ARQUIVO_MARE_AM
+from resultados_risco import ArmazemRisco, DIRETORIO_RESULTADOS
+from esquema import (COLUNAS_RISCO, classificar, tipar_risco, concatenar_risco, ler_risco_csv,
+                     escrever_risco_csv, ler_leituras_csv)
+from instrumentacao import etapa
+from estacoes import nomes_monitorados
 
 URL_ARQUIVO_HISTORICO = 'https://raw.githubusercontent.com/RafaellaB/Painel-Diagrama-de-Risco/main/resultado_risco_final.csv'
-URL_ARQUIVO_MARE_AM = 'https://raw.githubusercontent.com/RafaellaB/Diagramas-de-risco-din-mico/main/tide/mare_calculada_hora_em_hora_ano-completo.csv'
 NOME_ARQUIVO_SAIDA_FINAL = 'resultado_risco_final.csv'
+NOME_ARQUIVO_MANIFESTO = 'manifesto_risco.json'
 CSV_DELIMITADOR = ','
-ESTACOES_DESEJADAS = ["Campina do Barreto", "Torreão", "RECIFE - APAC", "Imbiribeira", "Dois Irmãos"]
+# Estações marcadas como monitoradas em registro_estacoes.json
+ESTACOES_DESEJADAS = nomes_monitorados()
 
-def carregar_dados_mare(url_am_data):
-    try:
-        df_am_raw = pd.read_csv(url_am_data, sep=';', decimal=',')
-        df_am_raw.rename(columns={'Hora_Exata': 'datahora', 'Altura_m': 'AM'}, inplace=True)
-        if 'datahora' not in df_am_raw.columns:
-            raise KeyError("Coluna 'Hora_Exata' não encontrada.")
-        df_am_raw['datahora'] = pd.to_datetime(df_am_raw['datahora'])
-        df_am_raw['data'] = df_am_raw['datahora'].dt.strftime('%Y-%m-%d')
-        df_am_raw['hora_ref'] = df_am_raw['datahora'].dt.strftime('%H:00:00')
-        
-        return df_am_raw[['data', 'hora_ref', 'AM']]
-    except Exception as e:
-        print(f"ERRO Maré: {e}", file=sys.stderr)
-        return pd.DataFrame()
-
-def processar_chuva_arquivo(df_chuva, data_alvo):
-    df = df_chuva[df_chuva['nomeEstacao'].isin(ESTACOES_DESEJADAS)].copy()
+def processar_chuva_arquivo(df_chuva, data_alvo, operador=None, estacoes=None):
+    """
+    VP horário do dia data_alvo. Com um operador que já consumiu o dia anterior
+    (ou foi semeado com a cauda dele), as janelas de 2 h da madrugada incluem a
+    chuva da noite anterior. estacoes substitui ESTACOES_DESEJADAS.
+    """
+    operador = operador or OperadorVPStreaming()
+    df = df_chuva[df_chuva['nomeEstacao'].isin(estacoes or ESTACOES_DESEJADAS)].copy()
     df['datahora'] = pd.to_datetime(df['datahora'])
-    df['data_str'] = df['datahora'].dt.strftime('%Y-%m-%d')
-    df = df[df['data_str'] == data_alvo]
+    df = df[df['datahora'].dt.normalize() == pd.Timestamp(data_alvo)]
     if df.empty: return pd.DataFrame()
     
-    df = df.set_index('datahora').sort_index()
-    resultados = []
-    for estacao, grupo in df.groupby('nomeEstacao'):
-        chuva_10min = grupo['valorMedida'].rolling('10min').sum()
-        chuva_2h = grupo['valorMedida'].rolling('2h').sum()
-        temp = pd.DataFrame({'chuva_10min': chuva_10min, 'chuva_2h': chuva_2h})
-        agregado = temp.resample('h').last()
-        agregado['VP'] = (agregado['chuva_10min'] * 6) + agregado['chuva_2h']
-        agregado['nomeEstacao'] = estacao
-        resultados.append(agregado)
-    df_vp = pd.concat(resultados).reset_index()
-    df_vp['data'] = df_vp['datahora'].dt.strftime('%Y-%m-%d')
-    df_vp['hora_ref'] = df_vp['datahora'].dt.strftime('%H:00:00')
-    return df_vp[['data', 'hora_ref', 'nomeEstacao', 'VP']]
+    with etapa('vp_horario', data=str(data_alvo), linhas_entrada=len(df)) as m:
+        df_vp = pd.concat([operador.consumir(df), operador.fechar()], ignore_index=True)
+        m.registrar(linhas_saida=len(df_vp))
+    # A grade horária do dia continua indo da primeira à última leitura do dia em cada
+    # estação; a cauda do dia anterior só entra nas janelas, não gera horas vazias
+    primeira_hora = df.groupby('nomeEstacao')['datahora'].min().dt.floor('h')
+    df_vp = df_vp[df_vp['datahora'] >= df_vp['nomeEstacao'].map(primeira_hora)]
+    if df_vp.empty: return pd.DataFrame()
+    return df_vp[['datahora', 'nomeEstacao', 'VP']]
 
-if __name__ == "__main__":
-    print("Iniciando Nova Versão do Script de Risco (Varredura de Arquivos)...")
-    
-    df_am = carregar_dados_mare(URL_ARQUIVO_MARE_AM)
-    if df_am.empty: 
+
+
+# --- Manifesto de arquivos processados (modo incremental) ---
+
+def assinatura_arquivo(caminho):
+    """ Calcula tamanho e hash SHA-256 do conteúdo de um arquivo. """
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 16), b''):
+            sha.update(bloco)
+    return {'tamanho': os.path.getsize(caminho), 'sha256': sha.hexdigest()}
+
+def carregar_manifesto(caminho=NOME_ARQUIVO_MANIFESTO):
+    """ Lê o manifesto persistido. Retorna um manifesto vazio se não existir ou estiver corrompido. """
+    if not os.path.exists(caminho):
+        return {'versao': 1, 'arquivos': {}}
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            manifesto = json.load(f)
+        manifesto.setdefault('arquivos', {})
+        return manifesto
+    except (json.JSONDecodeError, OSError) as e:
+        print(f"⚠️ Manifesto '{caminho}' ilegível ({e}). Todos os arquivos serão reprocessados.", file=sys.stderr)
+        return {'versao': 1, 'arquivos': {}}
+
+def salvar_manifesto(manifesto, caminho=NOME_ARQUIVO_MANIFESTO):
+    """ Grava o manifesto de forma atômica (arquivo temporário + rename). """
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(temporario, caminho)
+
+def arquivo_alterado(caminho, manifesto):
+    """ Indica se o arquivo é novo ou mudou desde o último processamento registrado. """
+    registro = manifesto['arquivos'].get(os.path.basename(caminho))
+    if registro is None:
+        return True
+    # O tamanho é comparado antes para evitar o hash quando a diferença já é óbvia
+    if registro.get('tamanho') != os.path.getsize(caminho):
+        return True
+    return registro.get('sha256') != assinatura_arquivo(caminho)['sha256']
+
+def registrar_processado(caminho, manifesto, cauda=None):
+    """ Atualiza o registro do arquivo no manifesto com a assinatura atual e a cauda de VP do dia. """
+    registro = assinatura_arquivo(caminho)
+    registro['processado_em'] = datetime.now(timezone('America/Recife')).isoformat(timespec='seconds')
+    if cauda is not None:
+        registro['cauda_vp'] = cauda
+    manifesto['arquivos'][os.path.basename(caminho)] = registro
+
+def serializar_cauda(df_cauda):
+    """ Leituras da cauda do operador de VP como lista [datahora, estação, valor] para o manifesto. """
+    return [[d.strftime('%Y-%m-%d %H:%M:%S'), e, None if pd.isna(v) else float(v)]
+            for d, e, v in zip(df_cauda['datahora'], df_cauda['nomeEstacao'], df_cauda['valorMedida'])]
+
+def operador_para_dia(data_do_arquivo, manifesto):
+    """ Operador de VP semeado com a cauda (últimas 2 h) do dia anterior, se ela estiver no manifesto. """
+    operador = OperadorVPStreaming()
+    dia_anterior = (pd.Timestamp(data_do_arquivo) - timedelta(days=1)).strftime('%Y-%m-%d')
+    cauda = manifesto['arquivos'].get(f"chuva_recife_{dia_anterior}.csv", {}).get('cauda_vp')
+    if cauda:
+        operador.semear(pd.DataFrame(cauda, columns=['datahora', 'nomeEstacao', 'valorMedida']))
+    return operador
+
+def data_do_nome(arq):
+    match = re.search(r'(\d{4}-\d{2}-\d{2})', arq)
+    return match.group(1) if match else None
+
+
+# --- Processamento ---
+
+def processar_arquivo_risco(arq, tabua_mare, operador=None):
+    """ Lê um arquivo diário de chuva e devolve VP, AM e a classificação de risco do dia. """
+    data_do_arquivo = data_do_nome(arq)
+    if not data_do_arquivo: return None
+
+    print(f"-> Processando: {data_do_arquivo}")
+    with etapa('ler_csv_chuva', arquivo=arq, bytes_lidos=os.path.getsize(arq)) as m:
+        df_raw = ler_leituras_csv(arq, renomear=True)
+        m.registrar(linhas_saida=len(df_raw))
+    return calcular_risco_dia(df_raw, data_do_arquivo, tabua_mare, operador)
+
+def calcular_risco_dia(df_chuva, data_alvo, tabua_mare, operador=None, estacoes=None):
+    """ VP, AM e a classificação de risco do dia data_alvo, nos tipos de esquema.py. """
+    df_vp = processar_chuva_arquivo(df_chuva, data_alvo, operador, estacoes)
+    if df_vp.empty: return pd.DataFrame()
+
+    with etapa('vp_x_am', data=str(data_alvo), linhas_entrada=len(df_vp)):
+        # AM por índice direto na tábua horária; a classe sai do valor em float64, antes do float32
+        df_vp['AM'] = tabua_mare.am(df_vp['datahora'])
+        df_vp['Nivel_Risco_Valor'] = (df_vp['VP'].astype(float) * df_vp['AM'].astype(float)).round(2)
+        df_vp['Classificacao_Risco'] = classificar(df_vp['Nivel_Risco_Valor'])
+    return tipar_risco(df_vp[COLUNAS_RISCO])
+
+def baixar_historico(url=URL_ARQUIVO_HISTORICO):
+    with etapa('baixar_historico') as m:
+        try:
+            res = requests.get(url)
+            m.registrar(status=res.status_code, bytes_lidos=len(res.content))
+            df = ler_risco_csv(StringIO(res.text)) if res.status_code == 200 else pd.DataFrame()
+            m.registrar(linhas_saida=len(df))
+            return df
+        except Exception:
+            return pd.DataFrame()
+
+def incorporar_ao_historico(df_historico, df_novo):
+    """
+    Upsert das linhas novas no histórico pela chave (datahora, nomeEstacao).
+    Só as linhas novas são ordenadas; o histórico já chega ordenado e só é
+    reordenado se as linhas novas caírem no meio dele.
+    """
+    chaves = ['datahora', 'nomeEstacao']
+    df_novo = df_novo.drop_duplicates(subset=chaves, keep='last')
+    df_novo = df_novo.sort_values('datahora', ascending=False, kind='mergesort')
+    if df_historico.empty:
+        return df_novo
+
+    substituidas = pd.MultiIndex.from_frame(df_historico[chaves]).isin(pd.MultiIndex.from_frame(df_novo[chaves]))
+    df_final = concatenar_risco([df_novo, df_historico[~substituidas]])
+
+    if not df_final['datahora'].is_monotonic_decreasing:
+        df_final.sort_values('datahora', ascending=False, inplace=True, kind='mergesort')
+    return df_final
+
+def incorporar_ao_arquivo(df_novo, caminho=NOME_ARQUIVO_SAIDA_FINAL):
+    """
+    Upsert das linhas novas direto no CSV local (ordenado da data mais recente
+    para a mais antiga), sem baixar o histórico. Só o topo do arquivo, com as
+    datas a partir do dia mais antigo de df_novo, é lido e reescrito; o resto é
+    copiado byte a byte. Devolve o número de linhas do topo reescrito.
+    """
+    primeiro_dia = df_novo['datahora'].min().strftime('%Y-%m-%d').encode()
+    temporario = f"{caminho}.tmp"
+    with open(caminho, 'rb') as origem, open(temporario, 'wb') as destino:
+        cabecalho = origem.readline()
+        topo, linha = [], origem.readline()
+        while linha and linha[:10] >= primeiro_dia:
+            topo.append(linha)
+            linha = origem.readline()
+        df_topo = ler_risco_csv(StringIO((cabecalho + b''.join(topo)).decode('utf-8')))
+        df_topo = incorporar_ao_historico(df_topo, df_novo)
+        destino.write(escrever_risco_csv(df_topo).encode('utf-8'))
+        destino.write(linha)
+        shutil.copyfileobj(origem, destino)
+    os.replace(temporario, caminho)
+    return len(df_topo)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calcula o risco (VP x AM) a partir dos arquivos diários de chuva.")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Processa apenas arquivos novos ou alterados segundo o manifesto.")
+    parser.add_argument('--manifesto', default=NOME_ARQUIVO_MANIFESTO,
+                        help=f"Caminho do manifesto de arquivos processados (padrão: {NOME_ARQUIVO_MANIFESTO}).")
+    parser.add_argument('--resultados', default=DIRETORIO_RESULTADOS,
+                        help=f"Diretório do histórico particionado por mês (padrão: {DIRETORIO_RESULTADOS}).")
+    args = parser.parse_args(argv)
+
+    modo = "Incremental" if args.incremental else "Varredura de Arquivos"
+    print(f"Iniciando Nova Versão do Script de Risco ({modo})...")
+
+    manifesto = carregar_manifesto(args.manifesto)
+    arquivos_disponiveis = sorted(glob.glob("chuva_recife_*.csv"))
+    if args.incremental:
+        alterados = [a for a in arquivos_disponiveis if arquivo_alterado(a, manifesto)]
+        # O dia seguinte a um arquivo alterado também é refeito: a madrugada dele depende da cauda
+        datas_alteradas = {data_do_nome(a) for a in alterados}
+        arquivos_disponiveis = [a for a in arquivos_disponiveis if a in alterados or
+                                (data_do_nome(a) and (pd.Timestamp(data_do_nome(a)) - timedelta(days=1)).strftime('%Y-%m-%d') in datas_alteradas)]
+        print(f"Arquivos novos ou alterados: {arquivos_disponiveis}")
+        if not arquivos_disponiveis:
+            print("Nada a fazer: nenhum arquivo mudou desde a última execução.")
+            sys.exit(0)
+    else:
+        print(f"Arquivos encontrados na pasta: {arquivos_disponiveis}")
+
+    with etapa('carregar_mare'):
+        tabua_mare = carregar_fonte_am(URL_ARQUIVO_MARE_AM)
+    if tabua_mare is None:
         print("Erro: Maré vazia")
         sys.exit(1)
 
-    arquivos_disponiveis = glob.glob("chuva_recife_*.csv")
-    print(f"Arquivos encontrados na pasta: {arquivos_disponiveis}")
-
     lista_novos_dados = []
+    processados = []
+    caudas = {}
 
+    # Os arquivos são consumidos em ordem de data por um operador de VP que carrega
+    # entre dias apenas a cauda de 2 h; fora de sequência, ele é semeado pelo manifesto
+    operador, data_anterior = None, None
     for arq in arquivos_disponiveis:
-        match = re.search(r'(\d{4}-\d{2}-\d{2})', arq)
-        if not match: continue
-        data_do_arquivo = match.group(1)
-        
+        data_do_arquivo = data_do_nome(arq)
+        if not data_do_arquivo: continue
+        consecutivo = data_anterior and pd.Timestamp(data_do_arquivo) - pd.Timestamp(data_anterior) == timedelta(days=1)
+        if operador is None or not consecutivo:
+            operador = operador_para_dia(data_do_arquivo, manifesto)
         try:
-            print(f"-> Processando: {data_do_arquivo}")
-            df_raw = pd.read_csv(arq, sep=CSV_DELIMITADOR)
-            df_raw.rename(columns={'nome': 'nomeEstacao', 'valor': 'valorMedida'}, inplace=True)
-            df_vp = processar_chuva_arquivo(df_raw, data_do_arquivo)
-            if not df_vp.empty:
-                df_mesclado = pd.merge(df_vp, df_am, on=['data', 'hora_ref'], how='left')
-                df_mesclado['Nivel_Risco_Valor'] = (df_mesclado['VP'].astype(float) * df_mesclado['AM'].astype(float)).round(2)
-                bins = [-np.inf, 30, 50, 100, np.inf]
-                labels = ['Baixo', 'Moderado', 'Moderado Alto', 'Alto']
-                df_mesclado['Classificacao_Risco'] = pd.cut(df_mesclado['Nivel_Risco_Valor'], bins=bins, labels=labels)
+            df_mesclado = processar_arquivo_risco(arq, tabua_mare, operador)
+            if not df_mesclado.empty:
                 lista_novos_dados.append(df_mesclado)
+            processados.append(arq)
+            caudas[arq] = serializar_cauda(operador.cauda())
+            data_anterior = data_do_arquivo
         except Exception as e:
             print(f"Erro no arquivo {arq}: {e}")
+            operador, data_anterior = None, None
 
     if not lista_novos_dados:
         print("Aviso: Nenhum arquivo de chuva foi processado com sucesso.")
+        for arq in processados:
+            registrar_processado(arq, manifesto, caudas.get(arq))
+        salvar_manifesto(manifesto, args.manifesto)
         sys.exit(0)
 
-    df_total_novo = pd.concat(lista_novos_dados, ignore_index=True)
-    
-    try:
-        res = requests.get(URL_ARQUIVO_HISTORICO)
-        df_historico = pd.read_csv(StringIO(res.text)) if res.status_code == 200 else pd.DataFrame()
-    except:
-        df_historico = pd.DataFrame()
-
-    df_final = pd.concat([df_historico, df_total_novo], ignore_index=True)
-    df_final.drop_duplicates(subset=['data', 'hora_ref', 'nomeEstacao'], keep='last', inplace=True)
-    df_final.sort_values(['data', 'hora_ref'], ascending=[False, False], inplace=True)
-    df_final.to_csv(NOME_ARQUIVO_SAIDA_FINAL, index=False)
-    print(f"✅ Finalizado com {len(df_final)} registros.")
+    df_total_novo = concatenar_risco(lista_novos_dados)
+
+    # Histórico particionado: só os meses que receberam linhas são reescritos
+    with etapa('upsert_resultados', linhas_entrada=len(df_total_novo)) as m:
+        meses_gravados = ArmazemRisco(args.resultados).upsert(df_total_novo)
+        m.registrar(particoes=meses_gravados)
+    print(f"Partições de resultados atualizadas: {meses_gravados}")
+
+    if args.incremental and os.path.exists(NOME_ARQUIVO_SAIDA_FINAL):
+        # O CSV local é versionado junto com o manifesto: basta incorporar os dias novos no topo dele
+        with etapa('incorporar_arquivo', linhas_entrada=len(df_total_novo)) as m:
+            linhas_topo = incorporar_ao_arquivo(df_total_novo, NOME_ARQUIVO_SAIDA_FINAL)
+            m.registrar(linhas_saida=linhas_topo, bytes_gravados=os.path.getsize(NOME_ARQUIVO_SAIDA_FINAL))
+        resumo = f"{linhas_topo} registros reescritos no topo de {NOME_ARQUIVO_SAIDA_FINAL}"
+    else:
+        df_historico = baixar_historico()
+
+        with etapa('incorporar_historico', linhas_entrada=len(df_historico) + len(df_total_novo)) as m:
+            if args.incremental:
+                df_final = incorporar_ao_historico(df_historico, df_total_novo)
+            else:
+                df_final = concatenar_risco([df_historico, df_total_novo])
+                df_final.drop_duplicates(subset=['datahora', 'nomeEstacao'], keep='last', inplace=True)
+                df_final.sort_values('datahora', ascending=False, inplace=True, kind='mergesort')
+            m.registrar(linhas_saida=len(df_final))
+        with etapa('gravar_resultado', linhas_entrada=len(df_final)) as m:
+            escrever_risco_csv(df_final, NOME_ARQUIVO_SAIDA_FINAL)
+            m.registrar(bytes_gravados=os.path.getsize(NOME_ARQUIVO_SAIDA_FINAL))
+        resumo = f"{len(df_final)} registros"
+
+    # O manifesto só é atualizado depois que o resultado foi gravado com sucesso
+    for arq in processados:
+        registrar_processado(arq, manifesto, caudas.get(arq))
+    salvar_manifesto(manifesto, args.manifesto)
+    print(f"✅ Finalizado com {resumo} ({len(processados)} arquivo(s) processado(s)).")
+
+if __name__ == "__main__":
+    main()
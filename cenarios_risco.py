@@ -0,0 +1,203 @@
+# Arquivo: cenarios_risco.py
+"""
+Cenários hipotéticos de chuva ("se caírem X mm nas próximas 2 h, quais estações
+chegam a Alto, e em que horas da maré?").
+
+O estado de cada estação são as leituras das últimas 2 h antes do instante de
+referência. Cada cenário é uma trajetória de chuva em passos de 10 min a partir
+desse instante (a mesma para todas as estações, ou uma por estação). Para as
+N horas a partir da hora do instante, VP, AM, Nivel_Risco_Valor e a classe de todas as
+estações x cenários x horas saem de uma única conta NumPy:
+
+    VP[c, e, h] = 6 * chuva nos 10 min até h + chuva nas 2 h até h
+                  (parte observada, por estação, + parte do cenário, por somas acumuladas)
+    risco[c, e, h] = VP[c, e, h] * AM[h]
+
+Uso em linha de comando:
+    python cenarios_risco.py chuva_recife_2026-01-25.csv --instante "2026-01-25 12:00" --totais 0 10 20 40 80
+"""
+import argparse
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from esquema import CLASSES_RISCO, TIPO_CLASSE, LIMITES_RISCO, ler_leituras_csv
+from mare import carregar_fonte_am
+
+PASSO = np.timedelta64(10, 'm')
+PASSOS_POR_HORA = 6
+PASSOS_2H = 12
+NIVEL_ALTO = CLASSES_RISCO.index('Alto')
+
+
+def trajetorias_uniformes(totais_mm, duracao_h=2):
+    """ Uma trajetória por total: o total distribuído igualmente nos passos de 10 min da duração. """
+    totais = np.asarray(totais_mm, dtype=float)
+    passos = int(duracao_h * PASSOS_POR_HORA)
+    return np.repeat(totais[:, None] / passos, passos, axis=1)
+
+
+class ResultadoCenarios:
+    """
+    Arrays (cenário, estação, hora) de VP, risco e nível (índice em CLASSES_RISCO),
+    AM por hora e os rótulos de cada eixo.
+    """
+
+    def __init__(self, vp, am, risco, nivel, cenarios, estacoes, datahoras):
+        self.vp = vp
+        self.am = am
+        self.risco = risco
+        self.nivel = nivel
+        self.cenarios = cenarios
+        self.estacoes = estacoes
+        self.datahoras = datahoras
+
+    def resumo(self):
+        """ Uma linha por cenário e estação: risco máximo, hora e classe do pico e primeira hora em Alto. """
+        n_cen, n_est, n_horas = self.risco.shape
+        # Percorre as poucas horas com operações sobre (cenário, estação) inteiros:
+        # bem mais rápido que argmax no último eixo, que é curto
+        maximo = np.full((n_cen, n_est), -np.inf)
+        pico = np.zeros((n_cen, n_est), dtype=np.int64)
+        primeira_alto = np.full((n_cen, n_est), -1, dtype=np.int64)
+        for h in range(n_horas):
+            if np.isnan(self.am[h]):
+                continue  # horas sem AM não entram no pico
+            risco_h = self.risco[:, :, h]
+            maior = risco_h > maximo
+            np.copyto(maximo, risco_h, where=maior)
+            pico[maior] = h
+            primeira_alto[(primeira_alto < 0) & (self.nivel[:, :, h] >= NIVEL_ALTO)] = h
+        nivel_pico = np.take_along_axis(self.nivel, pico[..., None], axis=2)[..., 0]
+        horas = np.asarray(self.datahoras).astype('datetime64[ns]')
+        return pd.DataFrame({
+            'cenario': pd.Categorical.from_codes(np.repeat(np.arange(n_cen), n_est), categories=self.cenarios),
+            'nomeEstacao': pd.Categorical.from_codes(np.tile(np.arange(n_est), n_cen), categories=self.estacoes),
+            'Nivel_Risco_Max': np.where(np.isinf(maximo), np.nan, maximo).ravel(),
+            'hora_pico': horas[pico.ravel()],
+            'Classificacao_Pico': pd.Categorical.from_codes(nivel_pico.ravel(), dtype=TIPO_CLASSE),
+            'primeira_hora_alto': np.where(primeira_alto.ravel() >= 0, horas[primeira_alto.ravel()], np.datetime64('NaT')),
+        })
+
+    def tabela(self):
+        """ Formato longo (cenário, estação, hora) com as colunas do CLI, para exibir ou exportar. """
+        n_cen, n_est, n_horas = self.risco.shape
+        return pd.DataFrame({
+            'cenario': pd.Categorical.from_codes(np.repeat(np.arange(n_cen), n_est * n_horas), categories=self.cenarios),
+            'nomeEstacao': pd.Categorical.from_codes(np.tile(np.repeat(np.arange(n_est), n_horas), n_cen),
+                                                     categories=self.estacoes),
+            'datahora': np.tile(self.datahoras, n_cen * n_est),
+            'VP': self.vp.ravel(),
+            'AM': np.tile(self.am, n_cen * n_est),
+            'Nivel_Risco_Valor': self.risco.ravel(),
+            'Classificacao_Risco': pd.Categorical.from_codes(self.nivel.ravel(), dtype=TIPO_CLASSE),
+        })
+
+
+class MotorCenarios:
+    """
+    Estado observado das estações no instante de referência e avaliação de lotes de cenários.
+    df_leituras: colunas datahora, nomeEstacao e valorMedida (como no CLI); tabua_mare: .am(datahoras).
+    """
+
+    def __init__(self, df_leituras, tabua_mare, instante=None, estacoes=None):
+        datahora = pd.to_datetime(df_leituras['datahora']).to_numpy(dtype='datetime64[s]')
+        instante = datahora.max() if instante is None else np.datetime64(pd.Timestamp(instante), 's')
+        # O instante de referência cai num passo de 10 min: os cenários começam no passo seguinte
+        self.instante = instante.astype('datetime64[m]').astype('datetime64[10m]').astype('datetime64[s]')
+        self.tabua_mare = tabua_mare
+
+        recentes = (datahora > self.instante - PASSOS_2H * PASSO) & (datahora <= self.instante)
+        df = pd.DataFrame({'datahora': datahora[recentes],
+                           'nomeEstacao': df_leituras['nomeEstacao'].to_numpy()[recentes],
+                           'valorMedida': pd.to_numeric(df_leituras['valorMedida'], errors='coerce').to_numpy()[recentes]})
+        if estacoes is None:
+            estacoes = sorted(df['nomeEstacao'].dropna().unique())
+        self.estacoes = np.asarray(estacoes, dtype=object)
+        self._observadas = {e: g.sort_values('datahora') for e, g in df.groupby('nomeEstacao')}
+        # O horizonte (AM e chuva observada) não depende dos cenários: calculado uma vez por n_horas
+        self._horizonte = lru_cache(maxsize=8)(self._calcular_horizonte)
+
+    def _calcular_horizonte(self, n_horas):
+        """ Horas avaliadas, AM de cada uma, passo do cenário em cada hora e a chuva observada nas janelas. """
+        # Como no CLI, a hora H vale o VP da última leitura dela (H:50), com o AM de H;
+        # a hora do instante de referência, ainda aberta, é a primeira
+        datahoras = (self.instante.astype('datetime64[h]') + np.arange(n_horas)).astype('datetime64[s]')
+        avaliados = datahoras + (PASSOS_POR_HORA - 1) * PASSO
+        passos_ate = ((avaliados - self.instante) // PASSO).astype(np.int64)
+        am = np.asarray(self.tabua_mare.am(datahoras), dtype=float)
+
+        # Observado: soma das leituras em (t - 10 min, t] e (t - 2 h, t] até o instante de referência
+        observado_10min = np.zeros((len(self.estacoes), n_horas))
+        observado_2h = np.zeros((len(self.estacoes), n_horas))
+        for i, estacao in enumerate(self.estacoes):
+            g = self._observadas.get(estacao)
+            if g is None or g.empty:
+                continue
+            tempos = g['datahora'].to_numpy()
+            acumulado = np.r_[0.0, np.cumsum(np.nan_to_num(g['valorMedida'].to_numpy()))]
+            total = acumulado[-1]
+            observado_10min[i] = total - acumulado[np.searchsorted(tempos, avaliados - PASSO, side='right')]
+            observado_2h[i] = total - acumulado[np.searchsorted(tempos, avaliados - PASSOS_2H * PASSO, side='right')]
+        return datahoras, am, passos_ate, observado_10min, observado_2h
+
+    def avaliar(self, chuva, n_horas=6, rotulos=None):
+        """
+        chuva: mm por passo de 10 min a partir do instante de referência, com forma
+        (cenários, passos) para todas as estações ou (cenários, estações, passos).
+        Passos além da trajetória contam como chuva zero. As estações seguem a ordem de self.estacoes.
+        """
+        chuva = np.asarray(chuva, dtype=float)
+        if chuva.ndim == 1:
+            chuva = chuva[None, :]
+        datahoras, am, passos_ate, obs_10min, obs_2h = self._horizonte(n_horas)
+
+        # Somas acumuladas do cenário; o passo k cai no instante de referência + k * 10 min
+        n_passos = max(chuva.shape[-1], int(passos_ate[-1]))
+        acumulado = np.zeros(chuva.shape[:-1] + (n_passos + 1,))
+        np.cumsum(chuva, axis=-1, out=acumulado[..., 1:chuva.shape[-1] + 1])
+        acumulado[..., chuva.shape[-1] + 1:] = acumulado[..., chuva.shape[-1]:chuva.shape[-1] + 1]
+        fim = acumulado[..., passos_ate]
+        cenario_10min = fim - acumulado[..., np.maximum(passos_ate - 1, 0)]
+        cenario_2h = fim - acumulado[..., np.maximum(passos_ate - PASSOS_2H, 0)]
+        cenario = 6 * cenario_10min + cenario_2h
+        if chuva.ndim == 2:
+            cenario = cenario[:, None, :]
+
+        # As partes pequenas (cenário e observado) são somadas antes: só três passadas no array cheio
+        vp = cenario + (6 * obs_10min + obs_2h)
+        risco = np.multiply(vp, am, out=np.empty_like(vp))
+        np.round(risco, 2, out=risco)
+        # Faixas fechadas à direita, como no pd.cut do CLI
+        nivel = (risco > LIMITES_RISCO[0]).astype(np.int8)
+        for limite in LIMITES_RISCO[1:]:
+            nivel += risco > limite
+        # Sem AM o nível fica -1 (vira NaN na classificação)
+        nivel[..., np.isnan(am)] = -1
+        if rotulos is None:
+            rotulos = np.arange(len(chuva))
+        return ResultadoCenarios(vp, am, risco, nivel,
+                                 np.asarray(rotulos), self.estacoes, datahoras)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Risco em cenários hipotéticos de chuva.")
+    parser.add_argument('arquivos', nargs='+', help="CSVs diários de chuva com as leituras recentes.")
+    parser.add_argument('--instante', help="Instante de referência (padrão: última leitura).")
+    parser.add_argument('--totais', nargs='+', type=float, default=[0, 10, 20, 40, 80],
+                        help="Totais de chuva (mm) de cada cenário.")
+    parser.add_argument('--duracao', type=float, default=2, help="Duração da chuva em horas (padrão: 2).")
+    parser.add_argument('--horas', type=int, default=6, help="Horas avaliadas à frente (padrão: 6).")
+    args = parser.parse_args(argv)
+
+    df = pd.concat([ler_leituras_csv(a, renomear=True) for a in args.arquivos], ignore_index=True)
+    motor = MotorCenarios(df, carregar_fonte_am(), args.instante)
+    resultado = motor.avaliar(trajetorias_uniformes(args.totais, args.duracao), args.horas,
+                              rotulos=[f"{t:g} mm" for t in args.totais])
+    print(f"Instante de referência: {motor.instante}")
+    print(resultado.resumo().to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# Arquivo: coleta_cemaden.py
+"""
+Camada de acesso à API do CEMADEN: consulta todas as estações em paralelo.
+
+Usa uma única requests.Session com pool de conexões (keep-alive, um único
+handshake TLS por conexão), timeout em toda requisição e novas tentativas com
+espera exponencial e jitter para falhas transitórias (rede, 429 e 5xx).
+
+As URLs podem ser trocadas pelas variáveis de ambiente CEMADEN_URL_TOKEN e
+CEMADEN_URL_DADOS, por exemplo para apontar para um servidor local de teste.
+"""
+import os
+import sys
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from instrumentacao import etapa
+
+URL_TOKEN = os.getenv('CEMADEN_URL_TOKEN', 'https://sgaa.cemaden.gov.br/SGAA/rest/controle-token/tokens')
+URL_DADOS_RECENTES = os.getenv('CEMADEN_URL_DADOS', 'https://sws.cemaden.gov.br/PED/rest/pcds/pcds-dados-recentes')
+
+MAX_CONEXOES = 32
+TIMEOUT = (5, 20)  # (conexão, leitura) em segundos
+TENTATIVAS = 3
+ESPERA_BASE = 0.5
+ESPERA_MAXIMA = 8.0
+STATUS_TRANSITORIOS = {429, 500, 502, 503, 504}
+
+
+class TokenInvalido(Exception):
+    """ A API recusou o token (HTTP 401). """
+
+
+class GerenciadorToken:
+    """
+    Mantém o token em memória e só pede um novo quando a validade configurada
+    expira ou quando a API responde 401. Seguro para uso pelas threads da coleta.
+    """
+
+    def __init__(self, obter, validade=3600, espera_apos_falha=30):
+        self._obter = obter
+        self._validade = validade
+        self._espera_apos_falha = espera_apos_falha
+        self._token = None
+        self._obtido_em = float('-inf')
+        self._trava = threading.Lock()
+
+    def token(self):
+        with self._trava:
+            decorrido = time.monotonic() - self._obtido_em
+            # Depois de um login que falhou, espera um pouco antes de tentar de novo
+            # para não repetir o POST uma vez por estação
+            if (self._token is None and decorrido >= self._espera_apos_falha) or decorrido >= self._validade:
+                self._token = self._obter()
+                self._obtido_em = time.monotonic()
+            return self._token
+
+    def invalidar(self, token_usado):
+        """ Descarta o token recusado (se outra thread ainda não o trocou). """
+        with self._trava:
+            if self._token == token_usado:
+                self._token = None
+                self._obtido_em = float('-inf')
+
+
+class _TokenFixo:
+    def __init__(self, token):
+        self._token = token
+
+    def token(self):
+        return self._token
+
+    def invalidar(self, token_usado):
+        pass
+
+
+def criar_sessao(max_conexoes=MAX_CONEXOES):
+    """ Sessão HTTP com pool dimensionado para as consultas paralelas. """
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=max_conexoes, pool_maxsize=max_conexoes)
+    sessao.mount('https://', adaptador)
+    sessao.mount('http://', adaptador)
+    return sessao
+
+
+def _espera(tentativa, espera_base=ESPERA_BASE):
+    """ Espera exponencial com jitter ("full jitter") para não sincronizar as novas tentativas. """
+    return random.uniform(0, min(ESPERA_MAXIMA, espera_base * (2 ** tentativa)))
+
+
+def requisitar(sessao, metodo, url, tentativas=TENTATIVAS, timeout=TIMEOUT, espera_base=ESPERA_BASE, **kwargs):
+    """
+    Faz a requisição com timeout e novas tentativas para falhas transitórias.
+    Erros definitivos (4xx que não sejam 429) são levantados na hora.
+    """
+    for tentativa in range(tentativas):
+        try:
+            response = sessao.request(metodo, url, timeout=timeout, **kwargs)
+            if response.status_code not in STATUS_TRANSITORIOS:
+                response.raise_for_status()
+                return response
+            erro = requests.exceptions.HTTPError(f"{response.status_code} para {url}", response=response)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            erro = e
+        if tentativa < tentativas - 1:
+            time.sleep(_espera(tentativa, espera_base))
+    raise erro
+
+
+def solicitar_token(email, senha, sessao=None, url=URL_TOKEN):
+    """ POST de login; devolve o token ou None se a resposta não trouxer um. """
+    sessao = sessao or criar_sessao(1)
+    response = requisitar(sessao, 'POST', url, json={'email': email, 'password': senha})
+    return response.json().get('token')
+
+
+def buscar_estacao(sessao, token, codestacao, uf='PE', rede='11', sensor='10', url=URL_DADOS_RECENTES):
+    """ Leituras recentes de uma estação, sempre como lista de dicionários. """
+    params = {'codestacao': codestacao, 'uf': uf, 'rede': rede, 'sensor': sensor, 'formato': 'JSON'}
+    with etapa('cemaden_estacao', codestacao=codestacao) as m:
+        try:
+            response = requisitar(sessao, 'GET', url, headers={'token': token}, params=params)
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 401:
+                raise TokenInvalido(f"Token recusado ao consultar a estação {codestacao}.") from e
+            raise
+        m.registrar(bytes_lidos=len(response.content))
+        dados = response.json()
+    if isinstance(dados, dict) and 'Nenhum resultado foi encontrado' in dados.get('Info', ''):
+        print(f"⚠️ Estação {codestacao} retornou uma mensagem de 'não encontrado'. Ignorando.")
+        return []
+    if not dados:
+        print(f"⚠️ Nenhum dado encontrado para a estação {codestacao}.")
+        return []
+    return [dados] if isinstance(dados, dict) else list(dados)
+
+
+def buscar_estacoes(token, lista_estacoes, uf='PE', rede='11', sensor='10', sessao=None,
+                    max_trabalhadores=MAX_CONEXOES, url=URL_DADOS_RECENTES):
+    """
+    Consulta todas as estações em paralelo (pool de threads limitado) e devolve
+    os registros de todas, na ordem de lista_estacoes. Uma estação que falha
+    não impede as demais.
+
+    token pode ser o texto do token ou um GerenciadorToken; com o gerenciador,
+    um 401 renova o token e a estação é consultada mais uma vez.
+    """
+    sessao = sessao or criar_sessao(max_trabalhadores)
+    trabalhadores = max(1, min(max_trabalhadores, len(lista_estacoes)))
+    gerenciador = _TokenFixo(token) if isinstance(token, str) else token
+
+    def tarefa(codestacao):
+        for _ in range(2):
+            token_usado = gerenciador.token()
+            if not token_usado:
+                print(f"❌ Sem token para consultar a estação {codestacao}.", file=sys.stderr)
+                return []
+            try:
+                return buscar_estacao(sessao, token_usado, codestacao, uf, rede, sensor, url)
+            except TokenInvalido as e:
+                print(f"⚠️ {e} Renovando o token...", file=sys.stderr)
+                gerenciador.invalidar(token_usado)
+            except requests.exceptions.RequestException as e:
+                print(f"❌ Erro ao buscar dados para a estação {codestacao}: {e}", file=sys.stderr)
+                return []
+        return []
+
+    with ThreadPoolExecutor(max_workers=trabalhadores) as executor:
+        resultados = list(executor.map(tarefa, lista_estacoes))
+    return [registro for registros in resultados for registro in registros]
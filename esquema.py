@@ -0,0 +1,200 @@
+# Arquivo: esquema.py
+"""
+Tipos canônicos dos dados em memória, usados pela coleta, pelo CLI diário e pelo painel.
+
+Nos CSVs nada muda (data e hora_ref como texto, classe por extenso), porque
+eles são lidos também pelo painel publicado. Em memória, as tabelas usam:
+
+    leituras  datahora datetime64 (horário de Recife); codestacao, nome, cidade e uf
+              categóricas; valor float64
+    risco     datahora datetime64 da hora cheia (substitui data + hora_ref); nomeEstacao
+              categórica; VP, AM e Nivel_Risco_Valor float32; Classificacao_Risco
+              categórica ordenada (TIPO_CLASSE)
+
+As funções ler_* e escrever_* convertem só na borda (ao ler ou gravar o CSV).
+As contas continuam em float64 e os valores são reduzidos a float32 no fim,
+por tipar_risco; a classificação é feita antes, sobre o valor em float64.
+"""
+import numpy as np
+import pandas as pd
+
+BINS_RISCO = [-np.inf, 30, 50, 100, np.inf]
+CLASSES_RISCO = ['Baixo', 'Moderado', 'Moderado Alto', 'Alto']
+TIPO_CLASSE = pd.CategoricalDtype(CLASSES_RISCO, ordered=True)
+LIMITES_RISCO = np.asarray(BINS_RISCO[1:-1], dtype=float)
+
+COLUNAS_RISCO = ['datahora', 'nomeEstacao', 'VP', 'AM', 'Nivel_Risco_Valor', 'Classificacao_Risco']
+COLUNAS_CSV_RISCO = ['data', 'hora_ref', 'nomeEstacao', 'VP', 'AM', 'Nivel_Risco_Valor', 'Classificacao_Risco']
+COLUNAS_FLOAT32 = ['VP', 'AM', 'Nivel_Risco_Valor']
+TIPOS_CSV_RISCO = {'data': str, 'hora_ref': str, 'nomeEstacao': 'category', 'VP': 'float32',
+                   'AM': 'float32', 'Nivel_Risco_Valor': 'float32', 'Classificacao_Risco': TIPO_CLASSE}
+
+TIPOS_CSV_LEITURAS = {'codestacao': 'category', 'nome': 'category', 'cidade': 'category', 'uf': 'category',
+                      'valor': 'float64'}
+RENOMEAR_LEITURAS = {'nome': 'nomeEstacao', 'valor': 'valorMedida'}
+HORAS_REF = np.array([f"{h:02d}:00:00" for h in range(24)], dtype=object)
+
+
+# --- Classificação ---
+
+def classificar(nivel, fechado_a_direita=True):
+    """
+    Classe de risco de cada valor, como pd.cut(nivel, BINS_RISCO, right=...) mas por searchsorted.
+    O CLI usa faixas fechadas à direita; o painel, fechadas à esquerda.
+    """
+    nivel = np.asarray(nivel, dtype=float)
+    codigos = np.searchsorted(LIMITES_RISCO, nivel, side='left' if fechado_a_direita else 'right')
+    codigos = np.where(np.isnan(nivel), -1, codigos).astype(np.int8)
+    return pd.Categorical.from_codes(codigos, dtype=TIPO_CLASSE)
+
+
+# --- Risco ---
+
+def risco_vazio():
+    """ Tabela de risco sem linhas, já com os tipos canônicos. """
+    return pd.DataFrame({
+        'datahora': pd.Series(dtype='datetime64[ns]'),
+        'nomeEstacao': pd.Series(dtype='category'),
+        **{c: pd.Series(dtype='float32') for c in COLUNAS_FLOAT32},
+        'Classificacao_Risco': pd.Series(dtype=TIPO_CLASSE),
+    })
+
+
+def _ja_tipado(df):
+    """ Se df já tem exatamente as colunas e os tipos canônicos (nada a converter). """
+    if list(df.columns) != COLUNAS_RISCO:
+        return False
+    tipos = df.dtypes
+    return (tipos['datahora'] == 'datetime64[ns]'
+            and isinstance(tipos['nomeEstacao'], pd.CategoricalDtype)
+            and all(tipos[c] == np.float32 for c in COLUNAS_FLOAT32)
+            and tipos['Classificacao_Risco'] == TIPO_CLASSE)
+
+
+def tipar_risco(df):
+    """
+    Tabela de risco com os tipos canônicos. Aceita datahora (hora cheia) ou o par
+    data/hora_ref em texto, como nos CSVs antigos.
+    """
+    if df.empty:
+        return risco_vazio()
+    if _ja_tipado(df):
+        return df.copy(deep=False)
+    if 'datahora' in df.columns:
+        # pd.to_datetime numa coluna que já é datetime64 percorre os valores um a um
+        datahora = df['datahora'] if pd.api.types.is_datetime64_dtype(df['datahora']) else pd.to_datetime(df['datahora'])
+        datahora = datahora.astype('datetime64[ns]')
+    else:
+        datahora = (pd.to_datetime(df['data'].astype(str), format='%Y-%m-%d')
+                    + pd.to_timedelta(df['hora_ref'].astype(str))).astype('datetime64[ns]')
+    estacao = df['nomeEstacao']
+    classe = df['Classificacao_Risco']
+    # Um único DataFrame montado de uma vez; colunas que já estão no tipo não são reconvertidas
+    return pd.DataFrame({
+        'datahora': datahora.to_numpy(),
+        'nomeEstacao': estacao.array if isinstance(estacao.dtype, pd.CategoricalDtype) else pd.Categorical(estacao),
+        **{c: df[c].to_numpy(dtype=np.float32) if df[c].dtype.kind == 'f'
+           else pd.to_numeric(df[c], errors='coerce').to_numpy(dtype=np.float32) for c in COLUNAS_FLOAT32},
+        'Classificacao_Risco': classe.array if classe.dtype == TIPO_CLASSE else pd.Categorical(classe, dtype=TIPO_CLASSE),
+    })
+
+
+def corrigir_nomes_estacao(df):
+    """
+    Desfaz nomes de estação em UTF-8 relidos como latin-1 ('TorreÃ£o' -> 'Torreão'),
+    presentes em linhas antigas de resultado_risco_final.csv. Se a mesma hora aparece
+    com as duas grafias, fica a linha que já tinha o nome correto (a mais recente).
+    """
+    def corrigir(nome):
+        try:
+            return nome.encode('latin-1').decode('utf-8')
+        except UnicodeError:
+            return nome
+    nomes = df['nomeEstacao'].astype(str)
+    corrigidos = nomes.map({nome: corrigir(nome) for nome in nomes.unique()})
+    df = df.assign(nomeEstacao=corrigidos.astype('category'))
+    recodificadas = (corrigidos != nomes).to_numpy()
+    repetidas = df.duplicated(subset=['datahora', 'nomeEstacao'], keep=False).to_numpy()
+    return df[~(recodificadas & repetidas)]
+
+
+def _concatenar_categoricas(partes, colunas):
+    """ pd.concat que mantém as colunas categóricas (une as categorias em vez de cair para object). """
+    for coluna in colunas:
+        if not all(isinstance(p[coluna].dtype, pd.CategoricalDtype) for p in partes if coluna in p.columns):
+            continue
+        categorias = sorted(set().union(*(p[coluna].cat.categories for p in partes if coluna in p.columns)))
+        partes = [p.assign(**{coluna: p[coluna].cat.set_categories(categorias)}) if coluna in p.columns else p
+                  for p in partes]
+    return pd.concat(partes, ignore_index=True)
+
+
+def concatenar_risco(partes):
+    """ pd.concat de tabelas de risco com nomeEstacao categórica. """
+    partes = [p for p in partes if not p.empty]
+    if not partes:
+        return risco_vazio()
+    return _concatenar_categoricas(partes, ['nomeEstacao'])
+
+
+def _formatar_por_valor(datas, formato):
+    """ strftime só nos valores distintos (poucos dias e 24 horas), espalhado pelos códigos. """
+    codigos, unicos = pd.factorize(datas)
+    return pd.Index(unicos).strftime(formato).to_numpy(dtype=object)[codigos]
+
+
+def ler_risco_csv(origem):
+    """ CSV no formato de resultado_risco_final.csv (caminho, URL ou buffer) já com os tipos canônicos. """
+    try:
+        df = pd.read_csv(origem, dtype=TIPOS_CSV_RISCO)
+    except pd.errors.EmptyDataError:
+        return risco_vazio()
+    if df.empty:
+        return risco_vazio()
+    dia = pd.to_datetime(df['data'], format='%Y-%m-%d').to_numpy(dtype='datetime64[ns]')
+    hora = pd.to_timedelta(df['hora_ref']).to_numpy(dtype='timedelta64[ns]')
+    df.insert(0, 'datahora', dia + hora)
+    return df.drop(columns=['data', 'hora_ref'])
+
+
+def para_csv_risco(df):
+    """ Colunas de texto do CSV (data, hora_ref) a partir da tabela canônica. """
+    datahora = df['datahora']
+    return pd.DataFrame({
+        'data': _formatar_por_valor(datahora.dt.normalize(), '%Y-%m-%d'),
+        'hora_ref': HORAS_REF[datahora.dt.hour.to_numpy()],
+        **{c: df[c].to_numpy() for c in COLUNAS_CSV_RISCO[2:]},
+    })
+
+
+def escrever_risco_csv(df, destino=None):
+    """ Grava (ou devolve, sem destino) o CSV no formato de resultado_risco_final.csv. """
+    return para_csv_risco(df).to_csv(destino, index=False)
+
+
+# --- Leituras de chuva ---
+
+def tipar_leituras(df):
+    """ Leituras do CEMADEN com datahora datetime64 e as colunas repetidas por linha categóricas. """
+    df = df.copy()
+    df['datahora'] = pd.to_datetime(df['datahora'])
+    for coluna, tipo in TIPOS_CSV_LEITURAS.items():
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype(tipo) if tipo == 'category' else pd.to_numeric(df[coluna], errors='coerce')
+    return df
+
+
+def concatenar_leituras(partes):
+    """ pd.concat de leituras mantendo as colunas categóricas (nomes originais ou renomeados). """
+    partes = [p for p in partes if not p.empty]
+    if not partes:
+        return pd.DataFrame()
+    colunas = list(TIPOS_CSV_LEITURAS) + [RENOMEAR_LEITURAS['nome']]
+    return _concatenar_categoricas(partes, [c for c in colunas if TIPOS_CSV_LEITURAS.get(c, 'category') == 'category'])
+
+
+def ler_leituras_csv(origem, renomear=False):
+    """ CSV diário de chuva já tipado; renomear=True usa os nomes de coluna do motor de VP. """
+    df = pd.read_csv(origem, dtype=TIPOS_CSV_LEITURAS)
+    df['datahora'] = pd.to_datetime(df['datahora'], format='ISO8601')
+    return df.rename(columns=RENOMEAR_LEITURAS) if renomear else df
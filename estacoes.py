@@ -0,0 +1,255 @@
+# Arquivo: estacoes.py
+"""
+Registro de estações (registro_estacoes.json) e consultas espaciais de risco.
+
+O registro guarda, por código de estação, os metadados que já chegam em cada
+leitura do CEMADEN (nome, cidade, UF, latitude, longitude) e se a estação é
+monitorada. A coleta, o CLI diário e o painel leem daqui a lista de estações
+em vez de listas fixas no código.
+
+O índice espacial é uma grade regular em coordenadas planas locais (km).
+A busca dos vizinhos olha só as 3x3 células em volta do ponto; quando o
+vizinho mais distante encontrado fica além do tamanho da célula (pode haver
+um mais perto fora da vizinhança), o ponto é resolvido por força bruta.
+O resultado é sempre exato.
+
+Uso em linha de comando:
+    python estacoes.py atualizar chuva_recife_*.csv [--monitorar-novas]
+    python estacoes.py listar
+"""
+import os
+import json
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from esquema import CLASSES_RISCO, LIMITES_RISCO, classificar
+
+CAMINHO_REGISTRO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'registro_estacoes.json')
+CAMPOS_ESTACAO = ['codestacao', 'nome', 'cidade', 'uf', 'latitude', 'longitude']
+KM_POR_GRAU_LAT = 110.574
+KM_POR_GRAU_LON = 111.320
+
+
+# --- Registro ---
+
+def carregar_registro(caminho=CAMINHO_REGISTRO):
+    """ Lista de estações do registro (vazia se o arquivo não existir). """
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)['estacoes']
+
+
+def salvar_registro(estacoes, caminho=CAMINHO_REGISTRO):
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump({'versao': 1, 'estacoes': sorted(estacoes, key=lambda e: e['codestacao'])},
+                  f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+def atualizar_registro(df_leituras, estacoes, monitorar_novas=False):
+    """
+    Incorpora ao registro os metadados das leituras (última versão de cada código).
+    Estações já registradas mantêm a marcação de monitorada. Devolve o registro atualizado.
+    """
+    por_codigo = {e['codestacao']: dict(e) for e in estacoes}
+    metadados = df_leituras.dropna(subset=['codestacao']).drop_duplicates('codestacao', keep='last')
+    for linha in metadados.reindex(columns=CAMPOS_ESTACAO).itertuples(index=False):
+        registro = {c: (None if pd.isna(v) else v) for c, v in zip(CAMPOS_ESTACAO, linha)}
+        registro['codestacao'] = str(registro['codestacao'])
+        for c in ('latitude', 'longitude'):
+            registro[c] = None if registro[c] is None else float(registro[c])
+        anterior = por_codigo.get(registro['codestacao'])
+        registro['monitorada'] = anterior['monitorada'] if anterior else monitorar_novas
+        por_codigo[registro['codestacao']] = registro
+    return list(por_codigo.values())
+
+
+def estacoes_monitoradas(caminho=CAMINHO_REGISTRO):
+    return [e for e in carregar_registro(caminho) if e.get('monitorada')]
+
+
+def codigos_monitorados(caminho=CAMINHO_REGISTRO):
+    return [e['codestacao'] for e in estacoes_monitoradas(caminho)]
+
+
+def nomes_monitorados(caminho=CAMINHO_REGISTRO):
+    return [e['nome'] for e in estacoes_monitoradas(caminho)]
+
+
+# --- Índice espacial ---
+
+class IndiceEspacial:
+    """ Vizinhos mais próximos (distância em km) sobre uma grade regular. """
+
+    def __init__(self, latitudes, longitudes, tamanho_celula_km=None):
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        self.lat_ref = float(latitudes.mean()) if len(latitudes) else 0.0
+        self.xy = self._projetar(latitudes, longitudes)
+        self.n = len(self.xy)
+        if tamanho_celula_km is None:
+            # ~2 estações por célula numa distribuição uniforme
+            extensao = np.ptp(self.xy, axis=0).prod() if self.n > 1 else 1.0
+            tamanho_celula_km = max(np.sqrt(2 * extensao / max(self.n, 1)), 0.5)
+        self.celula = float(tamanho_celula_km)
+
+        ix, iy = self._celulas(self.xy)
+        self._chaves = self._chave(ix, iy)
+        self._ordem = np.argsort(self._chaves, kind='stable')
+        self._chaves_ordenadas = self._chaves[self._ordem]
+
+    def _projetar(self, latitudes, longitudes):
+        x = longitudes * KM_POR_GRAU_LON * np.cos(np.radians(self.lat_ref))
+        y = latitudes * KM_POR_GRAU_LAT
+        return np.column_stack([x, y])
+
+    def _celulas(self, xy):
+        return np.floor(xy[:, 0] / self.celula).astype(np.int64), np.floor(xy[:, 1] / self.celula).astype(np.int64)
+
+    @staticmethod
+    def _chave(ix, iy):
+        return ix * (1 << 32) + iy
+
+    def _forca_bruta(self, pontos, k):
+        distancias = np.sqrt(((pontos[:, None, :] - self.xy[None, :, :]) ** 2).sum(axis=2))
+        if k < self.n:
+            candidatos_k = np.argpartition(distancias, k - 1, axis=1)[:, :k]
+        else:
+            candidatos_k = np.broadcast_to(np.arange(self.n), distancias.shape)
+        ordem = np.argsort(np.take_along_axis(distancias, candidatos_k, axis=1), axis=1, kind='stable')
+        indices = np.take_along_axis(candidatos_k, ordem, axis=1)
+        return np.take_along_axis(distancias, indices, axis=1), indices
+
+    def vizinhos(self, latitudes, longitudes, k=1):
+        """ (distâncias em km, índices das estações), cada um com forma (n_pontos, k). """
+        k = min(k, self.n)
+        pontos = self._projetar(np.atleast_1d(np.asarray(latitudes, dtype=float)),
+                                np.atleast_1d(np.asarray(longitudes, dtype=float)))
+        if k == 0:
+            vazio = np.empty((len(pontos), 0))
+            return vazio, vazio.astype(np.int64)
+
+        ix, iy = self._celulas(pontos)
+        desloc = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+        vizinhas = self._chave(ix[:, None] + desloc[:, 0], iy[:, None] + desloc[:, 1]).ravel()
+        inicio = np.searchsorted(self._chaves_ordenadas, vizinhas, side='left')
+        contagem = np.searchsorted(self._chaves_ordenadas, vizinhas, side='right') - inicio
+
+        # Candidatos das 9 células de cada ponto, em vetores planos (ponto, estação)
+        total = int(contagem.sum())
+        deslocamento = np.repeat(np.cumsum(contagem) - contagem, contagem)
+        candidatos = self._ordem[np.repeat(inicio, contagem) + np.arange(total) - deslocamento]
+        ponto = np.repeat(np.arange(len(pontos)), contagem.reshape(len(pontos), 9).sum(axis=1))
+        distancias = np.sqrt(((pontos[ponto] - self.xy[candidatos]) ** 2).sum(axis=1))
+
+        # Os k menores de cada ponto: ordena por (ponto, distância) e pega o posto < k
+        ordem = np.lexsort((distancias, ponto))
+        ponto, candidatos, distancias = ponto[ordem], candidatos[ordem], distancias[ordem]
+        primeiro = np.searchsorted(ponto, np.arange(len(pontos)), side='left')
+        posto = np.arange(total) - primeiro[ponto]
+        manter = posto < k
+        dist_k = np.full((len(pontos), k), np.inf)
+        idx_k = np.zeros((len(pontos), k), dtype=np.int64)
+        dist_k[ponto[manter], posto[manter]] = distancias[manter]
+        idx_k[ponto[manter], posto[manter]] = candidatos[manter]
+
+        # Fora da vizinhança 3x3 toda estação está a mais de uma célula de distância
+        incertos = ~(dist_k[:, -1] <= self.celula)
+        if incertos.any():
+            dist_k[incertos], idx_k[incertos] = self._forca_bruta(pontos[incertos], k)
+        return dist_k, idx_k
+
+
+# --- Risco num ponto ---
+
+def ultimo_risco_por_estacao(df_risco):
+    """ Última hora com VP e AM de cada estação (colunas datahora, nomeEstacao, VP, AM). """
+    df = df_risco.dropna(subset=['VP', 'AM'])
+    df = df.sort_values('datahora', kind='mergesort')
+    df = df.drop_duplicates('nomeEstacao', keep='last')
+    return df.assign(nomeEstacao=df['nomeEstacao'].astype(str)).set_index('nomeEstacao')
+
+
+class RiscoEspacial:
+    """
+    Risco em pontos arbitrários a partir do último VP/AM horário de cada estação:
+    pela estação mais próxima ('vizinho') ou por inverso da distância ('idw').
+    """
+
+    def __init__(self, df_ultimo_risco, estacoes):
+        coordenadas = {e['nome']: (e['latitude'], e['longitude']) for e in estacoes
+                       if e.get('latitude') is not None and e.get('longitude') is not None}
+        df = df_ultimo_risco[df_ultimo_risco.index.isin(list(coordenadas))]
+        self.nomes = df.index.to_numpy()
+        self.vp = df['VP'].to_numpy(dtype=float)
+        self.am = df['AM'].to_numpy(dtype=float)
+        self.indice = IndiceEspacial([coordenadas[n][0] for n in self.nomes], [coordenadas[n][1] for n in self.nomes])
+
+    def _calcular(self, latitudes, longitudes, metodo, k, potencia):
+        """ VP, AM, nível de risco, estação mais próxima e distância dela (km) para cada ponto. """
+        k = 1 if metodo == 'vizinho' else k
+        distancias, indices = self.indice.vizinhos(latitudes, longitudes, k)
+        if metodo == 'vizinho':
+            vp, am = self.vp[indices[:, 0]], self.am[indices[:, 0]]
+        elif metodo == 'idw':
+            # Ponto em cima de uma estação: peso infinito vira peso 1 só para ela
+            em_cima = distancias < 1e-9
+            pesos = np.where(em_cima.any(axis=1, keepdims=True), em_cima.astype(float),
+                             1.0 / np.maximum(distancias, 1e-9) ** potencia)
+            pesos /= pesos.sum(axis=1, keepdims=True)
+            vp = (pesos * self.vp[indices]).sum(axis=1)
+            am = (pesos * self.am[indices]).sum(axis=1)
+        else:
+            raise ValueError(f"Método desconhecido: {metodo}")
+        return vp, am, np.round(vp * am, 2), self.nomes[indices[:, 0]], distancias[:, 0]
+
+    def riscos_nos_pontos(self, latitudes, longitudes, metodo='vizinho', k=3, potencia=2.0):
+        """ DataFrame com VP, AM, Nivel_Risco_Valor, Classificacao_Risco e a estação mais próxima de cada ponto. """
+        vp, am, nivel, estacao, distancia = self._calcular(latitudes, longitudes, metodo, k, potencia)
+        return pd.DataFrame({
+            'latitude': np.atleast_1d(latitudes), 'longitude': np.atleast_1d(longitudes),
+            'VP': vp, 'AM': am, 'Nivel_Risco_Valor': nivel,
+            'Classificacao_Risco': classificar(nivel),
+            'estacao_mais_proxima': estacao, 'distancia_km': distancia,
+        })
+
+    def risco_no_ponto(self, latitude, longitude, metodo='vizinho', k=3, potencia=2.0):
+        """ Mesmo resultado de riscos_nos_pontos para um único ponto, como dicionário (sem montar DataFrame). """
+        vp, am, nivel, estacao, distancia = self._calcular([latitude], [longitude], metodo, k, potencia)
+        nivel = float(nivel[0])
+        # Intervalos fechados à direita, como em esquema.classificar
+        classe = None if np.isnan(nivel) else CLASSES_RISCO[int(np.searchsorted(LIMITES_RISCO, nivel, side='left'))]
+        return {'latitude': latitude, 'longitude': longitude, 'VP': float(vp[0]), 'AM': float(am[0]),
+                'Nivel_Risco_Valor': nivel, 'Classificacao_Risco': classe,
+                'estacao_mais_proxima': estacao[0], 'distancia_km': float(distancia[0])}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manutenção do registro de estações.")
+    parser.add_argument('--registro', default=CAMINHO_REGISTRO)
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_atualizar = sub.add_parser('atualizar', help="Incorpora os metadados de estações dos CSVs de chuva.")
+    p_atualizar.add_argument('arquivos', nargs='+')
+    p_atualizar.add_argument('--monitorar-novas', action='store_true',
+                             help="Marca como monitoradas as estações que ainda não estavam no registro.")
+    sub.add_parser('listar', help="Lista as estações do registro.")
+    args = parser.parse_args(argv)
+
+    estacoes = carregar_registro(args.registro)
+    if args.comando == 'atualizar':
+        df = pd.concat([pd.read_csv(c, dtype={'codestacao': str}) for c in sorted(args.arquivos)], ignore_index=True)
+        estacoes = atualizar_registro(df, estacoes, args.monitorar_novas)
+        salvar_registro(estacoes, args.registro)
+        print(f"✅ Registro com {len(estacoes)} estação(ões).")
+    else:
+        for e in estacoes:
+            marca = '*' if e.get('monitorada') else ' '
+            print(f"{marca} {e['codestacao']}  {e['nome']:<25} {e.get('latitude')}, {e.get('longitude')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+# Arquivo: ingestao_leve.py
+"""
+Núcleo da coleta só com a biblioteca padrão: a execução a cada 5 min não
+precisa importar pandas/NumPy para gravar as leituras.
+
+É o único ponto que grava o arquivo de chuva (dados_chuva/AAAA-MM-DD.bin +
+estacoes.json); arquivo_chuva.ArquivoChuva só acrescenta a entrada e a leitura
+em DataFrame por cima de ArquivoChuvaLeve. Aqui ficam:
+    - a conversão da datahora da API (UTC) para o horário de Recife com zoneinfo;
+    - a deduplicação por (codestacao, datahora) contra as partições, lidas com
+      struct, que servem de índice de chaves em disco, e o acréscimo dos
+      registros novos ou corrigidos; a compactação das partições;
+    - o acréscimo das leituras novas ao chuva_recife_AAAA-MM-DD.csv formatando
+      cada coluna como o DataFrame.to_csv faria (tipo inferido no lote inteiro).
+
+Casos raros passam pelo pandas em atualizar_dados.py (LoteLeituras.de_registros
+devolve None ou escrever_csv_diario devolve False): registro sem codestacao ou
+datahora legível, leitura corrigida (o CSV do dia é reescrito) e coluna nova da API.
+
+Também fica aqui o cabeçalho do artefato risco_hoje.json (nome, versão e
+validade), para a coleta decidir sem pandas se precisa republicá-lo.
+"""
+import os
+import csv
+import json
+import math
+import struct
+import itertools
+import calendar
+from datetime import datetime, timezone, timedelta, date
+from zoneinfo import ZoneInfo
+
+FUSO_RECIFE = ZoneInfo('America/Recife')
+FORMATO_DATAHORA = '%Y-%m-%d %H:%M:%S'
+EPOCA = date(1970, 1, 1)
+DIRETORIO_ARQUIVO = 'dados_chuva'
+SEGUNDOS_DIA = 86400
+# Registro das partições: datahora, estação, valor, qualificação (21 bytes, sem alinhamento)
+FORMATO_REGISTRO = '<qidb'
+TAMANHO_REGISTRO = struct.calcsize(FORMATO_REGISTRO)
+CAMPOS_ESTACAO = ['codestacao', 'nome', 'cidade', 'uf', 'latitude', 'longitude', 'id_sensor']
+CAMINHO_REGISTRO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'registro_estacoes.json')
+
+NOME_ARTEFATO = 'risco_hoje.json'
+VERSAO_ARTEFATO = 1
+IDADE_MAXIMA_ARTEFATO = timedelta(hours=1)
+# A coleta republica mesmo sem leituras novas depois deste tempo, para o artefato não vencer
+IDADE_REPUBLICAR = timedelta(minutes=30)
+
+
+def _ausente(valor):
+    return valor is None or (isinstance(valor, float) and math.isnan(valor))
+
+
+def _tipo_coluna(valores):
+    """ 'int', 'float' ou 'objeto': o dtype que pd.DataFrame(registros) daria à coluna. """
+    if all(type(v) is int for v in valores):
+        return 'int'
+    presentes = [v for v in valores if not _ausente(v)]
+    if presentes and all(type(v) in (int, float) for v in presentes):
+        return 'float'
+    return 'objeto'
+
+
+def _texto_csv(valor, tipo):
+    """ Valor como o to_csv do pandas escreve numa coluna do tipo dado. """
+    if _ausente(valor):
+        return ''
+    if tipo == 'float':
+        return repr(float(valor))
+    return str(valor)
+
+
+def _numero(valor):
+    """ pd.to_numeric(errors='coerce') de um valor. """
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _interpretar_datahora(texto):
+    texto = str(texto)[:19].replace('T', ' ')
+    if len(texto) != 19:
+        return None
+    try:
+        return datetime.fromisoformat(texto)
+    except ValueError:
+        return None
+
+
+def datahora_recife(texto_utc):
+    """
+    (texto 'AAAA-MM-DD HH:MM:SS', segundos desde 1970) no horário de Recife de uma datahora
+    da API (UTC); None se não for legível. Os segundos são os do arquivo de chuva (horário local).
+    """
+    em_utc = _interpretar_datahora(texto_utc)
+    if em_utc is None:
+        return None
+    local = em_utc.replace(tzinfo=timezone.utc).astimezone(FUSO_RECIFE)
+    return local.strftime(FORMATO_DATAHORA), calendar.timegm(local.timetuple())
+
+
+def datahora_local(texto):
+    """ Como datahora_recife, para uma datahora que já está no horário de Recife (CSV diário). """
+    local = _interpretar_datahora(texto)
+    if local is None:
+        return None
+    return local.strftime(FORMATO_DATAHORA), calendar.timegm(local.timetuple())
+
+
+class LoteLeituras:
+    """ Registros de uma coleta já no horário de Recife, com as colunas e o tipo de cada uma. """
+
+    def __init__(self, registros, colunas, segundos):
+        self.registros = registros
+        self.colunas = colunas
+        self.segundos = segundos
+        # Sem a chave no registro a célula é NaN, como no DataFrame
+        self.tipos = {c: _tipo_coluna([r.get(c, math.nan) for r in registros]) for c in colunas}
+
+    @classmethod
+    def de_registros(cls, registros):
+        """ Lote a partir dos dicionários da API (UTC); None se algum registro precisa do caminho com pandas. """
+        return cls._converter(registros, datahora_recife)
+
+    @classmethod
+    def de_linhas(cls, linhas):
+        """ Lote a partir de linhas já no horário de Recife (ex.: DataFrame.to_dict('records')); None como acima. """
+        return cls._converter(linhas, datahora_local)
+
+    @classmethod
+    def _converter(cls, registros, converter_datahora):
+        colunas = list(dict.fromkeys(c for r in registros for c in r))
+        convertidos, segundos = [], []
+        # As estações reportam nos mesmos instantes: cada datahora é convertida uma vez
+        conversoes = {}
+        for registro in registros:
+            codigo = registro.get('codestacao')
+            texto = registro.get('datahora', '')
+            if texto not in conversoes:
+                conversoes[texto] = converter_datahora(texto)
+            local = conversoes[texto]
+            if local is None or isinstance(codigo, bool) or not isinstance(codigo, (str, int)):
+                return None
+            convertidos.append({**registro, 'datahora': local[0]})
+            segundos.append(local[1])
+        return cls(convertidos, colunas, segundos)
+
+    def __len__(self):
+        return len(self.registros)
+
+    def linhas_csv(self, indices, colunas=None):
+        """ Linhas de texto dos registros em indices, nas colunas dadas (ausentes ficam vazias). """
+        colunas = colunas or self.colunas
+        tipos = [self.tipos.get(c, 'objeto') for c in colunas]
+        return [[_texto_csv(self.registros[i].get(c), t) for c, t in zip(colunas, tipos)] for i in indices]
+
+    def metadados_estacao(self, registro):
+        """ Campos de estacoes.json da estação do registro (tipo da coluna, NaN vira None). """
+        estacao = {'codestacao': str(registro['codestacao'])}
+        for campo in CAMPOS_ESTACAO[1:]:
+            valor = registro.get(campo)
+            if _ausente(valor):
+                valor = None
+            elif self.tipos.get(campo) == 'float':
+                valor = float(valor)
+            estacao[campo] = valor
+        return estacao
+
+
+def _chave(registro):
+    """ (estação, datahora) de um registro como um inteiro: datahora em segundos cabe em 32 bits. """
+    return registro[1] << 32 | registro[0]
+
+
+def _empacotar(registros):
+    """ Bytes de uma sequência de registros (o formato '<' não tem alinhamento entre eles). """
+    return struct.pack('<' + FORMATO_REGISTRO[1:] * len(registros), *itertools.chain.from_iterable(registros))
+
+
+class ArquivoChuvaLeve:
+    """
+    Arquivo de chuva em partições diárias, somente com acréscimo: cada dia da leitura
+    é um .bin de registros FORMATO_REGISTRO (datahora em segundos, estação, valor,
+    qualificação) e os campos constantes das estações ficam em estacoes.json.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_ARQUIVO):
+        self.diretorio = diretorio
+        self.caminho_estacoes = os.path.join(diretorio, 'estacoes.json')
+        self.estacoes = []
+        if os.path.exists(self.caminho_estacoes):
+            with open(self.caminho_estacoes, 'r', encoding='utf-8') as f:
+                self.estacoes = json.load(f)
+        self._id_por_codigo = {e['codestacao']: i for i, e in enumerate(self.estacoes)}
+        # Por dia: chave (estação, datahora) -> registro da versão mais recente
+        self._indices = {}
+
+    def particoes(self):
+        """ Dias (AAAA-MM-DD) que possuem partição gravada. """
+        if not os.path.isdir(self.diretorio):
+            return []
+        return sorted(n[:-4] for n in os.listdir(self.diretorio) if n.endswith('.bin'))
+
+    def caminho_particao(self, dia):
+        return os.path.join(self.diretorio, f"{EPOCA + timedelta(days=dia)}.bin")
+
+    def _ler_particao(self, dia):
+        """ Registros (datahora, estação, valor, qualificação) da partição, na ordem gravada. """
+        caminho = self.caminho_particao(dia)
+        if not os.path.exists(caminho):
+            return []
+        with open(caminho, 'rb') as f:
+            dados = f.read()
+        # Um acréscimo interrompido pode deixar um registro incompleto no fim
+        return list(struct.iter_unpack(FORMATO_REGISTRO, dados[:len(dados) - len(dados) % TAMANHO_REGISTRO]))
+
+    def _indice(self, dia):
+        if dia not in self._indices:
+            self._indices[dia] = {_chave(r): r for r in self._ler_particao(dia)}
+        return self._indices[dia]
+
+    def _salvar_estacoes(self):
+        os.makedirs(self.diretorio, exist_ok=True)
+        temporario = f"{self.caminho_estacoes}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self.estacoes, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, self.caminho_estacoes)
+
+    def ids_estacoes(self, codigos, metadados):
+        """
+        Código categórico de cada código de estação. As estações novas são registradas com
+        metadados(i), os campos de estacoes.json da primeira posição i em que aparecem.
+        """
+        novas = False
+        for i, codigo in enumerate(codigos):
+            if codigo not in self._id_por_codigo:
+                self._id_por_codigo[codigo] = len(self.estacoes)
+                self.estacoes.append(metadados(i))
+                novas = True
+        if novas:
+            self._salvar_estacoes()
+        return [self._id_por_codigo[c] for c in codigos]
+
+    def anexar(self, lote):
+        """
+        Grava as leituras do lote que são novas ou corrigidas (as corrigidas prevalecem sobre
+        as anteriores) e devolve as listas (novas, alteradas), alinhadas com o lote.
+        """
+        codigos = [str(r['codestacao']) for r in lote.registros]
+        ids = self.ids_estacoes(codigos, lambda i: lote.metadados_estacao(lote.registros[i]))
+        registros = []
+        for registro, estacao, datahora in zip(lote.registros, ids, lote.segundos):
+            qualificacao = _numero(registro.get('qualificacao'))
+            registros.append((datahora, estacao, _numero(registro.get('valor')),
+                              -1 if math.isnan(qualificacao) else int(qualificacao)))
+        return self.anexar_registros(registros)
+
+    def anexar_registros(self, registros):
+        """
+        Como anexar, para registros já no formato da partição: tuplas (datahora em segundos
+        no horário de Recife, código da estação de ids_estacoes, valor, qualificação).
+        """
+        n = len(registros)
+        novas, alteradas = [False] * n, [False] * n
+
+        # Por dia, a posição da última ocorrência de cada chave: dentro do lote vale a mais recente
+        por_dia = {}
+        for i, (datahora, estacao, _, _) in enumerate(registros):
+            por_dia.setdefault(datahora // SEGUNDOS_DIA, {})[estacao << 32 | datahora] = i
+
+        for dia in sorted(por_dia):
+            posicoes = sorted(por_dia[dia].values())
+            indice = self._indice(dia)
+            if not indice:
+                # Partição vazia: tudo é novo; o índice é refeito da partição se o dia voltar
+                for i in posicoes:
+                    novas[i] = True
+                self._gravar(dia, [registros[i] for i in posicoes])
+                del self._indices[dia]
+                continue
+            gravar = []
+            for i in posicoes:
+                registro = registros[i]
+                chave = _chave(registro)
+                anterior = indice.get(chave)
+                if anterior is None:
+                    novas[i] = True
+                else:
+                    valor, valor_antigo = registro[2], anterior[2]
+                    mesmo_valor = valor_antigo == valor or (math.isnan(valor_antigo) and math.isnan(valor))
+                    if mesmo_valor and anterior[3] == registro[3]:
+                        continue
+                    alteradas[i] = True
+                gravar.append(registro)
+                indice[chave] = registro
+            if gravar:
+                self._gravar(dia, gravar)
+        return novas, alteradas
+
+    def _gravar(self, dia, registros):
+        os.makedirs(self.diretorio, exist_ok=True)
+        with open(self.caminho_particao(dia), 'ab') as f:
+            f.write(_empacotar(registros))
+
+    def compactar(self, dia_str):
+        """ Reescreve a partição do dia só com a versão mais recente de cada leitura. Devolve quantas saíram. """
+        dia = (date.fromisoformat(dia_str) - EPOCA).days
+        registros = self._ler_particao(dia)
+        if not registros:
+            return 0
+        ultima = {_chave(r): r for r in registros}
+        mantidos = sorted(ultima.values(), key=lambda r: (r[0], r[1]))
+
+        caminho = self.caminho_particao(dia)
+        with open(f"{caminho}.tmp", 'wb') as f:
+            f.write(_empacotar(mantidos))
+        os.replace(f"{caminho}.tmp", caminho)
+        self._indices.pop(dia, None)
+        return len(registros) - len(mantidos)
+
+
+def escrever_csv_diario(lote, indices, nome_arquivo):
+    """
+    Acrescenta ao CSV diário os registros do lote em indices, sem reler nem reescrever o arquivo.
+    Devolve False, sem gravar, se a API trouxe colunas que o arquivo não tem (reescrita com pandas).
+    """
+    if not indices:
+        print(f"Nenhuma leitura nova para '{nome_arquivo}'.")
+        return True
+
+    if not os.path.exists(nome_arquivo) or os.path.getsize(nome_arquivo) == 0:
+        print(f"Arquivo '{nome_arquivo}' não encontrado. Será criado um novo.")
+        with open(nome_arquivo, 'w', encoding='utf-8', newline='') as f:
+            escritor = csv.writer(f, lineterminator='\n')
+            escritor.writerow(lote.colunas)
+            escritor.writerows(lote.linhas_csv(indices))
+        print(f"✅ Arquivo '{nome_arquivo}' criado com {len(indices)} registros.")
+        return True
+
+    with open(nome_arquivo, 'rb') as f:
+        cabecalho = f.readline().decode('utf-8').strip().split(',')
+        f.seek(-1, os.SEEK_END)
+        termina_com_quebra = f.read(1) == b'\n'
+
+    if set(lote.colunas) - set(cabecalho):
+        return False
+
+    with open(nome_arquivo, 'a', encoding='utf-8', newline='') as f:
+        if not termina_com_quebra:
+            f.write('\n')
+        csv.writer(f, lineterminator='\n').writerows(lote.linhas_csv(indices, cabecalho))
+    print(f"✅ {len(indices)} registro(s) novo(s) acrescentado(s) a '{nome_arquivo}'.")
+    return True
+
+
+def codigos_monitorados(caminho=CAMINHO_REGISTRO):
+    """ Como estacoes.codigos_monitorados, sem importar o NumPy/pandas do módulo de estações. """
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return [e['codestacao'] for e in json.load(f)['estacoes'] if e.get('monitorada')]
+
+
+# --- Cabeçalho do artefato risco_hoje.json ---
+
+def ler_cabecalho_artefato(caminho=NOME_ARTEFATO):
+    """ Cabeçalho (tudo menos as linhas) do artefato local; None se não existir ou estiver ilegível. """
+    if not os.path.exists(caminho):
+        return None
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            artefato = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return None
+    artefato.pop('linhas', None)
+    return artefato
+
+
+def artefato_vencido(cabecalho, data_str, agora=None, idade_maxima=IDADE_MAXIMA_ARTEFATO):
+    """ Se o artefato não serve para data_str: outro dia, outra versão ou gerado há mais de idade_maxima. """
+    if cabecalho is None or cabecalho.get('versao') != VERSAO_ARTEFATO or cabecalho.get('data') != data_str:
+        return True
+    gerado_em = datetime.strptime(cabecalho['gerado_em'], '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+    return (agora or datetime.now(timezone.utc)) - gerado_em > idade_maxima
@@ -0,0 +1,152 @@
+# Arquivo: instrumentacao.py
+"""
+Medição leve das etapas da coleta, do CLI diário e do painel.
+
+Cada etapa vira uma linha JSON com o tempo de parede e os contadores que a
+etapa informar (linhas de entrada/saída, bytes lidos/gravados, acerto ou falha
+de cache etc.). A saída é ativada pela variável de ambiente RISCO_METRICAS:
+
+    RISCO_METRICAS=metricas.jsonl python calcular_risco_cli.py --incremental
+    RISCO_METRICAS=- python atualizar_dados.py          # '-' escreve no stderr
+
+Com RISCO_PERFIL=<nome da etapa>, as execuções dessa etapa também passam pelo
+cProfile e as 25 funções mais caras (tempo acumulado) vão para o stderr.
+
+Desativada, etapa() devolve sempre o mesmo objeto sem efeito: o custo é uma
+chamada de função e um bloco with.
+"""
+import os
+import io
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+import functools
+from datetime import datetime, timezone
+
+_trava = threading.Lock()
+_local = threading.local()
+_destino = None
+_perfil = None
+ATIVO = False
+
+
+def configurar(destino=None, perfil=None):
+    """ Liga a medição. destino: caminho do .jsonl ou '-' (stderr); perfil: etapa a perfilar. """
+    global _destino, _perfil, ATIVO
+    _destino = destino
+    _perfil = perfil
+    ATIVO = bool(destino)
+
+
+def _escrever(registro):
+    linha = json.dumps(registro, ensure_ascii=False, default=str)
+    with _trava:
+        if _destino == '-':
+            print(linha, file=sys.stderr, flush=True)
+        else:
+            with open(_destino, 'a', encoding='utf-8') as f:
+                f.write(linha + '\n')
+
+
+class Medicao:
+    """ Contadores de uma etapa em andamento; gravados como uma linha JSON ao sair do bloco. """
+
+    def __init__(self, nome, campos):
+        self.nome = nome
+        self.campos = campos
+        self._perfilador = cProfile.Profile() if nome == _perfil else None
+
+    def registrar(self, **campos):
+        self.campos.update(campos)
+
+    def somar(self, campo, valor):
+        self.campos[campo] = self.campos.get(campo, 0) + valor
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        if self._perfilador:
+            self._perfilador.enable()
+        return self
+
+    def __exit__(self, tipo, erro, _):
+        segundos = time.perf_counter() - self._inicio
+        if self._perfilador:
+            self._perfilador.disable()
+            saida = io.StringIO()
+            pstats.Stats(self._perfilador, stream=saida).sort_stats('cumulative').print_stats(25)
+            print(f"--- Perfil da etapa '{self.nome}' ---\n{saida.getvalue()}", file=sys.stderr)
+        registro = {'ts': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+                    'processo': os.path.basename(sys.argv[0]), 'etapa': self.nome,
+                    'segundos': round(segundos, 6)}
+        registro.update(self.campos)
+        if tipo is not None:
+            registro['erro'] = f"{tipo.__name__}: {erro}"
+        _escrever(registro)
+        return False
+
+
+class _MedicaoNula:
+    def registrar(self, **campos):
+        pass
+
+    def somar(self, campo, valor):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+
+_NULA = _MedicaoNula()
+
+
+def etapa(nome, **campos):
+    """ Bloco medido: with etapa('ler_csv', arquivo=caminho) as m: ...; m.registrar(linhas_saida=len(df)). """
+    if not ATIVO:
+        return _NULA
+    return Medicao(nome, campos)
+
+
+def evento(nome, **campos):
+    """ Linha avulsa, sem tempo (ex.: um acerto de cache). """
+    if ATIVO:
+        _escrever(dict({'ts': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+                        'processo': os.path.basename(sys.argv[0]), 'etapa': nome}, **campos))
+
+
+def marcar_execucao(nome):
+    """ Chamado dentro do corpo de uma função com st.cache_*: sinaliza que o cache falhou nesta thread. """
+    if ATIVO:
+        execucoes = getattr(_local, 'execucoes', None)
+        if execucoes is None:
+            execucoes = _local.execucoes = {}
+        execucoes[nome] = execucoes.get(nome, 0) + 1
+
+
+def medir_cache(nome):
+    """
+    Decorador aplicado por fora de @st.cache_data/@st.cache_resource: mede a chamada
+    e registra cache='miss' se o corpo (que chama marcar_execucao(nome)) rodou, senão 'hit'.
+    """
+    def decorador(funcao_cacheada):
+        @functools.wraps(funcao_cacheada)
+        def envoltorio(*args, **kwargs):
+            if not ATIVO:
+                return funcao_cacheada(*args, **kwargs)
+            execucoes = getattr(_local, 'execucoes', {})
+            antes = execucoes.get(nome, 0)
+            with etapa(nome) as m:
+                resultado = funcao_cacheada(*args, **kwargs)
+                m.registrar(cache='miss' if getattr(_local, 'execucoes', {}).get(nome, 0) > antes else 'hit')
+            return resultado
+        envoltorio.clear = getattr(funcao_cacheada, 'clear', None)
+        return envoltorio
+    return decorador
+
+
+configurar(os.getenv('RISCO_METRICAS'), os.getenv('RISCO_PERFIL'))
@@ -0,0 +1,175 @@
+# Arquivo: leituras_do_dia.py
+"""
+CSV diário de chuva publicado (chuva_recife_AAAA-MM-DD.csv) mantido em memória
+e atualizado por delta, para o painel.
+
+A coleta só acrescenta linhas ao CSV do dia (atualizar_csv_diario). Por isso,
+depois da primeira carga, cada atualização é uma requisição condicional
+(If-None-Match/If-Modified-Since: 304 quando nada mudou) que pede só os bytes
+a partir da última linha já lida (Range). Apenas as linhas acrescentadas são
+interpretadas. A última linha conhecida vem junto no Range e é conferida: se o
+arquivo foi reescrito (correção de leitura, cabeçalho novo) ela não bate e o
+arquivo é recarregado inteiro. Servidores que ignoram o Range (ex.: python -m
+http.server) devolvem o arquivo todo; nesse caso a mesma conferência é feita
+no corpo e ainda só o trecho novo é interpretado.
+
+Como uma correção que mantenha o tamanho do arquivo passaria pela conferência,
+uma carga completa (também condicional) é feita a cada RECARGA_COMPLETA.
+
+Teste local:
+    python -m http.server 8000      # no diretório dos CSVs
+    python leituras_do_dia.py http://localhost:8000/chuva_recife_2026-01-25.csv
+"""
+import sys
+import time
+import threading
+from io import BytesIO
+
+import pandas as pd
+import requests
+
+from coleta_cemaden import criar_sessao, requisitar
+from esquema import ler_leituras_csv, concatenar_leituras
+from instrumentacao import etapa
+
+RECARGA_COMPLETA = 3600  # segundos
+# Os deslocamentos do Range valem para o arquivo sem compressão
+CABECALHOS_BASE = {'Accept-Encoding': 'identity'}
+
+
+class LeiturasDoDia:
+    """
+    Leituras já interpretadas (tipos de esquema.py, colunas nomeEstacao e valorMedida)
+    e o estado da última requisição: validadores HTTP, bytes consumidos e a última linha.
+    """
+
+    def __init__(self, url, sessao=None, recarga_completa=RECARGA_COMPLETA):
+        self.url = url
+        self.sessao = sessao or criar_sessao(1)
+        self.recarga_completa = recarga_completa
+        self.leituras = pd.DataFrame()
+        self.etag = None
+        self.modificado_em = None
+        self.consumidos = 0          # bytes até a última quebra de linha já interpretada
+        self.cabecalho = b''
+        self.ultima_linha = b''      # inclui a quebra de linha final
+        self.carregado_em = float('-inf')
+        self.verificado_em = float('-inf')
+        self.carga = 0               # número de cargas completas; linhas só são acrescentadas dentro de uma carga
+        self._trava = threading.Lock()
+
+    def estado(self):
+        """ (carga, leituras) lidos juntos, para quem acompanha o arquivo pelo número de linhas. """
+        with self._trava:
+            return self.carga, self.leituras
+
+    def _cabecalhos_condicionais(self):
+        cabecalhos = dict(CABECALHOS_BASE)
+        if self.etag:
+            cabecalhos['If-None-Match'] = self.etag
+        elif self.modificado_em:
+            cabecalhos['If-Modified-Since'] = self.modificado_em
+        return cabecalhos
+
+    def _guardar_validadores(self, response):
+        self.etag = response.headers.get('ETag')
+        self.modificado_em = response.headers.get('Last-Modified')
+
+    def _interpretar(self, trecho):
+        """ Leituras das linhas completas do trecho (sem cabeçalho); a linha incompleta fica para depois. """
+        fim = trecho.rfind(b'\n') + 1
+        if fim == 0:
+            return pd.DataFrame(), 0
+        linhas = trecho[:fim]
+        self.ultima_linha = linhas[linhas.rfind(b'\n', 0, fim - 1) + 1:]
+        return ler_leituras_csv(BytesIO(self.cabecalho + linhas), renomear=True), fim
+
+    def _carga_completa(self, corpo):
+        """ Reinicia o estado a partir do arquivo inteiro. """
+        fim_cabecalho = corpo.find(b'\n') + 1
+        self.cabecalho = corpo[:fim_cabecalho]
+        self.ultima_linha = b''
+        novas, n_bytes = self._interpretar(corpo[fim_cabecalho:]) if fim_cabecalho else (pd.DataFrame(), 0)
+        self.leituras = novas
+        self.consumidos = fim_cabecalho + n_bytes
+        self.carregado_em = time.monotonic()
+        self.carga += 1
+        return novas
+
+    def _acrescentar(self, trecho):
+        """ Interpreta os bytes depois de self.consumidos e junta as linhas às leituras. """
+        novas, n_bytes = self._interpretar(trecho)
+        self.consumidos += n_bytes
+        if not novas.empty:
+            self.leituras = concatenar_leituras([self.leituras, novas])
+        return novas
+
+    def atualizar(self, intervalo=0):
+        """
+        Busca o que mudou desde a última chamada. Devolve (novas, completo): as leituras
+        novas e se o arquivo foi recarregado inteiro (então `novas` são todas as leituras).
+        Devolve None, sem requisição, se a última verificação tem menos de `intervalo` segundos.
+        """
+        with self._trava:
+            if time.monotonic() - self.verificado_em < intervalo:
+                return None
+            try:
+                return self._atualizar()
+            finally:
+                # Também depois de uma falha, para não repetir a requisição a cada chamada
+                self.verificado_em = time.monotonic()
+
+    def _atualizar(self):
+        with etapa('leituras_do_dia', url=self.url) as m:
+            completo = self.consumidos == 0 or time.monotonic() - self.carregado_em >= self.recarga_completa
+            cabecalhos = self._cabecalhos_condicionais()
+            inicio = self.consumidos - len(self.ultima_linha)
+            if not completo:
+                cabecalhos['Range'] = f"bytes={inicio}-"
+            try:
+                response = requisitar(self.sessao, 'GET', self.url, headers=cabecalhos)
+            except requests.exceptions.HTTPError as e:
+                if e.response is None or e.response.status_code != 416:
+                    raise
+                # Range além do fim: o arquivo encolheu, logo foi reescrito
+                response = requisitar(self.sessao, 'GET', self.url, headers=CABECALHOS_BASE)
+                completo = True
+            m.registrar(status=response.status_code, bytes_lidos=len(response.content))
+
+            if response.status_code == 304:
+                if completo:
+                    self.carregado_em = time.monotonic()
+                return pd.DataFrame(), False
+            self._guardar_validadores(response)
+            corpo = response.content
+
+            if response.status_code == 206:
+                # Trecho a partir da última linha conhecida
+                if corpo.startswith(self.ultima_linha):
+                    return self._acrescentar(corpo[len(self.ultima_linha):]), False
+                corpo = requisitar(self.sessao, 'GET', self.url, headers=CABECALHOS_BASE).content
+            elif not completo and corpo[inicio:self.consumidos] == self.ultima_linha and corpo.startswith(self.cabecalho):
+                # O servidor ignorou o Range: o arquivo veio inteiro, mas só o final é novo
+                return self._acrescentar(corpo[self.consumidos:]), False
+
+            m.registrar(carga_completa=True)
+            return self._carga_completa(corpo), True
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("Uso: python leituras_do_dia.py URL_DO_CSV [intervalo_em_segundos]")
+        sys.exit(1)
+    leituras = LeiturasDoDia(argv[0])
+    intervalo = float(argv[1]) if len(argv) > 1 else 10
+    while True:
+        novas, completo = leituras.atualizar()
+        tipo = "carga completa" if completo else "delta"
+        print(f"{tipo}: {len(novas)} leitura(s) nova(s), {len(leituras.leituras)} no total "
+              f"({leituras.consumidos} bytes, ETag {leituras.etag}).")
+        time.sleep(intervalo)
+
+
+if __name__ == "__main__":
+    main()
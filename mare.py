@@ -0,0 +1,229 @@
+# Arquivo: mare.py
+"""
+Tábua de maré (AM) pré-compilada e indexada por hora.
+
+O CSV horário de maré é convertido uma única vez num vetor float64 indexado por
+"horas desde 1970-01-01" e salvo em .npy (lido com memória mapeada). O vetor só
+é recompilado quando o CSV de origem muda (tamanho ou SHA-256 diferentes). Para
+não ler o CSV a cada carga, os metadados guardam também o tamanho e o mtime do
+arquivo local (o hash só é calculado quando eles mudam) ou o ETag da URL (pedida
+com If-None-Match; 304 reaproveita o .npy).
+A consulta de AM para um vetor de datahoras é um acesso direto por índice,
+sem strftime e sem merge por strings.
+
+carregar_fonte_am monta a fonte de AM usada pelo CLI, pelo painel e pelos
+alertas: a tábua do CSV, completada pelo previsor harmônico fora da cobertura.
+"""
+import os
+import sys
+import json
+import hashlib
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+import requests
+
+DIRETORIO_MARE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tide')
+CAMINHO_CSV_MARE = os.path.join(DIRETORIO_MARE, 'mare_calculada_hora_em_hora_ano-completo.csv')
+CAMINHO_TABUA = os.path.join(DIRETORIO_MARE, 'mare_horaria.npy')
+CAMINHO_METADADOS = os.path.join(DIRETORIO_MARE, 'mare_horaria.json')
+URL_ARQUIVO_MARE_AM = 'https://raw.githubusercontent.com/RafaellaB/Diagramas-de-risco-din-mico/main/tide/mare_calculada_hora_em_hora_ano-completo.csv'
+
+
+class TabuaMare:
+    """ Alturas de maré horárias: alturas[i] é a AM da hora (hora_inicial + i). """
+
+    def __init__(self, hora_inicial, alturas):
+        self.hora_inicial = int(hora_inicial)
+        self.alturas = alturas
+
+    def __len__(self):
+        return len(self.alturas)
+
+    def am(self, datahoras):
+        """ AM para cada datahora (truncada na hora cheia). Horas fora da tábua viram NaN. """
+        datahoras = np.asarray(datahoras)
+        if datahoras.dtype.kind != 'M':
+            # pd.to_datetime só para texto: numa coluna datetime64 ele percorre os valores um a um
+            datahoras = np.asarray(pd.to_datetime(datahoras))
+        horas = datahoras.astype('datetime64[h]').astype(np.int64)
+        indices = horas - self.hora_inicial
+        dentro = (indices >= 0) & (indices < len(self.alturas))
+        resultado = np.full(len(indices), np.nan)
+        resultado[dentro] = self.alturas[indices[dentro]]
+        return resultado
+
+
+class MareCombinada:
+    """
+    AM da tábua do CSV nas horas que ela cobre; fora delas, ou em passos menores
+    que a hora, AM do previsor harmônico (mare_harmonica.PrevisorMare).
+    """
+
+    def __init__(self, tabua, previsor):
+        self.tabua = tabua
+        self.previsor = previsor
+
+    def am(self, datahoras, passo_min=60):
+        if passo_min < 60:
+            return self.previsor.am(datahoras, passo_min)
+        resultado = self.tabua.am(datahoras)
+        fora = np.isnan(resultado)
+        if fora.any():
+            resultado[fora] = self.previsor.am(np.asarray(datahoras)[fora])
+        return resultado
+
+
+def _baixar(url, metadados):
+    """ (conteúdo, validadores) da URL; conteúdo None se o servidor responder 304 ao ETag guardado. """
+    cabecalhos = {}
+    if metadados and metadados.get('url') == url and metadados.get('etag'):
+        cabecalhos['If-None-Match'] = metadados['etag']
+    response = requests.get(url, headers=cabecalhos)
+    if response.status_code == 304:
+        return None, {}
+    response.raise_for_status()
+    return response.content, {'url': url, 'etag': response.headers.get('ETag')}
+
+
+def _estado_arquivo(caminho):
+    estado = os.stat(caminho)
+    return {'tamanho': estado.st_size, 'mtime_ns': estado.st_mtime_ns}
+
+
+def interpretar_csv_mare(conteudo):
+    """
+    Converte o texto do CSV de maré (';' e vírgula decimal) em (horas desde a época, alturas).
+    Linhas de marcas de conflito do git são descartadas.
+    """
+    linhas = [l for l in conteudo.splitlines() if not l.startswith(('<<<<', '====', '>>>>')) and l.strip()]
+    if not linhas:
+        raise ValueError("CSV de maré vazio.")
+    separador = ';' if ';' in linhas[0] else ','
+    df = pd.read_csv(StringIO("\n".join(linhas)), sep=separador, decimal=',')
+    df = df.rename(columns={'Hora_Exata': 'datahora', 'Altura_m': 'AM', 'altura': 'AM'})
+    if 'datahora' not in df.columns or 'AM' not in df.columns:
+        raise KeyError("Colunas 'Hora_Exata'/'Altura_m' não encontradas no CSV de maré.")
+    datahora = pd.to_datetime(df['datahora'], errors='coerce')
+    am = pd.to_numeric(df['AM'].astype(str).str.replace(',', '.'), errors='coerce')
+    validos = datahora.notna()
+    horas = datahora[validos].to_numpy(dtype='datetime64[h]').astype(np.int64)
+    return horas, am[validos].to_numpy(dtype=np.float64)
+
+
+def compilar_tabua(horas, alturas):
+    """ Monta o vetor contínuo por hora. Horas ausentes ficam NaN; horas repetidas ficam com o último valor. """
+    hora_inicial = int(horas.min())
+    vetor = np.full(int(horas.max()) - hora_inicial + 1, np.nan)
+    ordem = np.argsort(horas, kind='stable')
+    vetor[horas[ordem] - hora_inicial] = alturas[ordem]
+    return TabuaMare(hora_inicial, vetor)
+
+
+def _assinatura(conteudo):
+    return {'tamanho': len(conteudo), 'sha256': hashlib.sha256(conteudo).hexdigest()}
+
+
+def _ler_metadados(caminho_metadados):
+    try:
+        with open(caminho_metadados, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _salvar_metadados(metadados, caminho_metadados):
+    with open(f"{caminho_metadados}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(metadados, f, indent=2)
+    os.replace(f"{caminho_metadados}.tmp", caminho_metadados)
+
+
+def _tabua_compilada(metadados, caminho_tabua):
+    """ TabuaMare do .npy descrito pelos metadados, ou None se ele faltar ou não bater com eles. """
+    if not metadados or not os.path.exists(caminho_tabua):
+        return None
+    alturas = np.load(caminho_tabua, mmap_mode='r')
+    if len(alturas) != metadados.get('n_horas'):
+        return None
+    return TabuaMare(metadados['hora_inicial'], alturas)
+
+
+def _gravar_sem_falhar(gravar, *args):
+    try:
+        gravar(*args)
+    except OSError as e:
+        # Sem permissão de escrita a tábua ainda pode ser usada em memória
+        print(f"⚠️ Não foi possível salvar a tábua compilada: {e}", file=sys.stderr)
+
+
+def salvar_tabua(tabua, assinatura, caminho_tabua=CAMINHO_TABUA, caminho_metadados=CAMINHO_METADADOS):
+    """ Grava o vetor em .npy e os metadados (hora inicial e assinatura da origem) em JSON. """
+    temporario = f"{caminho_tabua}.tmp"
+    with open(temporario, 'wb') as f:
+        np.save(f, np.ascontiguousarray(tabua.alturas, dtype=np.float64))
+    os.replace(temporario, caminho_tabua)
+    _salvar_metadados(dict(assinatura, hora_inicial=tabua.hora_inicial, n_horas=len(tabua)), caminho_metadados)
+
+
+def carregar_tabua_mare(origem=CAMINHO_CSV_MARE, caminho_tabua=CAMINHO_TABUA, caminho_metadados=CAMINHO_METADADOS):
+    """
+    Devolve a TabuaMare da origem (caminho local ou URL).
+    Reaproveita o .npy compilado quando a origem não mudou: arquivo local com o
+    mesmo tamanho e mtime, URL que responde 304 ou, na falta disso, conteúdo com
+    o mesmo SHA-256. Caso contrário interpreta o CSV e recompila.
+    """
+    metadados = _ler_metadados(caminho_metadados)
+
+    if origem.startswith(('http://', 'https://')):
+        conteudo, validadores = _baixar(origem, metadados)
+        if conteudo is None:
+            tabua = _tabua_compilada(metadados, caminho_tabua)
+            if tabua is not None:
+                return tabua
+            conteudo, validadores = _baixar(origem, None)
+    else:
+        validadores = _estado_arquivo(origem)
+        if metadados and all(metadados.get(k) == v for k, v in validadores.items()):
+            tabua = _tabua_compilada(metadados, caminho_tabua)
+            if tabua is not None:
+                return tabua
+        with open(origem, 'rb') as f:
+            conteudo = f.read()
+    assinatura = dict(_assinatura(conteudo), **validadores)
+
+    if metadados and metadados.get('sha256') == assinatura['sha256']:
+        tabua = _tabua_compilada(metadados, caminho_tabua)
+        if tabua is not None:
+            # Mesmo conteúdo com outro mtime/ETag (ex.: checkout novo): só os metadados mudam
+            _gravar_sem_falhar(_salvar_metadados, dict(metadados, **assinatura), caminho_metadados)
+            return tabua
+
+    print("Compilando tábua de maré a partir do CSV...")
+    horas, alturas = interpretar_csv_mare(conteudo.decode('utf-8'))
+    tabua = compilar_tabua(horas, alturas)
+    _gravar_sem_falhar(salvar_tabua, tabua, assinatura, caminho_tabua, caminho_metadados)
+    return tabua
+
+
+def carregar_fonte_am(url=URL_ARQUIVO_MARE_AM):
+    """
+    Fonte de AM do CLI, do painel e dos alertas: a tábua compilada do CSV (o arquivo
+    local do repositório ou, sem ele, a url) completada pelo previsor harmônico
+    (tide/constantes_harmonicas.json) fora da cobertura do CSV. Sem um dos dois, só o
+    outro; None se nenhum puder ser carregado.
+    """
+    # Importado aqui porque mare_harmonica importa este módulo
+    from mare_harmonica import carregar_previsor
+    previsor = carregar_previsor()
+    origem = CAMINHO_CSV_MARE if os.path.exists(CAMINHO_CSV_MARE) else url
+    try:
+        tabua = carregar_tabua_mare(origem)
+    except Exception as e:
+        print(f"ERRO Maré: {e}", file=sys.stderr)
+        tabua = None
+    if previsor is None:
+        return tabua
+    if tabua is None:
+        return previsor
+    return MareCombinada(tabua, previsor)
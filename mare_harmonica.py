@@ -0,0 +1,244 @@
+# Arquivo: mare_harmonica.py
+"""
+Previsão harmônica da maré (AM) para o marégrafo de Recife.
+
+A altura é Z0 + soma de f_k * H_k * cos(V_k(t) + u_k(t) - g_k) sobre as
+constituintes da tabela CONSTITUINTES. V_k é o argumento astronômico
+(números de Doodson sobre as longitudes médias da Lua e do Sol). f_k e u_k
+são as correções nodais (ciclo de 18,6 anos, fórmulas de Schureman).
+Amplitudes H_k e fases g_k vêm de tide/constantes_harmonicas.json, ajustadas
+por mínimos quadrados à série horária do CSV de maré (ajustar_constantes).
+
+O cálculo é vetorizado sobre qualquer vetor de instantes, em qualquer
+resolução. Os períodos já calculados ficam em cache por mês e resolução
+(PrevisorMare.am), de modo que a junção com o VP não recalcula a maré.
+
+O CLI, o painel e os alertas usam a previsão só onde a tábua do CSV não
+alcança (mare.carregar_fonte_am): dentro da cobertura vale o CSV.
+
+Uso em linha de comando:
+    python mare_harmonica.py ajustar      # ajusta as constantes ao CSV de maré
+    python mare_harmonica.py validar      # compara a previsão com o CSV
+"""
+import os
+import json
+import argparse
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from mare import CAMINHO_CSV_MARE, DIRETORIO_MARE, interpretar_csv_mare
+
+CAMINHO_CONSTANTES = os.path.join(DIRETORIO_MARE, 'constantes_harmonicas.json')
+FUSO_HORAS = -3  # horário de Recife (sem horário de verão): UTC-3
+CASAS_DECIMAIS = 2  # como no CSV horário
+J2000 = np.datetime64('2000-01-01T12:00:00', 's')
+
+# Números de Doodson (tau, s, h, p, N', p1), fase extra em graus e grupo de correção nodal
+CONSTITUINTES = {
+    'Sa':   ((0, 0, 1, 0, 0, 0), 0, None),
+    'Ssa':  ((0, 0, 2, 0, 0, 0), 0, None),
+    'Mm':   ((0, 1, 0, -1, 0, 0), 0, 'Mm'),
+    'Mf':   ((0, 2, 0, 0, 0, 0), 0, 'Mf'),
+    'Q1':   ((1, -2, 0, 1, 0, 0), -90, 'O1'),
+    'O1':   ((1, -1, 0, 0, 0, 0), -90, 'O1'),
+    'P1':   ((1, 1, -2, 0, 0, 0), -90, None),
+    'K1':   ((1, 1, 0, 0, 0, 0), 90, 'K1'),
+    'J1':   ((1, 2, 0, -1, 0, 0), 90, 'J1'),
+    'OO1':  ((1, 3, 0, 0, 0, 0), 90, 'OO1'),
+    '2N2':  ((2, -2, 0, 2, 0, 0), 0, 'M2'),
+    'MU2':  ((2, -2, 2, 0, 0, 0), 0, 'M2'),
+    'N2':   ((2, -1, 0, 1, 0, 0), 0, 'M2'),
+    'NU2':  ((2, -1, 2, -1, 0, 0), 0, 'M2'),
+    'M2':   ((2, 0, 0, 0, 0, 0), 0, 'M2'),
+    'L2':   ((2, 1, 0, -1, 0, 0), 180, 'M2'),
+    'T2':   ((2, 2, -3, 0, 0, 1), 0, None),
+    'S2':   ((2, 2, -2, 0, 0, 0), 0, None),
+    'K2':   ((2, 2, 0, 0, 0, 0), 0, 'K2'),
+    'M3':   ((3, 0, 0, 0, 0, 0), 180, 'M3'),
+    'MN4':  ((4, -1, 0, 1, 0, 0), 0, 'M4'),
+    'M4':   ((4, 0, 0, 0, 0, 0), 0, 'M4'),
+    'MS4':  ((4, 2, -2, 0, 0, 0), 0, 'M2'),
+    '2MS6': ((6, 2, -2, 0, 0, 0), 0, 'M4'),
+    '2NM6': ((6, -2, 0, 2, 0, 0), 0, 'M6'),
+    '2MN6': ((6, -1, 0, 1, 0, 0), 0, 'M6'),
+    'M6':   ((6, 0, 0, 0, 0, 0), 0, 'M6'),
+    'MSN6': ((6, 1, -2, 1, 0, 0), 0, 'M4'),
+    '2MK6': ((6, 2, 0, 0, 0, 0), 0, 'M4'),
+    '2SM6': ((6, 4, -4, 0, 0, 0), 0, 'M2'),
+    '3MN8': ((8, -1, 0, 1, 0, 0), 0, 'M8'),
+    'M8':   ((8, 0, 0, 0, 0, 0), 0, 'M8'),
+    '3MS8': ((8, 2, -2, 0, 0, 0), 0, 'M6'),
+    '4MN10': ((10, -1, 0, 1, 0, 0), 0, 'M10'),
+    'M10':  ((10, 0, 0, 0, 0, 0), 0, 'M10'),
+    '4MS10': ((10, 2, -2, 0, 0, 0), 0, 'M8'),
+}
+
+
+def _longitudes_medias(horas_j2000):
+    """ tau, s, h, p, N, p1 em graus para instantes em horas UTC desde J2000. """
+    T = horas_j2000 / (24 * 36525.0)
+    s = 218.3164477 + 481267.88123421 * T
+    h = 280.46646 + 36000.76983 * T
+    p = 83.3532465 + 4069.0137287 * T
+    N = 125.04452 - 1934.136261 * T
+    p1 = 282.94 + 1.7192 * T
+    # Ângulo horário do Sol médio em Greenwich (180° à meia-noite UTC) somado a h - s
+    tau = 180.0 + 15.0 * np.mod(horas_j2000 + 12.0, 24.0) + h - s
+    return tau, s, h, p, N, p1
+
+
+def _correcoes_nodais(N):
+    """ f (fator de amplitude) e u (graus) por grupo nodal, em função da longitude do nodo N. """
+    n = np.radians(N)
+    c1, c2, c3 = np.cos(n), np.cos(2 * n), np.cos(3 * n)
+    s1, s2, s3 = np.sin(n), np.sin(2 * n), np.sin(3 * n)
+    f_m2 = 1.0004 - 0.0373 * c1 + 0.0002 * c2
+    u_m2 = -2.14 * s1
+    return {
+        'M2': (f_m2, u_m2),
+        'M3': (f_m2 ** 1.5, 1.5 * u_m2),
+        'M4': (f_m2 ** 2, 2 * u_m2),
+        'M6': (f_m2 ** 3, 3 * u_m2),
+        'M8': (f_m2 ** 4, 4 * u_m2),
+        'M10': (f_m2 ** 5, 5 * u_m2),
+        'K1': (1.0060 + 0.1150 * c1 - 0.0088 * c2 + 0.0006 * c3, -8.86 * s1 + 0.68 * s2 - 0.07 * s3),
+        'O1': (1.0089 + 0.1871 * c1 - 0.0147 * c2 + 0.0014 * c3, 10.80 * s1 - 1.34 * s2 + 0.19 * s3),
+        'J1': (1.0129 + 0.1676 * c1 - 0.0170 * c2 + 0.0016 * c3, -12.94 * s1 + 1.34 * s2 - 0.19 * s3),
+        'OO1': (1.1027 + 0.6504 * c1 + 0.0317 * c2 - 0.0014 * c3, -36.68 * s1 + 4.02 * s2 - 0.57 * s3),
+        'K2': (1.0241 + 0.2863 * c1 + 0.0083 * c2 - 0.0015 * c3, -17.74 * s1 + 0.68 * s2 - 0.04 * s3),
+        'Mf': (1.043 + 0.414 * c1, -23.7 * s1 + 2.7 * s2 - 0.4 * s3),
+        'Mm': (1.000 - 0.130 * c1, np.zeros_like(n)),
+    }
+
+
+def _horas_j2000(datahoras_locais):
+    """ Instantes locais de Recife (datetime64 ingênuo) em horas UTC desde J2000. """
+    segundos = np.asarray(datahoras_locais, dtype='datetime64[s]') - J2000
+    return segundos.astype(np.float64) / 3600.0 - FUSO_HORAS
+
+
+def _argumentos(horas_j2000, nomes):
+    """ Matrizes (n_instantes, n_constituintes) de f e de V + u em radianos. """
+    tau, s, h, p, N, p1 = _longitudes_medias(horas_j2000)
+    base = np.stack([tau, s, h, p, -N, p1], axis=1)  # N' = -N
+    doodson = np.array([CONSTITUINTES[c][0] for c in nomes], dtype=float)
+    extra = np.array([CONSTITUINTES[c][1] for c in nomes], dtype=float)
+    angulo = base @ doodson.T + extra
+    nodais = _correcoes_nodais(N)
+    f = np.ones_like(angulo)
+    for j, c in enumerate(nomes):
+        grupo = CONSTITUINTES[c][2]
+        if grupo is not None:
+            f[:, j], u = nodais[grupo]
+            angulo[:, j] += u
+    return f, np.radians(np.mod(angulo, 360.0))
+
+
+def ajustar_constantes(datahoras, alturas, nomes=None):
+    """ Mínimos quadrados das amplitudes (m) e fases (graus) sobre uma série de alturas. """
+    nomes = list(nomes or CONSTITUINTES)
+    validos = ~np.isnan(alturas)
+    f, arg = _argumentos(_horas_j2000(np.asarray(datahoras)[validos]), nomes)
+    A = np.hstack([np.ones((len(f), 1)), f * np.cos(arg), f * np.sin(arg)])
+    coef, *_ = np.linalg.lstsq(A, alturas[validos], rcond=None)
+    a, b = coef[1:1 + len(nomes)], coef[1 + len(nomes):]
+    return {
+        'Z0': float(coef[0]),
+        'constituintes': {c: {'amplitude': float(np.hypot(a[j], b[j])), 'fase': float(np.degrees(np.arctan2(b[j], a[j])) % 360)}
+                          for j, c in enumerate(nomes)},
+    }
+
+
+class PrevisorMare:
+    """ Alturas de maré a partir das constantes harmônicas, com cache por mês e resolução. """
+
+    def __init__(self, constantes, casas_decimais=CASAS_DECIMAIS, meses_em_cache=64):
+        self.constantes = constantes
+        self.casas_decimais = casas_decimais
+        self._nomes = list(constantes['constituintes'])
+        self._amplitude = np.array([constantes['constituintes'][c]['amplitude'] for c in self._nomes])
+        self._fase = np.radians([constantes['constituintes'][c]['fase'] for c in self._nomes])
+        self._bloco = lru_cache(maxsize=meses_em_cache)(self._calcular_mes)
+
+    def alturas(self, datahoras):
+        """ Alturas exatas (sem arredondar) nos instantes dados, em blocos para limitar a memória. """
+        horas = _horas_j2000(datahoras)
+        resultado = np.empty(len(horas))
+        for i in range(0, len(horas), 100_000):
+            f, arg = _argumentos(horas[i:i + 100_000], self._nomes)
+            resultado[i:i + 100_000] = self.constantes['Z0'] + (f * self._amplitude * np.cos(arg - self._fase)).sum(axis=1)
+        return resultado
+
+    def _calcular_mes(self, mes, passo_min):
+        inicio = np.datetime64(mes, 'M').astype('datetime64[m]')
+        fim = (np.datetime64(mes, 'M') + 1).astype('datetime64[m]')
+        alturas = self.alturas(np.arange(inicio, fim, np.timedelta64(passo_min, 'm')))
+        if self.casas_decimais is not None:
+            alturas = np.round(alturas, self.casas_decimais)
+        alturas.flags.writeable = False
+        return alturas
+
+    def am(self, datahoras, passo_min=60):
+        """
+        AM de cada datahora truncada na resolução passo_min (60 = hora cheia, como a
+        tábua do CSV). Os meses tocados são calculados uma vez e ficam em cache.
+        """
+        minutos = np.asarray(pd.to_datetime(datahoras)).astype('datetime64[m]')
+        resultado = np.full(len(minutos), np.nan)
+        validos = ~np.isnat(minutos)
+        meses = minutos[validos].astype('datetime64[M]')
+        posicao = (minutos[validos] - meses.astype('datetime64[m]')).astype(np.int64) // passo_min
+        valores = np.empty(len(meses))
+        for mes in np.unique(meses):
+            no_mes = meses == mes
+            valores[no_mes] = self._bloco(str(mes), passo_min)[posicao[no_mes]]
+        resultado[validos] = valores
+        return resultado
+
+
+def carregar_constantes(caminho=CAMINHO_CONSTANTES):
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def carregar_previsor(caminho=CAMINHO_CONSTANTES):
+    """ PrevisorMare das constantes salvas, ou None se o arquivo não existir. """
+    if not os.path.exists(caminho):
+        return None
+    return PrevisorMare(carregar_constantes(caminho))
+
+
+def _serie_do_csv(origem):
+    with open(origem, 'r', encoding='utf-8') as f:
+        horas, alturas = interpretar_csv_mare(f.read())
+    return horas.astype('datetime64[h]'), alturas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Constantes harmônicas e previsão de maré.")
+    parser.add_argument('--csv', default=CAMINHO_CSV_MARE)
+    parser.add_argument('--constantes', default=CAMINHO_CONSTANTES)
+    sub = parser.add_subparsers(dest='comando', required=True)
+    sub.add_parser('ajustar', help="Ajusta as constantes à série horária do CSV.")
+    sub.add_parser('validar', help="Compara a previsão com o CSV.")
+    args = parser.parse_args(argv)
+
+    datahoras, alturas = _serie_do_csv(args.csv)
+    if args.comando == 'ajustar':
+        constantes = ajustar_constantes(datahoras, alturas)
+        constantes['origem'] = os.path.basename(args.csv)
+        constantes['periodo'] = [str(datahoras.min()), str(datahoras.max())]
+        with open(args.constantes, 'w', encoding='utf-8') as f:
+            json.dump(constantes, f, indent=2)
+        print(f"✅ {len(constantes['constituintes'])} constituintes ajustadas em '{args.constantes}'.")
+
+    previsor = PrevisorMare(carregar_constantes(args.constantes))
+    erro = previsor.am(datahoras) - alturas
+    print(f"Erro em relação ao CSV: RMS {np.sqrt(np.nanmean(erro ** 2)):.4f} m, "
+          f"máximo {np.nanmax(np.abs(erro)):.4f} m, {np.mean(np.abs(erro) <= 0.05) * 100:.1f}% das horas dentro de 5 cm.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+# Arquivo: motor_vp.py
+"""
+Motor vetorizado do indicador de chuva VP, usado pelo CLI diário e pelo painel.
+
+VP = (chuva acumulada em 10 min * 6) + chuva acumulada em 2 h, tomado na última
+leitura válida de cada hora de cada estação (equivalente a rolling + resample('h').last()).
+Todas as estações são calculadas de uma vez com NumPy: janelas por searchsorted
+e somas compensadas (Kahan) em vez de um rolling por grupo.
+"""
+import numpy as np
+import pandas as pd
+
+JANELA_10MIN = pd.Timedelta('10min')
+JANELA_2H = pd.Timedelta('2h')
+HORA_NS = pd.Timedelta('1h').value
+SEM_MARCA = np.iinfo(np.int64).min
+
+COLUNAS_VP = ['datahora', 'nomeEstacao', 'chuva_10min', 'chuva_2h', 'VP']
+
+
+def _chave_estacao_tempo(codigos, tempo):
+    """
+    Chave composta estação+tempo, crescente para linhas ordenadas por estação e tempo.
+    Os tempos são trocados pelo seu posto para que a chave caiba em int64
+    qualquer que seja o número de estações e a extensão do período.
+    """
+    tempos_unicos = np.unique(tempo)
+    base = len(tempos_unicos) + 1
+    return codigos * base + np.searchsorted(tempos_unicos, tempo, side='left'), tempos_unicos, base
+
+
+def _inicio_janelas(chave, tempos_unicos, base, codigos, tempo, largura_ns):
+    """ Posição da primeira leitura da mesma estação dentro da janela (t - largura, t]. """
+    posto_limite = np.searchsorted(tempos_unicos, tempo - largura_ns, side='right')
+    return np.searchsorted(chave, codigos * base + posto_limite, side='left')
+
+
+def _somas_janela(valores, validos, contagem, inicio, fim):
+    """
+    Soma de valores[inicio:fim] para cada janela, ignorando NaN.
+    Usa soma compensada e, como o rolling do pandas, devolve valor * n quando
+    todas as leituras da janela são iguais. Janelas sem leitura válida viram NaN.
+    """
+    n_janelas = len(inicio)
+    soma = np.zeros(n_janelas)
+    compensacao = np.zeros(n_janelas)
+    minimo = np.full(n_janelas, np.inf)
+    maximo = np.full(n_janelas, -np.inf)
+    largura_max = int((fim - inicio).max()) if n_janelas else 0
+
+    for k in range(largura_max):
+        idx = inicio + k
+        dentro = idx < fim
+        idx = np.where(dentro, idx, 0)
+        usar = dentro & validos[idx]
+        x = np.where(usar, valores[idx], 0.0)
+        y = x - compensacao
+        t = soma + y
+        compensacao = (t - soma) - y
+        soma = t
+        minimo = np.where(usar, np.minimum(minimo, x), minimo)
+        maximo = np.where(usar, np.maximum(maximo, x), maximo)
+
+    constante = minimo == maximo
+    resultado = np.where(constante, minimo * contagem, soma)
+    return np.where(contagem > 0, resultado, np.nan)
+
+
+def _ultima_por_grupo(grupo, candidatos):
+    """ Posição da última linha candidata de cada grupo (grupos já ordenados). """
+    linhas = np.flatnonzero(candidatos)
+    if len(linhas) == 0:
+        return linhas, linhas
+    g = grupo[linhas]
+    fim_de_grupo = np.r_[g[1:] != g[:-1], True]
+    return g[fim_de_grupo], linhas[fim_de_grupo]
+
+
+def calcular_vp_horario(df_chuva, coluna_tempo='datahora', coluna_estacao='nomeEstacao', coluna_valor='valorMedida'):
+    """
+    Calcula chuva_10min, chuva_2h e VP horários para todas as estações presentes em df_chuva.
+
+    Retorna uma linha por estação e hora, da primeira à última hora com leitura
+    (horas sem leitura ficam com NaN, como no resample), ordenada por estação e hora.
+    """
+    if df_chuva.empty:
+        return pd.DataFrame(columns=COLUNAS_VP)
+
+    codigos, estacoes = pd.factorize(df_chuva[coluna_estacao], sort=True)
+    tempo = pd.to_datetime(df_chuva[coluna_tempo]).to_numpy(dtype='datetime64[ns]').view('i8')
+    valores = df_chuva[coluna_valor].to_numpy(dtype=float)
+
+    # Linhas sem estação ficam de fora, como no groupby
+    com_estacao = codigos >= 0
+    codigos, tempo, valores = codigos[com_estacao], tempo[com_estacao], valores[com_estacao]
+    if len(codigos) == 0:
+        return pd.DataFrame(columns=COLUNAS_VP)
+
+    ordem = np.lexsort((tempo, codigos))
+    codigos, tempo, valores = codigos[ordem].astype(np.int64), tempo[ordem], valores[ordem]
+    validos = ~np.isnan(valores)
+    acumulado_validos = np.r_[0, np.cumsum(validos)]
+
+    # Grupos (estação, hora) em ordem; cada grupo gera uma linha horária
+    hora = np.floor_divide(tempo, HORA_NS)
+    novo_grupo = np.r_[True, (codigos[1:] != codigos[:-1]) | (hora[1:] != hora[:-1])]
+    grupo = np.cumsum(novo_grupo) - 1
+
+    # Grade horária completa de cada estação (da primeira à última hora)
+    inicio_estacao = np.flatnonzero(np.r_[True, codigos[1:] != codigos[:-1]])
+    fim_estacao = np.r_[inicio_estacao[1:], len(codigos)] - 1
+    primeira_hora = hora[inicio_estacao]
+    n_horas = hora[fim_estacao] - primeira_hora + 1
+    deslocamento = np.r_[0, np.cumsum(n_horas)[:-1]]
+    total = int(n_horas.sum())
+    estacao_grade = np.repeat(np.arange(len(inicio_estacao)), n_horas)
+    hora_grade = np.repeat(primeira_hora, n_horas) + (np.arange(total) - np.repeat(deslocamento, n_horas))
+
+    # Posição na grade de cada grupo (estação, hora)
+    linha_grupo = np.flatnonzero(novo_grupo)
+    estacao_do_grupo = np.searchsorted(inicio_estacao, linha_grupo, side='right') - 1
+    posicao_grupo = deslocamento[estacao_do_grupo] + (hora[linha_grupo] - primeira_hora[estacao_do_grupo])
+
+    chave, tempos_unicos, base = _chave_estacao_tempo(codigos, tempo)
+    todos_validos = validos.all()
+    colunas = {}
+    for nome, janela in (('chuva_10min', JANELA_10MIN), ('chuva_2h', JANELA_2H)):
+        if todos_validos:
+            # Sem NaN, a última leitura de cada hora é a linha que fecha o grupo
+            grupos = np.arange(len(linha_grupo))
+            alvos = np.r_[linha_grupo[1:], len(tempo)] - 1
+            inicio = _inicio_janelas(chave, tempos_unicos, base, codigos[alvos], tempo[alvos], janela.value)
+            contagem = alvos + 1 - inicio
+        else:
+            # resample('h').last() pega o último valor não nulo de cada hora
+            inicio = _inicio_janelas(chave, tempos_unicos, base, codigos, tempo, janela.value)
+            contagem = acumulado_validos[np.arange(len(tempo)) + 1] - acumulado_validos[inicio]
+            grupos, alvos = _ultima_por_grupo(grupo, contagem > 0)
+            inicio, contagem = inicio[alvos], contagem[alvos]
+        coluna = np.full(total, np.nan)
+        coluna[posicao_grupo[grupos]] = _somas_janela(valores, validos, contagem, inicio, alvos + 1)
+        colunas[nome] = coluna
+
+    df_vp = pd.DataFrame({
+        'datahora': (hora_grade * HORA_NS).astype('datetime64[ns]'),
+        'nomeEstacao': estacoes.take(codigos[inicio_estacao][estacao_grade]),
+        'chuva_10min': colunas['chuva_10min'],
+        'chuva_2h': colunas['chuva_2h'],
+    })
+    df_vp['VP'] = (df_vp['chuva_10min'] * 6) + df_vp['chuva_2h']
+    return df_vp
+
+
+def recalcular_vp_horario(df_chuva, inicio_por_estacao, coluna_tempo='datahora', coluna_estacao='nomeEstacao',
+                          coluna_valor='valorMedida'):
+    """
+    Só as linhas horárias a partir de inicio_por_estacao (Series estação -> hora cheia),
+    iguais às de calcular_vp_horario(df_chuva) nessas horas. Entram no cálculo apenas
+    as leituras das estações indicadas a partir de 2 h antes do início, que é o que
+    as janelas dessas horas alcançam. Usado para atualizar o VP quando chegam leituras novas.
+    """
+    inicio = pd.to_datetime(df_chuva[coluna_estacao].astype(object).map(inicio_por_estacao))
+    df = df_chuva[pd.to_datetime(df_chuva[coluna_tempo]) > inicio - JANELA_2H]
+    df_vp = calcular_vp_horario(df, coluna_tempo, coluna_estacao, coluna_valor)
+    if df_vp.empty:
+        return df_vp
+    return df_vp[df_vp['datahora'] >= pd.to_datetime(df_vp['nomeEstacao'].astype(object).map(inicio_por_estacao))]
+
+
+class OperadorVPStreaming:
+    """
+    Calcula o VP horário sobre leituras consumidas em ordem de tempo (arquivos
+    diários ou lotes da coleta), carregando entre lotes só a cauda necessária:
+    por estação, as leituras das 2 h anteriores à hora ainda aberta.
+
+    Uma hora é emitida assim que chega uma leitura da mesma estação numa hora
+    posterior (a janela dela não muda mais). fechar() emite as horas abertas,
+    por exemplo no fim de um arquivo diário. A memória não cresce com o
+    número de dias consumidos.
+    """
+
+    def __init__(self):
+        self._cauda = pd.DataFrame({'datahora': pd.Series(dtype='datetime64[ns]'),
+                                    'nomeEstacao': pd.Series(dtype=object),
+                                    'valorMedida': pd.Series(dtype=float)})
+        # Por estação: hora (em horas desde a época) da última leitura e a última hora já emitida
+        self._hora_aberta = pd.Series(dtype=np.int64)
+        self._ultima_emitida = pd.Series(dtype=np.int64)
+        self.descartadas = 0
+
+    def _normalizar(self, df_chuva):
+        df = df_chuva[['datahora', 'nomeEstacao', 'valorMedida']].copy()
+        # Estações categóricas (esquema.py) viram texto: a cauda junta lotes com categorias diferentes
+        df['nomeEstacao'] = df['nomeEstacao'].astype(object)
+        df['datahora'] = pd.to_datetime(df['datahora']).astype('datetime64[ns]')
+        df['valorMedida'] = df['valorMedida'].astype(float)
+        return df.dropna(subset=['nomeEstacao'])
+
+    def _absorver(self, df_chuva):
+        """ Junta o lote à cauda, descartando leituras anteriores à cauda da estação (atrasadas demais). """
+        novos = self._normalizar(df_chuva)
+        if not self._hora_aberta.empty and not novos.empty:
+            corte = self._inicio_cauda().reindex(novos['nomeEstacao'], fill_value=SEM_MARCA).to_numpy()
+            atrasadas = novos['datahora'].to_numpy().view('i8') <= corte
+            self.descartadas += int(atrasadas.sum())
+            novos = novos[~atrasadas]
+        dados = pd.concat([self._cauda, novos], ignore_index=True) if not self._cauda.empty else novos
+        if not dados.empty:
+            horas = dados['datahora'].to_numpy().view('i8') // HORA_NS
+            self._hora_aberta = pd.Series(horas, index=dados['nomeEstacao'].to_numpy()).groupby(level=0).max()
+        return dados
+
+    def _inicio_cauda(self):
+        """ Instante (ns) a partir do qual as leituras ainda influenciam horas não emitidas. """
+        return self._hora_aberta * HORA_NS - JANELA_2H.value
+
+    def _emitir(self, dados, incluir_aberta):
+        if dados.empty:
+            return pd.DataFrame(columns=COLUNAS_VP)
+        df_vp = calcular_vp_horario(dados)
+        hora = df_vp['datahora'].to_numpy().view('i8') // HORA_NS
+        estacoes = df_vp['nomeEstacao'].to_numpy()
+        ultima = self._ultima_emitida.reindex(estacoes, fill_value=SEM_MARCA).to_numpy()
+        aberta = self._hora_aberta.reindex(estacoes).to_numpy()
+        limite = aberta if incluir_aberta else aberta - 1
+        emitir = (hora > ultima) & (hora <= limite)
+
+        # Avança a marca de cada estação e corta a cauda para as 2 h antes da hora aberta
+        marca = self._hora_aberta if incluir_aberta else self._hora_aberta - 1
+        self._ultima_emitida = pd.concat([self._ultima_emitida, marca]).groupby(level=0).max()
+        corte = self._inicio_cauda().reindex(dados['nomeEstacao'], fill_value=SEM_MARCA).to_numpy()
+        self._cauda = dados[dados['datahora'].to_numpy().view('i8') > corte].reset_index(drop=True)
+        return df_vp[emitir].reset_index(drop=True)
+
+    def semear(self, df_contexto):
+        """ Carrega leituras anteriores (ex.: a cauda do dia anterior) só como contexto, sem emitir as horas delas. """
+        dados = self._absorver(df_contexto)
+        self._emitir(dados, incluir_aberta=True)
+
+    def consumir(self, df_chuva):
+        """ Consome um lote de leituras e devolve as linhas horárias cujas janelas já fecharam. """
+        return self._emitir(self._absorver(df_chuva), incluir_aberta=False)
+
+    def fechar(self):
+        """ Emite as horas ainda abertas (fim de arquivo ou de fluxo). A cauda é mantida. """
+        return self._emitir(self._cauda, incluir_aberta=True)
+
+    def cauda(self):
+        """ Leituras em memória (no máximo ~3 h por estação), para persistir o estado entre execuções. """
+        return self._cauda.copy()
@@ -0,0 +1,62 @@
+import os
+import sys
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytz
+import streamlit as st
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from risco_hoje import (carregar_dados_mare_cache, carregar_dados_chuva_cache, URL_ARQUIVO_MARE_AM,
+                        URL_BASE_CHUVAS, CSV_DELIMITADOR, COLUNAS_NO_CSV_CHUVAS)
+from cenarios_risco import MotorCenarios, trajetorias_uniformes
+from resultados_risco import CLASSES_RISCO
+from estacoes import nomes_monitorados
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def motor_de_cenarios(data_hoje_str, linhas_chuva):
+    # Um motor por versão do arquivo do dia (data + número de linhas); o horizonte fica em cache nele
+    df_chuva = carregar_dados_chuva_cache(URL_BASE_CHUVAS, data_hoje_str, CSV_DELIMITADOR, COLUNAS_NO_CSV_CHUVAS)
+    return MotorCenarios(df_chuva, carregar_dados_mare_cache(URL_ARQUIVO_MARE_AM), estacoes=nomes_monitorados())
+
+
+if __name__ == "__main__":
+
+    st.title("Cenários de Chuva x Maré")
+    st.caption("Se a chuva escolhida cair a partir da última leitura, qual o risco de cada estação nas próximas horas?")
+
+    data_hoje_str = datetime.now(pytz.timezone('America/Recife')).strftime('%Y-%m-%d')
+    df_chuva = carregar_dados_chuva_cache(URL_BASE_CHUVAS, data_hoje_str, CSV_DELIMITADOR, COLUNAS_NO_CSV_CHUVAS)
+    if df_chuva.empty or carregar_dados_mare_cache(URL_ARQUIVO_MARE_AM) is None:
+        st.warning(f"Sem leituras de chuva ou maré para {data_hoje_str}.")
+        st.stop()
+    motor = motor_de_cenarios(data_hoje_str, len(df_chuva))
+
+    col1, col2, col3 = st.columns(3)
+    total_maximo = col1.slider("Chuva total até (mm)", 10, 300, 150, step=10)
+    duracao = col2.slider("Duração da chuva (h)", 1, 6, 2)
+    n_horas = col3.slider("Horas avaliadas", 2, 24, 6)
+
+    # Um cenário por mm inteiro: centenas de cenários numa única avaliação
+    totais = np.arange(0, total_maximo + 1, dtype=float)
+    resultado = motor.avaliar(trajetorias_uniformes(totais, duracao), n_horas, rotulos=totais)
+    resumo = resultado.resumo()
+
+    st.write(f"Última leitura: **{pd.Timestamp(motor.instante):%d/%m %H:%M}**")
+
+    st.subheader("Menor chuva (mm) que leva cada estação a cada classe")
+    # O risco cresce com o total: o primeiro cenário que atinge a classe é o menor total
+    nivel_maximo = resultado.nivel.max(axis=2)
+    minimos = {}
+    for nivel, classe in enumerate(CLASSES_RISCO[1:], start=1):
+        atinge = nivel_maximo >= nivel
+        minimos[classe] = np.where(atinge.any(axis=0), totais[atinge.argmax(axis=0)], np.nan)
+    minimos = pd.DataFrame(minimos, index=resultado.estacoes)
+    st.dataframe(minimos)
+
+    st.subheader("Risco máximo por cenário")
+    st.line_chart(resumo.pivot(index='cenario', columns='nomeEstacao', values='Nivel_Risco_Max'))
+
+    with st.expander("Ver horas em Alto por cenário"):
+        st.dataframe(resumo[resumo['primeira_hora_alto'].notna()])
@@ -0,0 +1,86 @@
+import os
+import sys
+from datetime import date, timedelta
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from resultados_risco import ArmazemRisco, DIRETORIO_RESULTADOS, risco_maximo_diario, horas_por_classe
+from esquema import concatenar_risco
+
+# Partições do histórico: diretório local do repositório ou, no painel publicado, o raw do GitHub
+URL_RESULTADOS = 'https://raw.githubusercontent.com/RafaellaB/Diagramas-de-risco-din-mico/main/resultados_risco'
+DIRETORIO_LOCAL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), DIRETORIO_RESULTADOS)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def carregar_indice(origem):
+    # Só o índice é relido a cada 5 minutos; ele diz quais partições mudaram
+    return ArmazemRisco(origem).indice
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def carregar_mes(origem, mes, assinatura):
+    # A assinatura (SHA-256 da partição) faz parte da chave: mês reescrito, cache novo
+    return ArmazemRisco(origem).ler_particao(mes)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def visoes_agregadas(origem, data_inicial, data_final, estacoes, assinaturas):
+    """ Linhas do intervalo e as visões agregadas, recalculadas só quando alguma partição do intervalo muda. """
+    partes = [carregar_mes(origem, mes, assinatura) for mes, assinatura in assinaturas]
+    if not partes:
+        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+    df = concatenar_risco(partes)
+    dias = df['datahora'].dt.normalize()
+    df = df[(dias >= data_inicial) & (dias <= data_final) & df['nomeEstacao'].isin(estacoes)]
+    return df, risco_maximo_diario(df), horas_por_classe(df)
+
+
+if __name__ == "__main__":
+
+    st.title("Histórico de Risco")
+
+    origem = DIRETORIO_LOCAL if os.path.exists(os.path.join(DIRETORIO_LOCAL, 'indice.json')) else URL_RESULTADOS
+    try:
+        indice = carregar_indice(origem)
+    except Exception as e:
+        st.error(f"Não foi possível carregar o índice do histórico. Detalhe: {e}")
+        st.stop()
+
+    particoes = indice['particoes']
+    if not particoes:
+        st.warning("O histórico de risco ainda não tem partições.")
+        st.stop()
+
+    data_minima = date.fromisoformat(min(p['data_inicial'] for p in particoes.values()))
+    data_maxima = date.fromisoformat(max(p['data_final'] for p in particoes.values()))
+    todas_estacoes = sorted({e for p in particoes.values() for e in p['estacoes']})
+
+    col1, col2 = st.columns([2, 3])
+    intervalo = col1.date_input("Período", value=(max(data_minima, data_maxima - timedelta(days=30)), data_maxima),
+                                min_value=data_minima, max_value=data_maxima)
+    estacoes = col2.multiselect("Estações", todas_estacoes, default=todas_estacoes)
+
+    if not isinstance(intervalo, tuple) or len(intervalo) != 2 or not estacoes:
+        st.info("Escolha o período completo e pelo menos uma estação.")
+        st.stop()
+
+    data_inicial, data_final = (d.strftime('%Y-%m-%d') for d in intervalo)
+    meses = [p.strftime('%Y-%m') for p in pd.period_range(data_inicial, data_final, freq='M')]
+    assinaturas = tuple((mes, particoes[mes]['sha256']) for mes in meses if mes in particoes)
+
+    with st.spinner("Consultando o histórico..."):
+        df, maximo_diario, horas = visoes_agregadas(origem, data_inicial, data_final, tuple(estacoes), assinaturas)
+
+    if df.empty:
+        st.warning("Nenhum resultado no período escolhido.")
+    else:
+        st.subheader("Risco máximo diário por estação")
+        st.line_chart(maximo_diario)
+
+        st.subheader("Horas por classe de risco")
+        st.bar_chart(horas)
+
+        with st.expander("Ver linhas do período"):
+            st.dataframe(df)
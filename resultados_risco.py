@@ -0,0 +1,206 @@
+# Arquivo: resultados_risco.py
+"""
+Histórico de resultados de risco particionado por mês.
+
+Cada partição (risco_AAAA-MM.csv) tem as mesmas colunas de
+resultado_risco_final.csv, ordenadas pelo índice (data, nomeEstacao, hora_ref).
+Em memória as linhas usam os tipos de esquema.py (datahora da hora cheia,
+estação categórica, float32).
+O upsert reescreve só as partições dos meses que receberam linhas; as demais
+ficam intocadas. O arquivo indice.json guarda, por partição, o número de
+linhas, o intervalo de datas, as estações e o SHA-256 do conteúdo, usado pelo
+painel para invalidar o cache só dos meses que mudaram.
+
+A origem pode ser um diretório local ou uma URL base (ex.: raw do GitHub);
+a escrita só é feita em diretório local.
+
+Uso em linha de comando:
+    python resultados_risco.py importar resultado_risco_final.csv
+"""
+import os
+import json
+import hashlib
+import argparse
+from io import StringIO
+
+import pandas as pd
+import requests
+
+from esquema import (CLASSES_RISCO, TIPO_CLASSE, COLUNAS_RISCO, risco_vazio, tipar_risco,
+                     concatenar_risco, corrigir_nomes_estacao, ler_risco_csv, escrever_risco_csv)
+
+DIRETORIO_RESULTADOS = 'resultados_risco'
+NOME_INDICE = 'indice.json'
+CHAVES = ['datahora', 'nomeEstacao']
+COLUNAS = COLUNAS_RISCO
+
+
+def _mes(datahoras):
+    return datahoras.dt.to_period('M').astype(str)
+
+
+def _ordenar_como_indice(df):
+    """ Ordem das partições: dia, estação e hora (estáveis entre execuções). """
+    dia = df['datahora'].dt.normalize()
+    ordem = pd.DataFrame({'dia': dia, 'estacao': df['nomeEstacao'].astype(str), 'hora': df['datahora']})
+    ordem = ordem.reset_index(drop=True)  # posições, para o iloc abaixo
+    return df.iloc[ordem.sort_values(['dia', 'estacao', 'hora'], kind='mergesort').index.to_numpy()].reset_index(drop=True)
+
+
+def _meses_no_intervalo(data_inicial, data_final):
+    return [p.strftime('%Y-%m') for p in pd.period_range(pd.Timestamp(data_inicial), pd.Timestamp(data_final), freq='M')]
+
+
+class ArmazemRisco:
+    """ Partições mensais do histórico de risco e seu índice. """
+
+    def __init__(self, origem=DIRETORIO_RESULTADOS):
+        self.origem = origem.rstrip('/')
+        self.remoto = origem.startswith(('http://', 'https://'))
+        self.indice = self._carregar_indice()
+
+    # --- Leitura e escrita de arquivos ---
+
+    def _caminho(self, nome):
+        return f"{self.origem}/{nome}" if self.remoto else os.path.join(self.origem, nome)
+
+    def _ler_bytes(self, nome):
+        """ Conteúdo do arquivo, ou None se ele não existir. """
+        if self.remoto:
+            response = requests.get(self._caminho(nome), timeout=(5, 30))
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return response.content
+        try:
+            with open(self._caminho(nome), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _gravar_bytes(self, nome, conteudo):
+        if self.remoto:
+            raise ValueError("Não é possível gravar numa origem remota.")
+        os.makedirs(self.origem, exist_ok=True)
+        temporario = f"{self._caminho(nome)}.tmp"
+        with open(temporario, 'wb') as f:
+            f.write(conteudo)
+        os.replace(temporario, self._caminho(nome))
+
+    def _carregar_indice(self):
+        conteudo = self._ler_bytes(NOME_INDICE)
+        if not conteudo:
+            return {'versao': 1, 'particoes': {}}
+        indice = json.loads(conteudo)
+        indice.setdefault('particoes', {})
+        return indice
+
+    def _salvar_indice(self):
+        conteudo = json.dumps(self.indice, ensure_ascii=False, indent=2, sort_keys=True)
+        self._gravar_bytes(NOME_INDICE, conteudo.encode('utf-8'))
+
+    # --- Partições ---
+
+    @staticmethod
+    def nome_particao(mes):
+        return f"risco_{mes}.csv"
+
+    def meses(self):
+        return sorted(self.indice['particoes'])
+
+    def assinatura(self, mes):
+        """ SHA-256 da partição segundo o índice (None se o mês não existe). """
+        return self.indice['particoes'].get(mes, {}).get('sha256')
+
+    def ler_particao(self, mes):
+        conteudo = self._ler_bytes(self.nome_particao(mes))
+        if conteudo is None:
+            return risco_vazio()
+        return ler_risco_csv(StringIO(conteudo.decode('utf-8')))
+
+    def _gravar_particao(self, mes, df):
+        conteudo = escrever_risco_csv(df).encode('utf-8')
+        self._gravar_bytes(self.nome_particao(mes), conteudo)
+        self.indice['particoes'][mes] = {
+            'linhas': len(df),
+            'data_inicial': df['datahora'].min().strftime('%Y-%m-%d'),
+            'data_final': df['datahora'].max().strftime('%Y-%m-%d'),
+            'estacoes': sorted(df['nomeEstacao'].astype(str).unique()),
+            'sha256': hashlib.sha256(conteudo).hexdigest(),
+        }
+
+    def upsert(self, df_novo):
+        """
+        Incorpora as linhas novas pela chave (datahora, nomeEstacao); as novas
+        prevalecem. Só as partições dos meses presentes em df_novo são reescritas.
+        Devolve a lista de meses gravados.
+        """
+        if df_novo.empty:
+            return []
+        df_novo = tipar_risco(df_novo).drop_duplicates(subset=CHAVES, keep='last')
+
+        meses_gravados = []
+        for mes, df_mes in df_novo.groupby(_mes(df_novo['datahora']).to_numpy(), sort=True):
+            df_atual = self.ler_particao(mes)
+            if not df_atual.empty:
+                substituidas = pd.MultiIndex.from_frame(df_atual[CHAVES]).isin(pd.MultiIndex.from_frame(df_mes[CHAVES]))
+                df_mes = concatenar_risco([df_atual[~substituidas], df_mes])
+            self._gravar_particao(mes, _ordenar_como_indice(df_mes))
+            meses_gravados.append(mes)
+        self._salvar_indice()
+        return meses_gravados
+
+    def consultar(self, data_inicial, data_final, estacoes=None):
+        """ Linhas entre data_inicial e data_final (inclusive), lendo só as partições desses meses. """
+        inicio = pd.Timestamp(data_inicial).normalize()
+        fim = pd.Timestamp(data_final).normalize() + pd.Timedelta(days=1)
+        partes = []
+        for mes in _meses_no_intervalo(data_inicial, data_final):
+            if mes not in self.indice['particoes']:
+                continue
+            df = self.ler_particao(mes)
+            filtro = (df['datahora'] >= inicio) & (df['datahora'] < fim)
+            if estacoes is not None:
+                filtro &= df['nomeEstacao'].isin(estacoes)
+            partes.append(df[filtro])
+        return concatenar_risco(partes)
+
+
+# --- Visões agregadas ---
+
+def risco_maximo_diario(df):
+    """ Maior Nivel_Risco_Valor de cada dia (linhas) por estação (colunas). """
+    if df.empty:
+        return pd.DataFrame()
+    return df.pivot_table(index=df['datahora'].dt.normalize().rename('data'), columns='nomeEstacao',
+                          values='Nivel_Risco_Valor', aggfunc='max', observed=True)
+
+
+def horas_por_classe(df):
+    """ Número de horas em cada classe de risco (colunas) por estação (linhas). """
+    if df.empty:
+        return pd.DataFrame(columns=CLASSES_RISCO)
+    classes = pd.Categorical(df['Classificacao_Risco'], dtype=TIPO_CLASSE)
+    estacoes = df['nomeEstacao'].astype(str)
+    return pd.crosstab(estacoes, classes, colnames=['Classificacao_Risco']).reindex(columns=CLASSES_RISCO, fill_value=0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manutenção do histórico de risco particionado por mês.")
+    parser.add_argument('--diretorio', default=DIRETORIO_RESULTADOS)
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_importar = sub.add_parser('importar', help="Importa um CSV no formato de resultado_risco_final.csv.")
+    p_importar.add_argument('arquivo')
+    args = parser.parse_args(argv)
+
+    armazem = ArmazemRisco(args.diretorio)
+    if args.comando == 'importar':
+        # A migração é o único ponto em que as linhas antigas entram: os nomes são corrigidos aqui
+        df = corrigir_nomes_estacao(ler_risco_csv(args.arquivo))
+        meses = armazem.upsert(df)
+        print(f"-> {len(df)} linha(s) em {len(meses)} partição(ões): {', '.join(meses)}")
+    print("✅ Concluído.")
+
+
+if __name__ == "__main__":
+    main()
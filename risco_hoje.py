@@ -1,187 +1,257 @@
-""" import pandas as pd
-import requests
+import math
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+import pandas as pd
 import numpy as np
-from datetime import datetime, date
+from datetime import datetime
 import pytz 
 import streamlit as st 
 import plotly.graph_objects as go 
+from motor_vp import recalcular_vp_horario
+from mare import carregar_fonte_am, URL_ARQUIVO_MARE_AM
+from instrumentacao import etapa, medir_cache, marcar_execucao
+from estacoes import nomes_monitorados
+from esquema import COLUNAS_RISCO, RENOMEAR_LEITURAS, risco_vazio, concatenar_risco
+from leituras_do_dia import LeiturasDoDia
+# Cálculo do painel, sem Streamlit, compartilhado com o artefato publicado pela coleta
+from risco_painel import (filtrar_leituras, processar_dados_chuva_simplificado, calcular_risco,
+                          executar_analise_risco_completa, ler_artefato, artefato_vencido, NOME_ARTEFATO)
 
 # 1. ambiente dos arquivos
 URL_BASE_CHUVAS = 'https://raw.githubusercontent.com/RafaellaB/Diagramas-de-risco-din-mico/main/chuva_recife_' 
 SUFIXO_ARQUIVO_CHUVAS = '.csv'
-URL_ARQUIVO_MARE_AM = 'https://raw.githubusercontent.com/RafaellaB/Diagramas-de-risco-din-mico/main/tide/mare_calculada_hora_em_hora_ano-completo.csv'
 CSV_DELIMITADOR = ',' 
 COLUNAS_NO_CSV_CHUVAS = ['datahora', 'nome', 'valor'] 
 COLUNAS_ESPERADAS_VP = ['datahora', 'nomeEstacao', 'valorMedida'] 
+INTERVALO_ATUALIZACAO = 300  # segundos entre verificações do CSV do dia (botão "Atualizar Dados" ignora)
+# Risco do dia já calculado pela coleta (risco_painel.py); o cálculo local só roda sem ele
+URL_ARTEFATO_HOJE = f'https://raw.githubusercontent.com/RafaellaB/Diagramas-de-risco-din-mico/main/{NOME_ARTEFATO}'
 
 
 
 # 2. funções cache para melhorar a performance  
 
 
-@st.cache_data(show_spinner=False)
+@medir_cache('carregar_mare_cache')
+@st.cache_resource(show_spinner=False)
 def carregar_dados_mare_cache(url_am_data):
+    marcar_execucao('carregar_mare_cache')
+    # A mesma fonte do CLI e dos alertas (mare.carregar_fonte_am); o previsor harmônico
+    # guarda os meses calculados em cache no próprio objeto.
+    # cache_resource compartilha o mesmo objeto entre as sessões, sem copiar.
+    fonte = carregar_fonte_am(url_am_data)
+    if fonte is None:
+        st.error("Erro crítico no processamento da Maré.")
+    return fonte
+
+@medir_cache('carregar_artefato_cache')
+@st.cache_data(ttl=60, show_spinner=False)
+def carregar_artefato_cache(url_artefato):
+    # Uma requisição pequena por minuto para todos os usuários; None se o artefato não existir
+    marcar_execucao('carregar_artefato_cache')
+    return ler_artefato(url_artefato)
+
+
+def artefato_do_dia(data_de_hoje_str, forcar=False):
+    """ (cabeçalho, risco) publicado pela coleta, ou None se faltar, estiver vencido ou não puder ser lido. """
+    if forcar:
+        carregar_artefato_cache.clear()
     try:
-        response = requests.get(url_am_data)
-        if response.status_code != 200: return pd.DataFrame()
-        
-        # ESTA LINHA É A PROTEÇÃO contra o erro de tokenização:
-        linhas = [l for l in response.text.splitlines() if not l.startswith(('<<<<', '====', '>>>>')) and l.strip()]
-        
-        if not linhas: return pd.DataFrame()
-
-        conteudo_limpo = "\n".join(linhas)
-        # O separador é detectado da linha limpa (cabeçalho real)
-        separador = ';' if ';' in linhas[0] else ','
-        
-        from io import StringIO
-        df = pd.read_csv(StringIO(conteudo_limpo), sep=separador, decimal=',', encoding='utf-8')
-       
-        
-        # 3. Mapeamento flexível de colunas
-        mapeamento = {
-            'Hora_Exata': 'datahora',
-            'datahora': 'datahora',
-            'Altura_m': 'AM',
-            'altura': 'AM',
-            'AM': 'AM'
-        }
-        df = df.rename(columns=mapeamento)
-
-        #caso especial: Se as colunas ainda estiverem grudadas por erro de leitura
-        if len(df.columns) == 1:
-            col_nome = df.columns[0]
-            if ';' in col_nome or ',' in col_nome:
-                sep_manual = ';' if ';' in col_nome else ','
-                temp = df[col_nome].astype(str).str.split(sep_manual, expand=True)
-                df['datahora'] = temp[0]
-                df['AM'] = temp[1]
-
-        #4. limpeza (remove ';0' ou ',0' que tenha ficado na data)
-        df['datahora'] = df['datahora'].astype(str).str.split(';').str[0].str.split(',').str[0]
-        
-        #conversão final
-        df['datahora'] = pd.to_datetime(df['datahora'], errors='coerce')
-        df = df.dropna(subset=['datahora'])
-        
-        df['data'] = df['datahora'].dt.strftime('%Y-%m-%d')
-        df['hora_ref'] = df['datahora'].dt.strftime('%H:00:00')
-        
-        #garante que AM seja número (converte vírgula para ponto se necessário)
-        df['AM'] = pd.to_numeric(df['AM'].astype(str).str.replace(',', '.'), errors='coerce')
-        
-        return df[['data', 'hora_ref', 'AM']]
+        artefato = carregar_artefato_cache(URL_ARTEFATO_HOJE)
     except Exception as e:
-        st.error(f"Erro crítico no processamento da Maré: {e}")
-        return pd.DataFrame()
+        print(f"Artefato do dia indisponível ({e}); o risco será calculado no painel.")
+        return None
+    if artefato is None or artefato_vencido(artefato[0], data_de_hoje_str):
+        return None
+    return artefato
+
 
-@st.cache_data(ttl=300, show_spinner=False) # TTL = 300 segundos (5 minutos)
-def carregar_dados_chuva_cache(url_base, data_de_hoje_str, separador, colunas_csv):
-    #Lê o arquivo de chuva do dia atual. Cache expira a cada 5 minutos.
+@st.cache_resource(max_entries=4, show_spinner=False)
+def leituras_compartilhadas(url_completa):
+    # Um único CSV do dia em memória por processo, atualizado por delta (leituras_do_dia.py)
+    return LeiturasDoDia(url_completa)
+
+
+@medir_cache('carregar_chuva_cache')
+def carregar_dados_chuva_cache(url_base, data_de_hoje_str, separador, colunas_csv, forcar=False):
+    # Lê o arquivo de chuva do dia atual: no máximo uma verificação a cada 5 minutos
+    # (ou na hora, com forcar=True), e só as linhas novas são baixadas e interpretadas.
+    # As leituras já vêm com os tipos de esquema.py. O separador do CSV publicado é sempre ','.
     url_completa = f"{url_base}{data_de_hoje_str}{SUFIXO_ARQUIVO_CHUVAS}"
-    
-    try:
-        df_chuva_raw = pd.read_csv(url_completa, encoding='utf-8', sep=separador)
-        
-        if not all(col in df_chuva_raw.columns for col in colunas_csv):
-             st.error(f"ERRO DE COLUNA: O arquivo de chuva não tem as colunas esperadas: {colunas_csv}")
-             return pd.DataFrame()
+    leituras = leituras_compartilhadas(url_completa)
 
-        df_chuva_raw.rename(columns={'nome': 'nomeEstacao', 'valor': 'valorMedida'}, inplace=True)
-        df_chuva_raw['datahora'] = pd.to_datetime(df_chuva_raw['datahora'])
-        
-        return df_chuva_raw
-    
+    try:
+        if leituras.atualizar(0 if forcar else INTERVALO_ATUALIZACAO) is not None:
+            marcar_execucao('carregar_chuva_cache')
     except Exception as e:
         st.error(f"ERRO ao carregar arquivo de chuva de hoje ({data_de_hoje_str}). Verifique se o arquivo já existe no GitHub. Detalhe: {e}")
+        if leituras.leituras.empty:
+            return pd.DataFrame()
+
+    df_chuva = leituras.leituras
+    if not all(RENOMEAR_LEITURAS.get(col, col) in df_chuva.columns for col in colunas_csv):
+        st.error(f"ERRO DE COLUNA: O arquivo de chuva não tem as colunas esperadas: {colunas_csv}")
         return pd.DataFrame()
+    return df_chuva
 
 
 #3. funções de processamento
 
-def processar_dados_chuva_simplificado(df_chuva, datas_desejadas, estacoes_desejadas):
-    """ Calcula o indicador horário de chuva 'VP'. """
-    df = df_chuva[df_chuva['nomeEstacao'].isin(estacoes_desejadas)].copy()
-    df['data'] = df['datahora'].dt.date.astype(str)
-    df = df[df['data'].isin(datas_desejadas)]
-    if df.empty: return pd.DataFrame()
-    df = df.set_index('datahora').sort_index()
-    resultados_por_estacao = []
-    for estacao, grupo in df.groupby('nomeEstacao'):
-        chuva_10min = grupo['valorMedida'].rolling('10min').sum()
-        chuva_2h = grupo['valorMedida'].rolling('2h').sum()
-        temp_df = pd.DataFrame({'chuva_10min': chuva_10min, 'chuva_2h': chuva_2h})
-        agregado_horario = temp_df.resample('h').last()
-        agregado_horario['VP'] = (agregado_horario['chuva_10min'] * 6) + agregado_horario['chuva_2h']
-        agregado_horario['nomeEstacao'] = estacao
-        resultados_por_estacao.append(agregado_horario)
-    df_vp = pd.concat(resultados_por_estacao).reset_index()
-    df_vp.dropna(subset=['VP'], inplace=True)
-    df_vp['data'] = df_vp['datahora'].dt.strftime('%Y-%m-%d')
-    df_vp['hora_ref'] = df_vp['datahora'].dt.strftime('%H:00:00')
-    return df_vp[['data', 'hora_ref', 'nomeEstacao', 'VP']]
-
-
-def calcular_risco(df_final):
-    """ Calcula o Nível de Risco (VP * AM) e a Classificação. """
-    if df_final.empty: return pd.DataFrame()
-    df_final['VP'] = pd.to_numeric(df_final['VP'], errors='coerce').round(2) 
-    df_final['AM'] = pd.to_numeric(df_final['AM'], errors='coerce').round(2)
-    df_final['Nivel_Risco_Valor'] = (df_final['VP'] * df_final['AM']).fillna(0).round(2)
-    bins = [-np.inf, 30, 50, 100, np.inf]
-    labels = ['Baixo', 'Moderado', 'Moderado Alto', 'Alto']
-    df_final['Classificacao_Risco'] = pd.cut(df_final['Nivel_Risco_Valor'], bins=bins, labels=labels, right=False)
-    return df_final
-
-
-def executar_analise_risco_completa(df_vp_calculado, df_am):
-    """ Mescla VP e AM e chama o cálculo de risco. """
-    if df_vp_calculado.empty: return pd.DataFrame()
-    df_final = pd.merge(df_vp_calculado, df_am, on=['data', 'hora_ref'], how='left')
-    df_risco = calcular_risco(df_final)
-    return df_risco
-
-
-def gerar_diagramas(df_analisado):
-    """ Gera o diagrama de risco (Heatmap + Scatter) para cada estação/dia. """
-    mapa_de_cores = {'Alto': '#D32F2F', 'Moderado Alto': '#FFA500', 'Moderado': '#FFC107', 'Baixo': '#4CAF50'}
-    definicoes_risco = {'Baixo': 'RA < 30', 'Moderado': '30 ≤ RA < 50', 'Moderado Alto': '50 ≤ RA < 100', 'Alto': 'RA ≥ 100'}
-    
-    for (data, estacao), grupo in df_analisado.groupby(['data', 'nomeEstacao']):
-        if grupo.empty: continue
-        
-        st.subheader(f"Diagrama de Risco: {estacao} - {pd.to_datetime(data).strftime('%d/%m/%Y')}")
-        fig = go.Figure()
-        
-        lim_x = max(110, grupo['VP'].max() * 1.2 if not grupo.empty else 110)
-        lim_y = 5 
-        x_grid, y_grid = np.arange(0, lim_x, 1), np.linspace(0, lim_y, 100)
-        z_grid = np.array([x * y for y in y_grid for x in x_grid]).reshape(len(y_grid), len(x_grid))
-        
-        colorscale = [[0, "#90EE90"], [30/100, "#FFD700"], [50/100, "#FFA500"], [1.0, "#D32F2F"]]
-        fig.add_trace(go.Heatmap(x=x_grid, y=y_grid, z=z_grid, colorscale=colorscale, showscale=False, zmin=0, zmax=100, hoverinfo='none'))
-        
-        grupo = grupo.sort_values(by='hora_ref')
-        fig.add_trace(go.Scatter(x=grupo['VP'], y=grupo['AM'], mode='lines', line=dict(color='black', width=1.5, dash='dash'), hoverinfo='none', showlegend=False))
-        
-        for _, ponto in grupo.iterrows():
-            cor_ponto = mapa_de_cores.get(ponto['Classificacao_Risco'], 'black')
-            fig.add_trace(go.Scatter(x=[ponto['VP']], y=[ponto['AM']], mode='markers', marker=dict(color=cor_ponto, size=12, line=dict(width=1, color='black')), 
-                                     hoverinfo='text', 
-                                     hovertext=f"<b>Hora:</b> {ponto['hora_ref']}<br><b>Risco:</b> {ponto['Classificacao_Risco']} ({ponto['Nivel_Risco_Valor']})<br><b>VP:</b> {ponto['VP']}<br><b>AM:</b> {ponto['AM']}", 
-                                     showlegend=False))
-        
-        for risco, definicao in definicoes_risco.items():
-            fig.add_trace(go.Scatter(x=[None], y=[None], mode='markers', marker=dict(color=mapa_de_cores[risco], size=10, symbol='square'), name=f"<b>{risco}</b>: {definicao}"))
-        
-        fig.update_layout(title=f'<b>{estacao}</b>', 
-                          xaxis_title='Índice de Precipitação (mm)', 
-                          yaxis_title='Índice de Altura da Maré (m)', 
-                          margin=dict(l=40, r=40, t=40, b=40), 
-                          showlegend=True, 
-                          legend_title_text='<b>Níveis de Risco</b>')
-        
-        st.plotly_chart(fig, use_container_width=True, key=f"chart_{data}_{estacao}")
+class RiscoDoDia:
+    """
+    Risco do dia compartilhado pelas sessões do painel. Acompanha as leituras
+    (LeiturasDoDia) pelo número de linhas já processadas: numa carga completa
+    recalcula tudo; quando só chegam linhas novas, recalcula apenas as horas
+    cujas janelas de 2 h alcançam essas leituras (a partir da hora da leitura
+    nova mais antiga de cada estação) e troca essas linhas no resultado.
+    """
+
+    def __init__(self, leituras, datas_desejadas, estacoes_desejadas):
+        self.leituras = leituras
+        self.datas = datas_desejadas
+        self.estacoes = estacoes_desejadas
+        self.risco = risco_vazio()
+        self._carga = None
+        self._linhas = 0
+        self._trava = threading.Lock()
+
+    def atualizar(self, tabua_mare):
+        """ Risco com todas as leituras já baixadas; recalcula só o que mudou desde a última chamada. """
+        with self._trava:
+            carga, df_chuva = self.leituras.estado()
+            if carga != self._carga:
+                with etapa('vp_horario', linhas_entrada=len(df_chuva)) as m:
+                    df_vp = processar_dados_chuva_simplificado(df_chuva, self.datas, self.estacoes)
+                    m.registrar(linhas_saida=len(df_vp))
+                with etapa('vp_x_am', linhas_entrada=len(df_vp)):
+                    self.risco = executar_analise_risco_completa(df_vp, tabua_mare)
+            elif len(df_chuva) > self._linhas:
+                with etapa('vp_delta', linhas_entrada=len(df_chuva) - self._linhas) as m:
+                    self.risco = self._recalcular(df_chuva, df_chuva.iloc[self._linhas:], tabua_mare)
+                    m.registrar(linhas_saida=len(self.risco))
+            self._carga, self._linhas = carga, len(df_chuva)
+            return self.risco
+
+    def _recalcular(self, df_chuva, df_novas, tabua_mare):
+        novas = filtrar_leituras(df_novas, self.datas, self.estacoes)
+        if novas.empty:
+            return self.risco
+        inicio = novas.groupby(novas['nomeEstacao'].astype(object))['datahora'].min().dt.floor('h')
+        df_vp = recalcular_vp_horario(filtrar_leituras(df_chuva, self.datas, self.estacoes), inicio)
+        df_vp = df_vp.dropna(subset=['VP'])[['datahora', 'nomeEstacao', 'VP']]
+        recalculadas = executar_analise_risco_completa(df_vp, tabua_mare)
+
+        corte = pd.to_datetime(self.risco['nomeEstacao'].astype(object).map(inicio)).fillna(pd.Timestamp.max)
+        df_risco = concatenar_risco([self.risco[self.risco['datahora'] < corte], recalculadas])
+        # Mesma ordem da carga completa (estação, hora)
+        return df_risco.sort_values(['nomeEstacao', 'datahora'], kind='mergesort').reset_index(drop=True)
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def risco_do_dia(url_completa, data_hoje_str, estacoes_desejadas):
+    return RiscoDoDia(leituras_compartilhadas(url_completa), [data_hoje_str], list(estacoes_desejadas))
+
+
+MAPA_DE_CORES = {'Alto': '#D32F2F', 'Moderado Alto': '#FFA500', 'Moderado': '#FFC107', 'Baixo': '#4CAF50'}
+DEFINICOES_RISCO = {'Baixo': 'RA < 30', 'Moderado': '30 ≤ RA < 50', 'Moderado Alto': '50 ≤ RA < 100', 'Alto': 'RA ≥ 100'}
+ESCALA_FUNDO = [[0, "#90EE90"], [30/100, "#FFD700"], [50/100, "#FFA500"], [1.0, "#D32F2F"]]
+LIM_Y = 5
+MAX_FIGURAS_EM_CACHE = 256
+COLUNAS_FIGURA = ['datahora', 'VP', 'AM', 'Nivel_Risco_Valor', 'Classificacao_Risco']
+
+
+@lru_cache(maxsize=32)
+def superficie_risco(lim_x, lim_y=LIM_Y):
+    """ Grade de fundo (VP x AM) do diagrama, calculada por broadcasting. lim_x é inteiro para reaproveitar a grade. """
+    x_grid, y_grid = np.arange(0, lim_x, 1), np.linspace(0, lim_y, 100)
+    z_grid = y_grid[:, None] * x_grid[None, :]
+    return x_grid, y_grid, z_grid
+
+
+def criar_figura_risco(grupo, estacao):
+    """ Monta a figura de uma estação/dia: fundo, trajetória e todos os pontos num único trace de marcadores. """
+    grupo = grupo.sort_values(by='datahora')
+    fig = go.Figure()
+
+    x_grid, y_grid, z_grid = superficie_risco(math.ceil(max(110, grupo['VP'].max() * 1.2)))
+    fig.add_trace(go.Heatmap(x=x_grid, y=y_grid, z=z_grid, colorscale=ESCALA_FUNDO, showscale=False, zmin=0, zmax=100, hoverinfo='none'))
+    fig.add_trace(go.Scatter(x=grupo['VP'], y=grupo['AM'], mode='lines', line=dict(color='black', width=1.5, dash='dash'), hoverinfo='none', showlegend=False))
+
+    classificacao = grupo['Classificacao_Risco'].astype(str)
+    cores = classificacao.map(MAPA_DE_CORES).fillna('black')
+    textos = ("<b>Hora:</b> " + grupo['datahora'].dt.strftime('%H:00:00')
+              + "<br><b>Risco:</b> " + classificacao + " (" + grupo['Nivel_Risco_Valor'].astype(str) + ")"
+              + "<br><b>VP:</b> " + grupo['VP'].astype(str)
+              + "<br><b>AM:</b> " + grupo['AM'].astype(str))
+    fig.add_trace(go.Scatter(x=grupo['VP'], y=grupo['AM'], mode='markers',
+                             marker=dict(color=cores.to_numpy(), size=12, line=dict(width=1, color='black')),
+                             hoverinfo='text', hovertext=textos.to_numpy(), showlegend=False))
+
+    for risco, definicao in DEFINICOES_RISCO.items():
+        fig.add_trace(go.Scatter(x=[None], y=[None], mode='markers', marker=dict(color=MAPA_DE_CORES[risco], size=10, symbol='square'), name=f"<b>{risco}</b>: {definicao}"))
+
+    fig.update_layout(title=f'<b>{estacao}</b>',
+                      xaxis_title='Índice de Precipitação (mm)',
+                      yaxis_title='Índice de Altura da Maré (m)',
+                      margin=dict(l=40, r=40, t=40, b=40),
+                      showlegend=True,
+                      legend_title_text='<b>Níveis de Risco</b>')
+    return fig
+
+
+class CacheFiguras:
+    """
+    Figuras já montadas, compartilhadas por todas as sessões do painel.
+    Cada (data, estação) guarda uma única versão, identificada pelo hash das
+    linhas que a geraram: quando chegam leituras novas o hash muda e a figura
+    é refeita; as menos usadas saem quando o limite é atingido (LRU).
+    """
+
+    def __init__(self, max_figuras=MAX_FIGURAS_EM_CACHE):
+        self.max_figuras = max_figuras
+        self._figuras = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter(self, data, estacao, grupo, medicao=None):
+        chave = (data, estacao)
+        assinatura = int(pd.util.hash_pandas_object(grupo[COLUNAS_FIGURA], index=False).sum())
+        with self._trava:
+            guardada = self._figuras.get(chave)
+            if guardada is not None and guardada[0] == assinatura:
+                self._figuras.move_to_end(chave)
+                if medicao: medicao.somar('cache_hit', 1)
+                return guardada[1]
+        if medicao: medicao.somar('cache_miss', 1)
+        fig = criar_figura_risco(grupo, estacao)
+        with self._trava:
+            self._figuras[chave] = (assinatura, fig)
+            self._figuras.move_to_end(chave)
+            while len(self._figuras) > self.max_figuras:
+                self._figuras.popitem(last=False)
+        return fig
+
+
+@st.cache_resource(show_spinner=False)
+def cache_de_figuras():
+    # Um único cache por processo do servidor, visível para todas as sessões
+    return CacheFiguras()
+
+
+def gerar_diagramas(df_analisado, estacao_selecionada=None):
+    """ Gera o diagrama de risco (Heatmap + Scatter) para cada estação/dia, ou só da estação selecionada. """
+    figuras = cache_de_figuras()
+    if estacao_selecionada is not None:
+        df_analisado = df_analisado[df_analisado['nomeEstacao'] == estacao_selecionada]
+
+    with etapa('gerar_diagramas', linhas_entrada=len(df_analisado)) as m:
+        dias = df_analisado['datahora'].dt.normalize().rename('data')
+        for (data, estacao), grupo in df_analisado.groupby([dias, 'nomeEstacao'], observed=True):
+            if grupo.empty: continue
+
+            st.subheader(f"Diagrama de Risco: {estacao} - {data.strftime('%d/%m/%Y')}")
+            fig = figuras.obter(data, estacao, grupo, m)
+            st.plotly_chart(fig, use_container_width=True, key=f"chart_{data:%Y-%m-%d}_{estacao}")
 
 
 
@@ -196,7 +266,7 @@ if __name__ == "__main__":
     data_hoje_str = data_hoje.strftime('%Y-%m-%d')
     
     datas_para_analise = [data_hoje_str]
-    estacoes_desejadas = ["Campina do Barreto", "Torreão", "RECIFE - APAC", "Imbiribeira", "Dois Irmãos"]
+    estacoes_desejadas = nomes_monitorados()
     
     st.title("Diagramas de Risco para Alagamentos - Hoje")
 
@@ -233,51 +303,61 @@ if __name__ == "__main__":
     #botão de refresh e status
     col1, col2 = st.columns([1, 4])
     
-    #botão de atualização, agora garantindo a limpeza
-    if col1.button("Atualizar Dados"):
-        #limpa o cache da função de chuva
-        carregar_dados_chuva_cache.clear()
-        #força o Streamlit a reexecutar o script a partir do topo
-        st.rerun() 
+    #botão de atualização: verifica o CSV do dia na hora, sem esperar os 5 minutos
+    #(só as linhas novas são baixadas e só as horas afetadas são recalculadas)
+    forcar_atualizacao = col1.button("Atualizar Dados")
         
 
    
-    try:
-        # Carrega a Maré (AM) - Estático
-        with st.spinner("Carregando Maré..."):
-             df_am = carregar_dados_mare_cache(URL_ARQUIVO_MARE_AM)
-        
-        # Carrega a Chuva (VP) - Dinâmico (cache de 5 min ou botão)
-       
-        df_chuva_raw = carregar_dados_chuva_cache(
-            URL_BASE_CHUVAS, 
-            data_hoje_str, 
-            CSV_DELIMITADOR, 
-            COLUNAS_NO_CSV_CHUVAS
-        )
-        
-    except Exception as e:
-        st.error(f"Ocorreu um erro no carregamento inicial dos dados. Detalhe: {e}")
-        st.stop() 
+    df_risco_final = None
+    # Caminho rápido: o risco do dia publicado pela coleta (um JSON pequeno, igual para todos os usuários)
+    artefato = artefato_do_dia(data_hoje_str, forcar=forcar_atualizacao)
+    if artefato is not None:
+        cabecalho, df_risco_final = artefato
+        gerado_em = pd.Timestamp(cabecalho['gerado_em']).tz_convert(fuso_horario_referencia)
+        col2.caption(f"Risco calculado pela coleta às {gerado_em:%H:%M} "
+                     f"(leituras até {cabecalho['marca_dagua']['ultima_leitura'] or '-'}).")
 
-    # Condicional de exibição e cálculo
-    if df_chuva_raw.empty or df_am.empty:
-        st.warning(f"Não foi possível iniciar a análise. Verifique o log de erros ou se os arquivos existem para {data_hoje_str}.")
-        
     else:
-        # 3. Processa VP e Calcula Risco (Silencioso)
-        df_vp_calculado = processar_dados_chuva_simplificado(df_chuva_raw, datas_para_analise, estacoes_desejadas)
-        df_risco_final = executar_analise_risco_completa(df_vp_calculado, df_am)
-        
+        try:
+            # Carrega a Maré (AM) - Estático
+            with st.spinner("Carregando Maré..."):
+                 tabua_mare = carregar_dados_mare_cache(URL_ARQUIVO_MARE_AM)
+            
+            # Carrega a Chuva (VP) - Dinâmico (delta a cada 5 min ou botão)
+           
+            df_chuva_raw = carregar_dados_chuva_cache(
+                URL_BASE_CHUVAS, 
+                data_hoje_str, 
+                CSV_DELIMITADOR, 
+                COLUNAS_NO_CSV_CHUVAS,
+                forcar=forcar_atualizacao
+            )
+            
+        except Exception as e:
+            st.error(f"Ocorreu um erro no carregamento inicial dos dados. Detalhe: {e}")
+            st.stop() 
+
+        # Condicional de exibição e cálculo
+        if df_chuva_raw.empty or tabua_mare is None:
+            st.warning(f"Não foi possível iniciar a análise. Verifique o log de erros ou se os arquivos existem para {data_hoje_str}.")
+            
+        else:
+            # 3. Processa VP e Calcula Risco (Silencioso), só nas horas alcançadas pelas leituras novas
+            url_chuva_hoje = f"{URL_BASE_CHUVAS}{data_hoje_str}{SUFIXO_ARQUIVO_CHUVAS}"
+            df_risco_final = risco_do_dia(url_chuva_hoje, data_hoje_str, tuple(estacoes_desejadas)).atualizar(tabua_mare)
+
+    if df_risco_final is not None:
         if not df_risco_final.empty:
             st.success("Análise de Risco Concluída!")
             
-            # 4. geração e exibição dos diagramas
-            gerar_diagramas(df_risco_final)
+            # 4. geração e exibição dos diagramas (todas as estações ou só a escolhida)
+            opcao_estacao = st.selectbox("Estação", ["Todas"] + sorted(df_risco_final['nomeEstacao'].unique()))
+            gerar_diagramas(df_risco_final, None if opcao_estacao == "Todas" else opcao_estacao)
 
             # Opção para ver a tabela detalhada (Streamlit)
             with st.expander("Ver Tabela de Risco Detalhada"):
-                 st.dataframe(df_risco_final[['data', 'hora_ref', 'nomeEstacao', 'VP', 'AM', 'Nivel_Risco_Valor', 'Classificacao_Risco']])
+                 st.dataframe(df_risco_final[COLUNAS_RISCO])
 
         else:
-            st.error("O cálculo de risco final falhou. Verifique as colunas de merge.")"""
+            st.error("O cálculo de risco final falhou. Verifique as colunas de merge.")
@@ -0,0 +1,123 @@
+# Arquivo: risco_painel.py
+"""
+Risco do dia como o painel (risco_hoje.py) exibe, sem depender do Streamlit,
+e o artefato risco_hoje.json que a coleta publica a cada execução.
+
+O painel arredonda VP e AM a 2 casas e usa faixas fechadas à esquerda
+(RA ≥ 30 já é Moderado), ao contrário do CLI diário.
+
+O artefato guarda o resultado pronto (risco horário de cada estação no dia)
+e um cabeçalho com a data, o horário de geração e a marca d'água das entradas
+(arquivo, número de leituras e última leitura). O painel o lê com uma única
+requisição pequena e só refaz o cálculo quando ele falta ou está vencido
+(outro dia, outra versão ou gerado há mais de IDADE_MAXIMA_ARTEFATO).
+
+Formato:
+    {"versao": 1, "data": "AAAA-MM-DD", "gerado_em": "...Z",
+     "marca_dagua": {"arquivo": ..., "leituras": ..., "ultima_leitura": ...},
+     "colunas": [...COLUNAS_RISCO], "linhas": [[...], ...]}
+"""
+import os
+import json
+from datetime import datetime, timezone
+
+import pandas as pd
+import requests
+
+from motor_vp import calcular_vp_horario
+from esquema import COLUNAS_RISCO, COLUNAS_FLOAT32, classificar, tipar_risco, risco_vazio
+# Nome, versão e validade do artefato ficam no núcleo leve da coleta, que os consulta sem pandas
+from ingestao_leve import NOME_ARTEFATO, VERSAO_ARTEFATO, IDADE_MAXIMA_ARTEFATO, artefato_vencido
+
+
+# --- Cálculo (o mesmo do painel) ---
+
+def filtrar_leituras(df_chuva, datas_desejadas, estacoes_desejadas):
+    """ Leituras das estações e datas analisadas. """
+    df = df_chuva[df_chuva['nomeEstacao'].isin(estacoes_desejadas)]
+    return df[df['datahora'].dt.normalize().isin(pd.to_datetime(datas_desejadas))]
+
+
+def processar_dados_chuva_simplificado(df_chuva, datas_desejadas, estacoes_desejadas):
+    """ Calcula o indicador horário de chuva 'VP'. """
+    df = filtrar_leituras(df_chuva, datas_desejadas, estacoes_desejadas)
+    if df.empty: return pd.DataFrame()
+    df_vp = calcular_vp_horario(df)
+    df_vp.dropna(subset=['VP'], inplace=True)
+    return df_vp[['datahora', 'nomeEstacao', 'VP']]
+
+
+def calcular_risco(df_final):
+    """ Calcula o Nível de Risco (VP * AM) e a Classificação. """
+    if df_final.empty: return risco_vazio()
+    df_final['VP'] = pd.to_numeric(df_final['VP'], errors='coerce').round(2)
+    df_final['AM'] = pd.to_numeric(df_final['AM'], errors='coerce').round(2)
+    df_final['Nivel_Risco_Valor'] = (df_final['VP'] * df_final['AM']).fillna(0).round(2)
+    # Aqui as faixas são fechadas à esquerda (RA ≥ 30 já é Moderado), ao contrário do CLI
+    df_final['Classificacao_Risco'] = classificar(df_final['Nivel_Risco_Valor'], fechado_a_direita=False)
+    return tipar_risco(df_final[COLUNAS_RISCO])
+
+
+def executar_analise_risco_completa(df_vp_calculado, tabua_mare):
+    """ Busca a AM de cada hora na tábua de maré e chama o cálculo de risco. """
+    if df_vp_calculado.empty: return risco_vazio()
+    df_final = df_vp_calculado.copy()
+    df_final['AM'] = tabua_mare.am(df_final['datahora'])
+    df_risco = calcular_risco(df_final)
+    return df_risco
+
+
+# --- Artefato ---
+
+def gerar_artefato(df_chuva, data_str, estacoes_desejadas, tabua_mare, arquivo=None, agora=None):
+    """ Artefato (dicionário) com o risco do dia data_str a partir das leituras já tipadas. """
+    df_vp = processar_dados_chuva_simplificado(df_chuva, [data_str], estacoes_desejadas)
+    df_risco = executar_analise_risco_completa(df_vp, tabua_mare)
+
+    # Valores de volta a float64 e 2 casas: no JSON saem como no painel (1.05, não 1.0499999523)
+    linhas = pd.DataFrame({
+        'datahora': df_risco['datahora'].dt.strftime('%Y-%m-%d %H:%M:%S'),
+        'nomeEstacao': df_risco['nomeEstacao'].astype(object),
+        **{c: df_risco[c].astype('float64').round(2) for c in COLUNAS_FLOAT32},
+        'Classificacao_Risco': df_risco['Classificacao_Risco'].astype(object),
+    }).astype(object)
+    linhas = linhas.where(linhas.notna(), None)
+
+    ultima = df_chuva['datahora'].max() if not df_chuva.empty else None
+    agora = agora or datetime.now(timezone.utc)
+    return {
+        'versao': VERSAO_ARTEFATO,
+        'data': data_str,
+        'gerado_em': agora.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'marca_dagua': {'arquivo': arquivo, 'leituras': int(len(df_chuva)),
+                        'ultima_leitura': None if ultima is None or pd.isna(ultima) else ultima.strftime('%Y-%m-%d %H:%M:%S')},
+        'colunas': COLUNAS_RISCO,
+        'linhas': linhas.to_numpy().tolist(),
+    }
+
+
+def salvar_artefato(artefato, caminho=NOME_ARTEFATO):
+    """ Grava o artefato de forma atômica (arquivo temporário + rename). """
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(artefato, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temporario, caminho)
+
+
+def ler_artefato(origem=NOME_ARTEFATO, sessao=None, timeout=(5, 20)):
+    """ (cabeçalho, risco com os tipos de esquema.py) de um caminho ou URL; None se não existir. """
+    if origem.startswith(('http://', 'https://')):
+        response = (sessao or requests).get(origem, timeout=timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        artefato = response.json()
+    elif os.path.exists(origem):
+        with open(origem, 'r', encoding='utf-8') as f:
+            artefato = json.load(f)
+    else:
+        return None
+    linhas = artefato.pop('linhas')
+    df = pd.DataFrame(linhas, columns=artefato['colunas']) if linhas else pd.DataFrame(columns=artefato['colunas'])
+    return artefato, tipar_risco(df)
+